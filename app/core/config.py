@@ -4,6 +4,10 @@ from dotenv import load_dotenv
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
-print("DATABASE_URL =", DATABASE_URL)
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL is not set. Put it in your .env file.")
+
+
+# Serve the hot endpoints (signup, unsubscribe, Meta webhook) from the async engine:
+# app/db/async_session.py + app/routers/*_async.py instead of the threadpool + sync Session.
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() == "true"
@@ -0,0 +1,38 @@
+"""
+orjson when it's installed, stdlib json otherwise. Same call shapes either way.
+dumps() also takes DB row values: datetimes as ISO 8601, UUIDs (and anything else) as str.
+"""
+try:
+    import orjson
+
+    BACKEND = "orjson"
+    JSONDecodeError = orjson.JSONDecodeError
+
+    def loads(data: bytes | str):
+        return orjson.loads(data)
+
+    def dumps(obj) -> str:
+        return orjson.dumps(obj, default=str).decode("utf-8")
+
+    def dumps_sorted(obj) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS).decode("utf-8")
+
+except ImportError:  # pragma: no cover - depends on the environment
+    import json
+
+    BACKEND = "json"
+    JSONDecodeError = json.JSONDecodeError
+
+    def _default(obj):
+        if hasattr(obj, "isoformat"):
+            return obj.isoformat()
+        return str(obj)
+
+    def loads(data: bytes | str):
+        return json.loads(data)
+
+    def dumps(obj) -> str:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=_default)
+
+    def dumps_sorted(obj) -> str:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, sort_keys=True)
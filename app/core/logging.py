@@ -0,0 +1,227 @@
+"""
+Process logging: one JSON object per line on stdout, written from a background thread.
+
+    from app.core.logging import setup_logging
+    setup_logging("worker")          # once, at process start
+    log = logging.getLogger(__name__)
+    log.info("sent", extra={"outbox_id": str(outbox_id)})
+
+Callers only pay for a level check, building the LogRecord and a queue put; formatting
+and the write happen on the QueueListener thread, so a slow stdout never blocks a request
+or a send thread. That thread still shares the GIL, so under load it writes in batches:
+the stream is flushed when the queue runs empty, not after every line. Every record carries the current correlation id (a contextvar set per
+request by CorrelationIdMiddleware, per enqueue run by the scheduler, and per message
+by the worker from the id stored in the outbox payload at enqueue).
+
+    LOG_LEVEL=INFO         DEBUG | INFO | WARNING | ERROR
+    LOG_FORMAT=json        json | text
+    LOG_SAMPLE_RATE=0.01   share of per-message lines kept (see sampled())
+"""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import uuid
+from contextvars import ContextVar
+
+from app.core import fastjson
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.01"))
+
+correlation_id: ContextVar[str | None] = ContextVar("correlation_id", default=None)
+
+# LogRecord attributes that aren't `extra=` fields
+_RESERVED = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "correlation_id"}
+
+
+def new_correlation_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def get_correlation_id() -> str | None:
+    return correlation_id.get()
+
+
+class correlation:
+    """
+    with correlation(cid): runs the block under `cid` (a fresh one if None) and restores
+    the previous id. A class rather than @contextmanager: the worker enters one per message.
+    """
+
+    __slots__ = ("cid", "_token")
+
+    def __init__(self, cid: str | None = None):
+        self.cid = cid or new_correlation_id()
+
+    def __enter__(self) -> str:
+        self._token = correlation_id.set(self.cid)
+        return self.cid
+
+    def __exit__(self, *exc):
+        correlation_id.reset(self._token)
+
+
+def sampled(rate: float | None = None) -> bool:
+    """True for roughly `rate` of calls: guard per-message info lines with it (errors are never sampled)."""
+    rate = LOG_SAMPLE_RATE if rate is None else rate
+    return rate >= 1 or random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        cid = getattr(record, "correlation_id", None)
+        if cid:
+            entry["correlation_id"] = cid
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return fastjson.dumps(entry)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(correlation_id)s] %(message)s")
+
+    def formatMessage(self, record):
+        record.correlation_id = getattr(record, "correlation_id", None) or "-"
+        text = super().formatMessage(record)
+        extras = " ".join(
+            f"{key}={value}" for key, value in record.__dict__.items()
+            if key not in _RESERVED and not key.startswith("_")
+        )
+        return f"{text} {extras}" if extras else text
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Runs in the caller's thread, where the correlation contextvar is set."""
+
+    def emit(self, record):
+        record.correlation_id = correlation_id.get()
+        try:
+            self.enqueue(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+    def prepare(self, record):
+        # stdlib prepare() copies the record and formats it with this handler's
+        # (default) formatter. This is the root logger's only handler and runs last,
+        # so the record can be changed in place: merge the args and turn the traceback
+        # into text (neither survives the thread hop otherwise); the listener-side
+        # formatter does the rest.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _TRACEBACKS.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_TRACEBACKS = logging.Formatter()
+
+
+class _StreamHandler(logging.StreamHandler):
+    def __init__(self, stream, log_queue):
+        super().__init__(stream)
+        self._queue = log_queue
+
+    def flush(self):
+        # more lines already queued: let the stream buffer them, the last one flushes
+        if self._queue.empty():
+            self.flush_now()
+
+    def flush_now(self):
+        super().flush()
+
+
+_listener: logging.handlers.QueueListener | None = None
+_output: _StreamHandler | None = None
+
+
+def setup_logging(service: str, level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, stream=None):
+    """Routes the root logger through a queue to one stdout writer. Safe to call twice."""
+    global _listener, _output
+    if _listener is not None:
+        return
+
+    # Neither formatter prints the caller's file / line / function, thread or process:
+    # skip collecting them on every record (the knobs from the logging HOWTO's
+    # "Optimization" section)
+    logging._srcfile = None
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    logging.logAsyncioTasks = False  # 3.12+
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    output = _output = _StreamHandler(stream or sys.stdout, log_queue)
+    output.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+
+    handler = _QueueHandler(log_queue)
+
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, output)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    logging.getLogger(__name__).debug("logging ready", extra={"service": service})
+
+
+def shutdown_logging():
+    """Flushes what's queued (the listener drains before stopping)."""
+    global _listener, _output
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+        _output.flush_now()
+        _output = None
+
+
+class CorrelationIdMiddleware:
+    """Takes X-Request-ID from the caller (or makes one), binds it for the request and echoes it back."""
+
+    header = b"x-request-id"
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        cid = None
+        for name, value in scope.get("headers", ()):
+            if name == self.header:
+                cid = value.decode("latin-1")[:64] or None
+                break
+        cid = cid or new_correlation_id()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = [*message["headers"], (self.header, cid.encode("latin-1"))]
+            await send(message)
+
+        token = correlation_id.set(cid)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            correlation_id.reset(token)
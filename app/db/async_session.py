@@ -0,0 +1,48 @@
+"""
+Async engine and sessions (psycopg 3's asyncio driver) for the routers in
+app/routers/*_async.py, which app/main.py mounts instead of the sync ones when
+DB_ASYNC=true. Same pool profile as app/db/session.py, but its own pool: the
+admin routers and the background tasks stay on the sync engine.
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.config import DATABASE_URL
+from app.core.metrics import METRICS_ENABLED
+from app.db.metrics import instrument_engine, watch_pool
+from app.db.pool import InstrumentedAsyncQueuePool, async_pool_stats, engine_kwargs, pool_status
+from app.db.session import pool_profile
+
+
+def async_url(database_url: str):
+    """postgresql:// and postgresql+psycopg:// -> postgresql+psycopg_async://"""
+    url = make_url(database_url)
+    if url.get_backend_name() == "postgresql":
+        url = url.set(drivername="postgresql+psycopg_async")
+    return url
+
+
+async_engine = create_async_engine(
+    async_url(DATABASE_URL),
+    **engine_kwargs(pool_profile, poolclass=InstrumentedAsyncQueuePool),
+)
+
+event.listen(async_engine.sync_engine, "connect", lambda dbapi_conn, record: async_pool_stats.record_connect())
+event.listen(async_engine.sync_engine, "invalidate", lambda dbapi_conn, record, exc: async_pool_stats.record_invalidate())
+
+if METRICS_ENABLED:
+    instrument_engine(async_engine.sync_engine, "async")
+watch_pool(async_engine, pool_profile, async_pool_stats, "async")
+
+# expire_on_commit=False: handlers read ids off results after committing
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_async_pool_status() -> dict:
+    return pool_status(async_engine, pool_profile, async_pool_stats)
@@ -0,0 +1,127 @@
+"""
+DB metrics: per-statement timing from SQLAlchemy cursor events, pool usage, and the
+outbox queue (depth + age of the oldest queued message), the last two computed only
+when /metrics is scraped.
+"""
+import time
+
+from sqlalchemy import event, text
+
+from app.core.metrics import Counter, Gauge, REGISTRY, counter, histogram
+from app.db.pool import PoolProfile, PoolStats
+
+DB_QUERY_SECONDS = histogram(
+    "db_query_duration_seconds", "Statement execution time by engine and SQL verb", ("engine", "verb"),
+)
+DB_QUERY_ERRORS = counter("db_query_errors_total", "Statements that raised", ("engine", "verb"))
+
+_VERBS = frozenset({"select", "insert", "update", "delete", "with", "begin", "commit", "rollback", "set", "show"})
+
+
+def _verb(statement: str) -> str:
+    head = statement.lstrip()[:10].split(None, 1)
+    verb = head[0].lower() if head else ""
+    # label values must stay a small fixed set
+    return verb if verb in _VERBS else "other"
+
+
+def instrument_engine(engine, name: str = "sync"):
+    """Times every cursor execute on `engine` (pass async_engine.sync_engine for the async one)."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_t0", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_t0"].pop()
+        DB_QUERY_SECONDS.labels(name, _verb(statement)).observe(time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        conn = context.connection
+        if conn is not None and conn.info.get("query_t0"):
+            conn.info["query_t0"].pop()
+        DB_QUERY_ERRORS.labels(name, _verb(context.statement or "")).inc()
+
+
+_POOL_METRICS = {
+    "db_pool_size": "Configured pool_size",
+    "db_pool_max_overflow": "Configured max_overflow",
+    "db_pool_checked_out": "Connections in use",
+    "db_pool_checked_in": "Idle connections",
+    "db_pool_overflow": "Overflow connections open",
+    "db_pool_checkouts_total": "Checkouts since start",
+    "db_pool_waits_total": "Checkouts that had to wait for a connection",
+    "db_pool_wait_seconds_total": "Time spent waiting for a connection",
+    "db_pool_connects_total": "New DB connections opened",
+    "db_pool_invalidations_total": "Connections thrown away after an error",
+}
+_pools: list[tuple[str, object, PoolProfile, PoolStats]] = []
+
+
+def watch_pool(engine, profile: PoolProfile, stats: PoolStats, name: str = "sync"):
+    """Adds an engine's pool to the db_pool_* metrics (one series per engine)."""
+    _pools.append((name, engine, profile, stats))
+
+
+def collect_pools():
+    series = {
+        metric_name: (Counter if metric_name.endswith("_total") else Gauge)(metric_name, doc, ("engine", "role"))
+        for metric_name, doc in _POOL_METRICS.items()
+    }
+    for name, engine, profile, stats in _pools:
+        pool = engine.pool
+        snapshot = stats.snapshot()
+        values = {
+            "db_pool_size": pool.size(),
+            "db_pool_max_overflow": profile.max_overflow,
+            "db_pool_checked_out": pool.checkedout(),
+            "db_pool_checked_in": pool.checkedin(),
+            "db_pool_overflow": max(pool.overflow(), 0),
+            "db_pool_checkouts_total": snapshot["checkouts"],
+            "db_pool_waits_total": snapshot["waits"],
+            "db_pool_wait_seconds_total": snapshot["wait_seconds"],
+            "db_pool_connects_total": snapshot["connects"],
+            "db_pool_invalidations_total": snapshot["invalidations"],
+        }
+        for metric_name, value in values.items():
+            series[metric_name].labels(name, profile.role).set(value)
+    return series.values()
+
+
+REGISTRY.add_collector(collect_pools)
+
+
+def add_outbox_collector(session_factory):
+    """
+    Depth per status from stats_counter_totals (migrations/009) and the oldest queued
+    message via message_outbox_status_created_idx: two index lookups per scrape.
+    """
+
+    def collect_outbox():
+        db = session_factory()
+        try:
+            depth = db.execute(
+                text("select name, value from stats_counter_totals where name in ('outbox:queued', 'outbox:sending')")
+            ).all()
+            oldest_age = db.execute(
+                text("""
+                    select coalesce(extract(epoch from now() - min(created_at)), 0)
+                    from message_outbox
+                    where status = 'queued'
+                """)
+            ).scalar_one()
+        finally:
+            db.close()
+
+        g = Gauge("outbox_queue_depth", "Outbox rows by status (queued, sending)", ("status",))
+        g.labels("queued").set(0)
+        g.labels("sending").set(0)
+        for name, value in depth:
+            g.labels(name.split(":", 1)[1]).set(value)
+        age = Gauge("outbox_oldest_queued_age_seconds", "Age of the oldest queued outbox message")
+        age.set(float(oldest_age))
+        return [g, age]
+
+    REGISTRY.add_collector(collect_outbox)
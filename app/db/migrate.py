@@ -0,0 +1,29 @@
+"""
+Applies the SQL files in app/db/migrations in filename order.
+
+Every file is written to be re-runnable (if not exists / create or replace),
+so there is no version table: just run it after pulling.
+
+    python -m app.db.migrate
+"""
+import os
+from pathlib import Path
+
+# migrations / long scans: no statement timeout unless the caller picked a role
+os.environ.setdefault("DB_ROLE", "script")
+
+from app.db.session import engine
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+
+
+def run():
+    for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+        sql = path.read_text(encoding="utf-8")
+        with engine.begin() as conn:
+            conn.exec_driver_sql(sql)
+        print("APPLIED", path.name)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,3 @@
+-- New enum values have to be committed before anything can reference them,
+-- so this lives in its own file (each file runs in its own transaction).
+alter type outbox_status add value if not exists 'sending';
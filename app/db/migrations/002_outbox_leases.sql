@@ -0,0 +1,9 @@
+-- Claim/lease model for worker.py: a short transaction flips rows to 'sending'
+-- with a lease deadline; rows whose lease expired (crashed worker) are claimable again.
+alter table message_outbox
+  add column if not exists claimed_by text,
+  add column if not exists lease_expires_at timestamptz;
+
+create index if not exists message_outbox_lease_idx
+  on message_outbox (lease_expires_at)
+  where status = 'sending';
@@ -0,0 +1,16 @@
+-- Wake idle workers as soon as something is queued (worker.py listens on 'outbox_ready').
+-- Statement level, so a weekly blast of N rows sends one notification, and
+-- NOTIFY is only delivered when the enqueueing transaction commits.
+create or replace function notify_outbox_ready() returns trigger
+language plpgsql as $$
+begin
+  perform pg_notify('outbox_ready', '');
+  return null;
+end;
+$$;
+
+drop trigger if exists message_outbox_notify on message_outbox;
+create trigger message_outbox_notify
+  after insert on message_outbox
+  for each statement
+  execute function notify_outbox_ready();
@@ -0,0 +1,7 @@
+-- Retry bookkeeping for worker.py: transient failures go back to 'queued'
+-- with next_attempt_at in the future instead of being failed for good.
+alter table message_outbox
+  add column if not exists attempts integer not null default 0,
+  add column if not exists next_attempt_at timestamptz,
+  add column if not exists last_error text,
+  add column if not exists last_error_code integer;
@@ -0,0 +1,8 @@
+-- Shared token buckets for SEND_RATE_BACKEND=postgres (app/services/rate_limit.py).
+-- key is '*' for the global bucket or a recipient domain.
+create table if not exists send_rate_buckets (
+  key text primary key,
+  tokens double precision not null,
+  factor double precision not null default 1,
+  updated_at timestamptz not null default clock_timestamp()
+);
@@ -0,0 +1,15 @@
+-- Progress of chunked weekly enqueues (app/jobs/weekly_scheduler.py), one row per
+-- campaign/template/scheduled_for. last_customer_id is the keyset cursor a
+-- crashed run resumes from.
+create table if not exists enqueue_runs (
+  campaign_id uuid not null,
+  template_key text not null,
+  scheduled_for timestamptz not null,
+  last_customer_id uuid,
+  scanned bigint not null default 0,
+  inserted bigint not null default 0,
+  started_at timestamptz not null default now(),
+  updated_at timestamptz not null default now(),
+  finished_at timestamptz,
+  primary key (campaign_id, template_key, scheduled_for)
+);
@@ -0,0 +1,43 @@
+-- Latest consent per (customer, channel, purpose), kept in step with the append-only
+-- consents table by a trigger, so every write path (signup, unsubscribe, meta webhook,
+-- signup_service) maintains it without extra round-trips.
+-- After creating it, fill it once: python -m app.jobs.current_consents backfill
+create table if not exists current_consents (
+  customer_id uuid not null references customers(id) on delete cascade,
+  channel channel_type not null,
+  purpose consent_purpose not null,
+  status consent_status not null,
+  consent_id uuid not null,
+  effective_at timestamptz not null,
+  primary key (customer_id, channel, purpose)
+);
+
+create index if not exists current_consents_status_idx
+  on current_consents (channel, purpose, status, customer_id);
+
+create or replace function sync_current_consent() returns trigger
+language plpgsql as $$
+begin
+  insert into current_consents (customer_id, channel, purpose, status, consent_id, effective_at)
+  values (new.customer_id, new.channel, new.purpose, new.status, new.id, new.created_at)
+  on conflict (customer_id, channel, purpose) do update
+  set status = excluded.status,
+      consent_id = excluded.consent_id,
+      effective_at = excluded.effective_at
+  where current_consents.effective_at <= excluded.effective_at;
+  return null;
+end;
+$$;
+
+drop trigger if exists consents_sync_current on consents;
+create trigger consents_sync_current
+  after insert on consents
+  for each row
+  execute function sync_current_consent();
+
+-- Same columns admin_api / admin_dashboard read, now a plain table scan
+drop view if exists v_current_promotions_consent;
+create view v_current_promotions_consent as
+select customer_id, channel, purpose, status, effective_at
+from current_consents
+where purpose = 'promotions';
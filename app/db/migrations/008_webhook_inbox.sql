@@ -0,0 +1,33 @@
+-- Durable inbox for Meta webhook events: the POST handler only verifies the
+-- signature and inserts here; webhook_worker.py (or the in-process drain)
+-- does the customer/identity/consent work. One row per messaging event,
+-- deduped on the Meta message id so redeliveries are dropped at insert time.
+create table if not exists webhook_inbox (
+  id bigserial primary key,
+  source text not null default 'meta',
+  dedupe_key text not null,
+  payload jsonb not null,
+  received_at timestamptz not null default clock_timestamp(),
+  processed_at timestamptz,
+  attempts integer not null default 0,
+  last_error text,
+  unique (source, dedupe_key)
+);
+
+create index if not exists webhook_inbox_pending_idx
+  on webhook_inbox (id)
+  where processed_at is null;
+
+create or replace function notify_webhook_inbox() returns trigger
+language plpgsql as $$
+begin
+  perform pg_notify('webhook_inbox_ready', '');
+  return null;
+end;
+$$;
+
+drop trigger if exists webhook_inbox_notify on webhook_inbox;
+create trigger webhook_inbox_notify
+  after insert on webhook_inbox
+  for each statement
+  execute function notify_webhook_inbox();
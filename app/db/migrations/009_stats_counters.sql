@@ -0,0 +1,206 @@
+-- Row counts for /admin/summary, kept current by statement-level triggers so the
+-- dashboard reads a handful of rows instead of scanning customers / outbox / consents.
+-- Statement level with transition tables: a weekly enqueue of N rows or a worker
+-- claiming a batch is one counter update per touched status, not N.
+-- TRUNCATE and manual fixes aren't tracked; the reconcile job corrects any drift.
+-- After creating it, fill it once: python -m app.jobs.stats_counters reconcile
+create table if not exists stats_counters (
+  name text primary key,
+  value bigint not null default 0,
+  updated_at timestamptz not null default now()
+);
+
+-- Triggers only append here: updating the counter rows directly would make every
+-- signup, enqueue and worker batch wait on the same few row locks until commit.
+-- stats_fold() (scheduler, every minute) moves the deltas into stats_counters.
+create table if not exists stats_counter_deltas (
+  name text not null,
+  delta bigint not null,
+  created_at timestamptz not null default now()
+);
+
+-- What readers use: folded value + deltas not folded yet
+create or replace view stats_counter_totals as
+  select name, sum(value)::bigint as value
+  from (
+    select name, value from stats_counters
+    union all
+    select name, delta from stats_counter_deltas
+  ) t
+  group by name;
+
+-- Appends the (name, delta) pairs of one statement. No locks beyond the insert.
+create or replace function stats_apply(deltas jsonb) returns void
+language sql as $$
+  insert into stats_counter_deltas (name, delta)
+  select d.key, sum(d.value::bigint)
+  from jsonb_each_text(deltas) d
+  group by d.key
+  having sum(d.value::bigint) <> 0;
+$$;
+
+-- Folds the pending deltas into stats_counters; returns how many delta rows it
+-- took. Deltas committed meanwhile aren't visible to the delete and stay for the
+-- next fold; two folds at once just split the rows between them.
+create or replace function stats_fold() returns bigint
+language sql as $$
+  with moved as (
+    delete from stats_counter_deltas
+    returning name, delta
+  ),
+  folded as (
+    insert into stats_counters as s (name, value, updated_at)
+    select name, sum(delta), now()
+    from moved
+    group by name
+    order by name
+    on conflict (name) do update
+    set value = s.value + excluded.value,
+        updated_at = excluded.updated_at
+  )
+  select count(*) from moved;
+$$;
+
+-- Plain table totals: TG_ARGV[0] is the counter name
+create or replace function stats_count_rows() returns trigger
+language plpgsql as $$
+declare
+  n bigint;
+begin
+  if TG_OP = 'INSERT' then
+    select count(*) into n from new_rows;
+  else
+    select -count(*) into n from old_rows;
+  end if;
+  if n <> 0 then
+    perform stats_apply(jsonb_build_object(TG_ARGV[0], n));
+  end if;
+  return null;
+end;
+$$;
+
+-- message_outbox: total plus one 'outbox:<status>' counter per status
+create or replace function stats_outbox_changed() returns trigger
+language plpgsql as $$
+declare
+  deltas jsonb;
+begin
+  if TG_OP = 'INSERT' then
+    select jsonb_object_agg(k, n) into deltas from (
+      select 'outbox:' || status as k, count(*) as n from new_rows group by status
+      union all
+      select 'outbox', count(*) from new_rows having count(*) > 0
+    ) d;
+  elsif TG_OP = 'DELETE' then
+    select jsonb_object_agg(k, n) into deltas from (
+      select 'outbox:' || status as k, -count(*) as n from old_rows group by status
+      union all
+      select 'outbox', -count(*) from old_rows having count(*) > 0
+    ) d;
+  else
+    select jsonb_object_agg(k, n) into deltas from (
+      select 'outbox:' || status as k, sum(n) as n
+      from (
+        select status, 1 as n from new_rows
+        union all
+        select status, -1 from old_rows
+      ) moved
+      group by status
+      having sum(n) <> 0
+    ) d;
+  end if;
+  if deltas is not null then
+    perform stats_apply(deltas);
+  end if;
+  return null;
+end;
+$$;
+
+-- current_consents (maintained by sync_current_consent): 'promotions_consent:<status>'
+create or replace function stats_promotions_consent_changed() returns trigger
+language plpgsql as $$
+declare
+  deltas jsonb;
+begin
+  if TG_OP = 'INSERT' then
+    select jsonb_object_agg(k, n) into deltas from (
+      select 'promotions_consent:' || status as k, count(*) as n
+      from new_rows where purpose = 'promotions' group by status
+    ) d;
+  elsif TG_OP = 'DELETE' then
+    select jsonb_object_agg(k, n) into deltas from (
+      select 'promotions_consent:' || status as k, -count(*) as n
+      from old_rows where purpose = 'promotions' group by status
+    ) d;
+  else
+    select jsonb_object_agg(k, n) into deltas from (
+      select 'promotions_consent:' || status as k, sum(n) as n
+      from (
+        select status, 1 as n from new_rows where purpose = 'promotions'
+        union all
+        select status, -1 from old_rows where purpose = 'promotions'
+      ) moved
+      group by status
+      having sum(n) <> 0
+    ) d;
+  end if;
+  if deltas is not null then
+    perform stats_apply(deltas);
+  end if;
+  return null;
+end;
+$$;
+
+-- Transition tables need one trigger per event
+drop trigger if exists customers_stats_ins on customers;
+create trigger customers_stats_ins after insert on customers
+  referencing new table as new_rows
+  for each statement execute function stats_count_rows('customers');
+drop trigger if exists customers_stats_del on customers;
+create trigger customers_stats_del after delete on customers
+  referencing old table as old_rows
+  for each statement execute function stats_count_rows('customers');
+
+drop trigger if exists customer_identities_stats_ins on customer_identities;
+create trigger customer_identities_stats_ins after insert on customer_identities
+  referencing new table as new_rows
+  for each statement execute function stats_count_rows('identities');
+drop trigger if exists customer_identities_stats_del on customer_identities;
+create trigger customer_identities_stats_del after delete on customer_identities
+  referencing old table as old_rows
+  for each statement execute function stats_count_rows('identities');
+
+drop trigger if exists consents_stats_ins on consents;
+create trigger consents_stats_ins after insert on consents
+  referencing new table as new_rows
+  for each statement execute function stats_count_rows('consents');
+drop trigger if exists consents_stats_del on consents;
+create trigger consents_stats_del after delete on consents
+  referencing old table as old_rows
+  for each statement execute function stats_count_rows('consents');
+
+drop trigger if exists message_outbox_stats_ins on message_outbox;
+create trigger message_outbox_stats_ins after insert on message_outbox
+  referencing new table as new_rows
+  for each statement execute function stats_outbox_changed();
+drop trigger if exists message_outbox_stats_upd on message_outbox;
+create trigger message_outbox_stats_upd after update on message_outbox
+  referencing old table as old_rows new table as new_rows
+  for each statement execute function stats_outbox_changed();
+drop trigger if exists message_outbox_stats_del on message_outbox;
+create trigger message_outbox_stats_del after delete on message_outbox
+  referencing old table as old_rows
+  for each statement execute function stats_outbox_changed();
+
+drop trigger if exists current_consents_stats_ins on current_consents;
+create trigger current_consents_stats_ins after insert on current_consents
+  referencing new table as new_rows
+  for each statement execute function stats_promotions_consent_changed();
+drop trigger if exists current_consents_stats_upd on current_consents;
+create trigger current_consents_stats_upd after update on current_consents
+  referencing old table as old_rows new table as new_rows
+  for each statement execute function stats_promotions_consent_changed();
+drop trigger if exists current_consents_stats_del on current_consents;
+create trigger current_consents_stats_del after delete on current_consents
+  referencing old table as old_rows
+  for each statement execute function stats_promotions_consent_changed();
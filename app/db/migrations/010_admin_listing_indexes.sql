@@ -0,0 +1,17 @@
+-- Keyset pagination for /admin/outbox and /admin/customers/recent (app/services/admin_listings.py):
+-- each page is an index range scan starting right after the cursor's (created_at, id).
+create index if not exists message_outbox_status_created_idx
+  on message_outbox (status, created_at desc, id desc);
+
+create index if not exists message_outbox_campaign_created_idx
+  on message_outbox (campaign_id, created_at desc, id desc);
+
+create index if not exists message_outbox_template_created_idx
+  on message_outbox (template_key, created_at desc, id desc);
+
+create index if not exists customers_created_idx
+  on customers (created_at desc, id desc);
+
+-- identities for one page of customers
+create index if not exists customer_identities_customer_idx
+  on customer_identities (customer_id, created_at);
@@ -0,0 +1,44 @@
+-- Canonical identity values (same rules as app/services/identity.py normalize_identity):
+-- stored in value_normalized and unique per channel, so "Ana@Mail.com " and
+-- "ana@mail.com" are one identity and every lookup is a single index probe.
+alter type channel_type add value if not exists 'messenger';
+
+create or replace function normalize_identity_value(channel channel_type, value text) returns text
+language sql immutable parallel safe as $$
+  select case channel::text
+    when 'email' then lower(btrim(value, E' \t\r\n'))
+    when 'instagram' then lower(ltrim(btrim(value, E' \t\r\n'), '@'))
+    when 'sms' then regexp_replace(value, '[^0-9+]', '', 'g')
+    when 'whatsapp' then regexp_replace(value, '[^0-9+]', '', 'g')
+    else btrim(value, E' \t\r\n')
+  end
+$$;
+
+alter table customer_identities
+  add column if not exists value_normalized text
+  generated always as (normalize_identity_value(channel, value)) stored;
+
+-- Existing rows that only differed in spelling would break the unique index: in that
+-- case keep a plain index (lookups are still one probe) and list the duplicates with
+--   select channel, value_normalized, count(*) from customer_identities
+--   group by 1, 2 having count(*) > 1;
+-- then merge them and re-run the migrations.
+do $$
+begin
+  create unique index if not exists customer_identities_normalized_uidx
+    on customer_identities (channel, value_normalized);
+exception when unique_violation then
+  raise warning 'customer_identities has duplicate normalized values; created a non-unique index instead';
+  create index if not exists customer_identities_normalized_idx
+    on customer_identities (channel, value_normalized);
+end;
+$$;
+
+-- Once the unique index exists the non-unique fallback is redundant
+do $$
+begin
+  if exists (select 1 from pg_indexes where indexname = 'customer_identities_normalized_uidx') then
+    drop index if exists customer_identities_normalized_idx;
+  end if;
+end;
+$$;
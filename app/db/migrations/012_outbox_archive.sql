@@ -0,0 +1,123 @@
+-- Hot/cold split for message_outbox. Terminal rows (sent, failed, cancelled,
+-- blocked_by_consent) older than a retention window are moved in batches to
+-- message_outbox_archive by app/jobs/outbox_archive.py, so the table the worker
+-- dequeues from and the enqueue dedupe index only hold recent / active rows.
+
+-- Same columns as message_outbox plus archived_at. Columns added to message_outbox
+-- later are copied over by outbox_archive_sync() below, which the mover calls before
+-- each run, and it names every column, so the order of the two tables never matters.
+-- No foreign keys: archived rows are history and don't hold up customer / identity deletes.
+create table if not exists message_outbox_archive
+  (like message_outbox including defaults);
+
+alter table message_outbox_archive
+  add column if not exists archived_at timestamptz not null default now();
+
+do $$
+begin
+  if not exists (
+    select 1 from pg_constraint where conname = 'message_outbox_archive_pkey'
+  ) then
+    alter table message_outbox_archive add primary key (id);
+  end if;
+end;
+$$;
+
+-- Dequeue (worker.fetch_next_batch): only active rows are in this index, so the
+-- claim is an ordered scan of the live queue no matter how much history exists.
+create index if not exists message_outbox_dequeue_idx
+  on message_outbox (created_at)
+  where status in ('queued', 'sending');
+
+-- The mover finds old terminal rows through message_outbox_status_created_idx (010).
+
+-- Listings over message_outbox_all: each branch needs the same ordering index so
+-- the union is a merge of two index scans, not a sort
+create index if not exists message_outbox_created_idx
+  on message_outbox (created_at desc, id desc);
+
+create index if not exists message_outbox_archive_created_idx
+  on message_outbox_archive (created_at desc, id desc);
+
+create index if not exists message_outbox_archive_status_created_idx
+  on message_outbox_archive (status, created_at desc, id desc);
+
+create index if not exists message_outbox_archive_campaign_created_idx
+  on message_outbox_archive (campaign_id, created_at desc, id desc);
+
+create index if not exists message_outbox_archive_template_created_idx
+  on message_outbox_archive (template_key, created_at desc, id desc);
+
+-- /admin/debug/identity: a customer's recent messages
+create index if not exists message_outbox_customer_created_idx
+  on message_outbox (customer_id, channel, created_at desc);
+
+create index if not exists message_outbox_archive_customer_created_idx
+  on message_outbox_archive (customer_id, channel, created_at desc);
+
+-- Adds any message_outbox column the archive lacks (nullable, no default: the mover
+-- always supplies the value) and, when it did or when asked, rebuilds
+-- message_outbox_all, the view of everything ever queued used by the admin
+-- listings / exports / summary recount, with explicit column lists.
+-- Returns how many columns it added.
+create or replace function outbox_archive_sync(rebuild_view boolean default false) returns integer
+language plpgsql as $$
+declare
+  col record;
+  added integer := 0;
+  cols text;
+begin
+  for col in
+    select a.attname, format_type(a.atttypid, a.atttypmod) as coltype
+    from pg_attribute a
+    where a.attrelid = 'message_outbox'::regclass
+      and a.attnum > 0
+      and not a.attisdropped
+      and not exists (
+        select 1
+        from pg_attribute b
+        where b.attrelid = 'message_outbox_archive'::regclass
+          and b.attname = a.attname
+          and b.attnum > 0
+          and not b.attisdropped
+      )
+    order by a.attnum
+  loop
+    -- concatenation, not format(): app/db/migrate.py sends this file through the
+    -- driver, which would take format()'s placeholders for bind parameters
+    execute 'alter table message_outbox_archive add column ' || quote_ident(col.attname) || ' ' || col.coltype;
+    added := added + 1;
+  end loop;
+
+  if added > 0 or rebuild_view or to_regclass('message_outbox_all') is null then
+    select string_agg(quote_ident(attname), ', ' order by attnum) into cols
+    from pg_attribute
+    where attrelid = 'message_outbox'::regclass
+      and attnum > 0
+      and not attisdropped;
+    drop view if exists message_outbox_all;
+    execute 'create view message_outbox_all as '
+      || 'select ' || cols || ', null::timestamptz as archived_at from message_outbox '
+      || 'union all '
+      || 'select ' || cols || ', archived_at from message_outbox_archive';
+  end if;
+  return added;
+end;
+$$;
+
+select outbox_archive_sync(true);
+
+-- stats_counters (009) count 'outbox' / 'outbox:<status>' across both tables: a
+-- move is a delete on message_outbox and an insert here, which cancel out.
+drop trigger if exists message_outbox_archive_stats_ins on message_outbox_archive;
+create trigger message_outbox_archive_stats_ins after insert on message_outbox_archive
+  referencing new table as new_rows
+  for each statement execute function stats_outbox_changed();
+drop trigger if exists message_outbox_archive_stats_upd on message_outbox_archive;
+create trigger message_outbox_archive_stats_upd after update on message_outbox_archive
+  referencing old table as old_rows new table as new_rows
+  for each statement execute function stats_outbox_changed();
+drop trigger if exists message_outbox_archive_stats_del on message_outbox_archive;
+create trigger message_outbox_archive_stats_del after delete on message_outbox_archive
+  referencing old table as old_rows
+  for each statement execute function stats_outbox_changed();
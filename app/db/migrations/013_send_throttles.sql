@@ -0,0 +1,14 @@
+-- Relay push-back (421/451) bookkeeping for worker.py.
+
+-- Rate a domain was given when the relay throttled it without one configured
+-- (app/services/rate_limit.py throttle_rate); null for configured buckets.
+alter table send_rate_buckets
+  add column if not exists rate double precision;
+
+-- Throttled sends don't spend attempts; they're counted here instead, grow the
+-- retry delay and fail the message at OUTBOX_MAX_THROTTLES.
+alter table message_outbox
+  add column if not exists throttles integer not null default 0;
+
+-- Copy the new column onto message_outbox_archive and message_outbox_all (012)
+select outbox_archive_sync();
@@ -0,0 +1,179 @@
+"""
+Connection pool settings per process role, and counters to size them with.
+
+DB_ROLE picks the defaults (the entry scripts set it; the API is the default):
+
+    api             uvicorn: many short requests
+    worker          worker.py: one pinned connection + the Postgres rate limiter
+    webhook_worker  webhook_worker.py
+    scheduler       scheduler.py / app/scheduler_main.py: long enqueue / reconcile statements
+    script          migrations and one-off CLIs: no statement timeout
+
+Any of them can be overridden: DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT_SECONDS,
+DB_POOL_RECYCLE_SECONDS, DB_POOL_PRE_PING, DB_STATEMENT_TIMEOUT_MS, DB_PGBOUNCER.
+
+DB_PGBOUNCER (default: on when DATABASE_URL points at port 6543, Supabase's
+transaction pooler) turns off psycopg's server-side prepared statements, which a
+transaction-mode pooler can't route. Poolers also reject the startup option we use
+for statement_timeout, so in that mode set it on the DB role instead
+(alter role ... set statement_timeout = ...).
+"""
+import os
+import threading
+import time
+from typing import NamedTuple
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# pre_ping: a SELECT 1 on checkout, so a connection killed by a Postgres restart or
+# failover is replaced instead of failing whatever drew it. On for every role: the
+# worker's pinned loop connection is checked out once, so it costs that nothing, and
+# its other checkouts (PgSendGovernor, the /metrics outbox scrape) need it.
+ROLE_DEFAULTS = {
+    "api": {"pool_size": 10, "max_overflow": 10, "statement_timeout_ms": 30000, "pre_ping": True},
+    # the pinned loop connection + one per send thread with SEND_RATE_BACKEND=postgres (opened lazily)
+    "worker": {"pool_size": 5, "max_overflow": 2, "statement_timeout_ms": 30000, "pre_ping": True},
+    "webhook_worker": {"pool_size": 2, "max_overflow": 1, "statement_timeout_ms": 30000, "pre_ping": True},
+    "scheduler": {"pool_size": 1, "max_overflow": 2, "statement_timeout_ms": 300000, "pre_ping": True},
+    "script": {"pool_size": 1, "max_overflow": 1, "statement_timeout_ms": 0, "pre_ping": True},
+}
+
+
+class PoolProfile(NamedTuple):
+    role: str
+    pool_size: int
+    max_overflow: int
+    pool_timeout: float
+    pool_recycle: int
+    pre_ping: bool
+    statement_timeout_ms: int
+    pgbouncer: bool
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name, "").strip().lower()
+    if not value or value == "auto":
+        return default
+    return value == "true"
+
+
+def load_profile(database_url: str) -> PoolProfile:
+    role = os.getenv("DB_ROLE", "api").strip().lower()
+    defaults = ROLE_DEFAULTS.get(role)
+    if defaults is None:
+        raise RuntimeError(f"DB_ROLE must be one of {sorted(ROLE_DEFAULTS)}, got {role!r}")
+
+    return PoolProfile(
+        role=role,
+        pool_size=int(os.getenv("DB_POOL_SIZE", defaults["pool_size"])),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", defaults["max_overflow"])),
+        pool_timeout=float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "10")),
+        # below the pooler / load balancer idle cutoff, so we rarely hand out a dead socket
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE_SECONDS", "300")),
+        pre_ping=_env_bool("DB_POOL_PRE_PING", defaults["pre_ping"]),
+        statement_timeout_ms=int(os.getenv("DB_STATEMENT_TIMEOUT_MS", defaults["statement_timeout_ms"])),
+        pgbouncer=_env_bool("DB_PGBOUNCER", make_url(database_url).port == 6543),
+    )
+
+
+class PoolStats:
+    """Counters for one instrumented pool (pool_stats: the sync engine, async_pool_stats: the async one)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.waits = 0  # checkouts that found no idle connection and no overflow room
+            self.wait_seconds = 0.0
+            self.max_wait_seconds = 0.0
+            self.connects = 0
+            self.invalidations = 0
+            self.overflow_peak = 0
+
+    def record_checkout(self, seconds: float, waited: bool, overflow: int):
+        with self._lock:
+            self.checkouts += 1
+            if waited:
+                self.waits += 1
+                self.wait_seconds += seconds
+                self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+            self.overflow_peak = max(self.overflow_peak, overflow)
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def record_invalidate(self):
+        with self._lock:
+            self.invalidations += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "wait_seconds": round(self.wait_seconds, 4),
+                "max_wait_seconds": round(self.max_wait_seconds, 4),
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "overflow_peak": self.overflow_peak,
+            }
+
+
+pool_stats = PoolStats()
+async_pool_stats = PoolStats()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times every checkout into its `stats`."""
+
+    stats = pool_stats
+
+    def _do_get(self):
+        # nothing idle and no room to open another one: this checkout blocks
+        waited = self.checkedin() == 0 and -1 < self._max_overflow <= self._overflow
+        t0 = time.perf_counter()
+        conn = super()._do_get()
+        # overflow() counts from -pool_size while the pool is filling up
+        self.stats.record_checkout(time.perf_counter() - t0, waited, max(self.overflow(), 0))
+        return conn
+
+
+class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    """The same, for create_async_engine (app/db/async_session.py)."""
+
+    stats = async_pool_stats
+
+
+def engine_kwargs(profile: PoolProfile, poolclass=InstrumentedQueuePool) -> dict:
+    connect_args: dict = {}
+    if profile.pgbouncer:
+        connect_args["prepare_threshold"] = None
+    elif profile.statement_timeout_ms > 0:
+        connect_args["options"] = f"-c statement_timeout={profile.statement_timeout_ms}"
+
+    return {
+        "poolclass": poolclass,
+        "pool_size": profile.pool_size,
+        "max_overflow": profile.max_overflow,
+        "pool_timeout": profile.pool_timeout,
+        "pool_recycle": profile.pool_recycle,
+        "pool_pre_ping": profile.pre_ping,
+        "connect_args": connect_args,
+    }
+
+
+def pool_status(engine, profile: PoolProfile, stats: PoolStats = pool_stats) -> dict:
+    pool = engine.pool
+    return {
+        "profile": profile._asdict(),
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        **stats.snapshot(),
+    }
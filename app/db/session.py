@@ -1,12 +1,22 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
 
 from app.core.config import DATABASE_URL
+from app.core.metrics import METRICS_ENABLED
+from app.db.metrics import instrument_engine, watch_pool
+from app.db.pool import engine_kwargs, load_profile, pool_stats, pool_status
 
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,
-)
+# Pool size / timeouts depend on the process (DB_ROLE), see app/db/pool.py
+pool_profile = load_profile(DATABASE_URL)
+
+engine = create_engine(DATABASE_URL, **engine_kwargs(pool_profile))
+
+event.listen(engine, "connect", lambda dbapi_conn, record: pool_stats.record_connect())
+event.listen(engine, "invalidate", lambda dbapi_conn, record, exc: pool_stats.record_invalidate())
+
+if METRICS_ENABLED:
+    instrument_engine(engine, "sync")
+watch_pool(engine, pool_profile, pool_stats, "sync")
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -16,3 +26,35 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_pool_status() -> dict:
+    return pool_status(engine, pool_profile)
+
+
+class PinnedSession:
+    """
+    For loop processes (worker.py, webhook_worker.py): one connection checked out for
+    the life of the process, so an iteration costs no pool checkout or pre-ping.
+    get() hands out the same Session and reconnects if the connection was invalidated
+    (DB restart, network drop); callers still commit / rollback per iteration.
+    """
+
+    def __init__(self):
+        self._conn = None
+        self._session: Session | None = None
+
+    def get(self) -> Session:
+        if self._conn is None or self._conn.closed or self._conn.invalidated:
+            self.close()
+            self._conn = engine.connect()
+            self._session = SessionLocal(bind=self._conn)
+        return self._session
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+        if self._conn is not None:
+            self._conn.close()
+        self._session = None
+        self._conn = None
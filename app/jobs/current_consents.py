@@ -0,0 +1,88 @@
+"""
+Maintenance for the current_consents table (see migrations/007_current_consents.sql).
+
+    python -m app.jobs.current_consents backfill   # rebuild from consents (safe to re-run)
+    python -m app.jobs.current_consents verify     # compare against a full recompute
+"""
+import os
+import sys
+
+# migrations / long scans: no statement timeout unless the caller picked a role
+os.environ.setdefault("DB_ROLE", "script")
+
+from sqlalchemy import text
+
+from app.db.session import SessionLocal
+
+# What current_consents is supposed to hold, computed the slow way
+_LATEST_FROM_CONSENTS = """
+    select distinct on (customer_id, channel, purpose)
+      customer_id, channel, purpose, status, id as consent_id, created_at as effective_at
+    from consents
+    order by customer_id, channel, purpose, created_at desc
+"""
+
+
+def backfill(db) -> int:
+    count = db.execute(text(f"""
+        with latest as ({_LATEST_FROM_CONSENTS}),
+        upserted as (
+          insert into current_consents (customer_id, channel, purpose, status, consent_id, effective_at)
+          select customer_id, channel, purpose, status, consent_id, effective_at
+          from latest
+          on conflict (customer_id, channel, purpose) do update
+          set status = excluded.status,
+              consent_id = excluded.consent_id,
+              effective_at = excluded.effective_at
+          where current_consents.effective_at <= excluded.effective_at
+          returning 1
+        )
+        select count(*) from upserted
+    """)).scalar_one()
+    db.commit()
+    return count
+
+
+def verify(db, sample: int = 20) -> list[dict]:
+    """Rows where current_consents disagrees with the recomputed latest state (empty = healthy)."""
+    rows = db.execute(text(f"""
+        with latest as ({_LATEST_FROM_CONSENTS})
+        select
+          coalesce(l.customer_id, cc.customer_id) as customer_id,
+          coalesce(l.channel, cc.channel) as channel,
+          coalesce(l.purpose, cc.purpose) as purpose,
+          l.status as expected_status,
+          cc.status as current_status
+        from latest l
+        full join current_consents cc
+          on cc.customer_id = l.customer_id
+         and cc.channel = l.channel
+         and cc.purpose = l.purpose
+        where l.status is distinct from cc.status
+        limit :sample
+    """), {"sample": sample}).mappings().all()
+    return [dict(r) for r in rows]
+
+
+def main(argv: list[str]):
+    cmd = argv[1] if len(argv) > 1 else "verify"
+    db = SessionLocal()
+    try:
+        if cmd == "backfill":
+            print("CURRENT CONSENTS upserted:", backfill(db))
+        elif cmd == "verify":
+            mismatches = verify(db)
+            print("CURRENT CONSENTS mismatches:", len(mismatches))
+            for m in mismatches:
+                print("  ", m)
+            return 1 if mismatches else 0
+        else:
+            print(__doc__)
+            return 2
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,173 @@
+"""
+Moves finished outbox rows to message_outbox_archive (see migrations/012_outbox_archive.sql).
+
+    python -m app.jobs.outbox_archive run       # archive in batches until nothing is left (safe to re-run)
+    python -m app.jobs.outbox_archive status    # rows per table, oldest archivable row
+    python -m app.jobs.outbox_archive explain   # the worker's dequeue plan (should use message_outbox_dequeue_idx)
+
+Only terminal rows (sent, failed, cancelled, blocked_by_consent) older than
+OUTBOX_ARCHIVE_AFTER_DAYS move, and never rows of an enqueue run that hasn't
+finished: the enqueue dedupe (on conflict customer/channel/template/scheduled_for)
+only sees message_outbox, so a resumed run must still find what it already queued.
+Each batch is its own short transaction; the scheduler runs this nightly.
+
+Once rows are archived, that dedupe can't see them either: re-enqueueing a
+scheduled_for older than the retention window would queue those messages again.
+"""
+import logging
+import os
+import sys
+
+# migrations / long scans: no statement timeout unless the caller picked a role
+os.environ.setdefault("DB_ROLE", "script")
+
+from sqlalchemy import text
+
+from app.db.session import SessionLocal
+
+log = logging.getLogger(__name__)
+
+OUTBOX_ARCHIVE_AFTER_DAYS = float(os.getenv("OUTBOX_ARCHIVE_AFTER_DAYS", "14"))
+OUTBOX_ARCHIVE_BATCH_SIZE = int(os.getenv("OUTBOX_ARCHIVE_BATCH_SIZE", "5000"))
+
+TERMINAL_STATUSES = ("sent", "failed", "cancelled", "blocked_by_consent")
+
+_ARCHIVABLE = """
+    from message_outbox mo
+    where mo.status = any(CAST(:statuses AS outbox_status[]))
+      and mo.created_at < now() - make_interval(secs => :after_seconds)
+      and not exists (
+        select 1
+        from enqueue_runs r
+        where r.finished_at is null
+          and r.campaign_id = mo.campaign_id
+          and r.template_key = mo.template_key
+          and r.scheduled_for = mo.scheduled_for
+      )
+"""
+
+_COLUMNS_SQL = """
+    select string_agg(quote_ident(attname), ', ' order by attnum)
+    from pg_attribute
+    where attrelid = 'message_outbox'::regclass
+      and attnum > 0
+      and not attisdropped
+"""
+
+
+def _move_sql(columns: str) -> str:
+    # columns named on both sides: independent of either table's column order
+    return f"""
+        with batch as (
+          select mo.id
+          {_ARCHIVABLE}
+          limit :batch_size
+          for update of mo skip locked
+        ),
+        moved as (
+          delete from message_outbox mo
+          using batch
+          where mo.id = batch.id
+          returning mo.*
+        ),
+        archived as (
+          insert into message_outbox_archive ({columns}, archived_at)
+          select {columns}, now() from moved
+          returning 1
+        )
+        select count(*) from archived
+    """
+
+
+def prepare_archive(db) -> str:
+    """Copies columns added to message_outbox onto the archive (migrations/012), then returns the move statement."""
+    added = db.execute(text("select outbox_archive_sync()")).scalar_one()
+    if added:
+        log.info("archive columns synced", extra={"added": added})
+    columns = db.execute(text(_COLUMNS_SQL)).scalar_one()
+    db.commit()
+    return _move_sql(columns)
+
+
+def _params(after_days: float, **extra) -> dict:
+    return {"statuses": list(TERMINAL_STATUSES), "after_seconds": after_days * 86400, **extra}
+
+
+def archive_batch(
+    db,
+    after_days: float = OUTBOX_ARCHIVE_AFTER_DAYS,
+    batch_size: int = OUTBOX_ARCHIVE_BATCH_SIZE,
+    move_sql: str | None = None,
+) -> int:
+    """Moves up to `batch_size` rows and commits. Returns how many moved."""
+    move_sql = move_sql or prepare_archive(db)
+    moved = db.execute(text(move_sql), _params(after_days, batch_size=batch_size)).scalar_one()
+    db.commit()
+    return moved
+
+
+def archive(
+    db,
+    after_days: float = OUTBOX_ARCHIVE_AFTER_DAYS,
+    batch_size: int = OUTBOX_ARCHIVE_BATCH_SIZE,
+    max_batches: int | None = None,
+) -> dict:
+    move_sql = prepare_archive(db)
+    total = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        moved = archive_batch(db, after_days, batch_size, move_sql)
+        total += moved
+        batches += 1
+        if moved < batch_size:
+            break
+    return {"archived": total, "batches": batches}
+
+
+def archive_status(db, after_days: float = OUTBOX_ARCHIVE_AFTER_DAYS) -> dict:
+    row = db.execute(
+        text(f"""
+            select
+              (select count(*) from message_outbox) as hot,
+              (select count(*) from message_outbox where status in ('queued', 'sending')) as active,
+              (select count(*) from message_outbox_archive) as archived,
+              (select min(mo.created_at) {_ARCHIVABLE}) as oldest_archivable
+        """),
+        _params(after_days),
+    ).one()
+    return dict(row._mapping)
+
+
+def explain_dequeue(db) -> list[str]:
+    from worker import DEQUEUE_SQL, OUTBOX_MAX_ATTEMPTS
+
+    rows = db.execute(
+        text("explain " + DEQUEUE_SQL),
+        {"limit": 25, "worker_id": "explain", "lease_seconds": 300, "max_attempts": OUTBOX_MAX_ATTEMPTS},
+    ).scalars().all()
+    db.rollback()
+    return rows
+
+
+def main(argv: list[str]):
+    cmd = argv[1] if len(argv) > 1 else "status"
+    db = SessionLocal()
+    try:
+        if cmd == "run":
+            info = archive(db)
+            print("OUTBOX ARCHIVE:", info)
+        elif cmd == "status":
+            for key, value in archive_status(db).items():
+                print(f"   {key}: {value}")
+        elif cmd == "explain":
+            print("\n".join(explain_dequeue(db)))
+        else:
+            print(__doc__)
+            return 2
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
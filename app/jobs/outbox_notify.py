@@ -0,0 +1,99 @@
+import logging
+import time
+
+import psycopg
+from sqlalchemy.engine import make_url
+
+# Fired by the message_outbox_notify trigger (see migrations/003_outbox_notify.sql)
+OUTBOX_CHANNEL = "outbox_ready"
+
+log = logging.getLogger(__name__)
+
+
+def to_libpq_url(database_url: str) -> str:
+    # DATABASE_URL is written for SQLAlchemy ("postgresql+psycopg://..."); psycopg wants plain libpq
+    return make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+class OutboxWaiter:
+    """
+    What a queue consumer (worker.py, webhook_worker.py) does when its queue is empty.
+
+    With a listen URL: blocks on LISTEN <channel>, so a NOTIFY wakes us
+    immediately; the timeout is only a slow safety poll.
+    Without one (or if the LISTEN connection drops): plain sleep.
+    Either way the timeout backs off from `min_seconds` to `max_seconds` while
+    the queue stays empty and goes back to `min_seconds` once work shows up.
+
+    NOTE: LISTEN needs a session-level connection. Through a transaction-mode
+    pooler (PgBouncer / Supabase :6543) notifications never arrive, so point the
+    listen URL at the direct/session port.
+    """
+
+    def __init__(
+        self,
+        listen_url: str | None = None,
+        min_seconds: float = 1.0,
+        max_seconds: float = 15.0,
+        channel: str = OUTBOX_CHANNEL,
+    ):
+        self.listen_url = to_libpq_url(listen_url) if listen_url else None
+        self.channel = channel
+        self.min_seconds = min_seconds
+        self.max_seconds = max(min_seconds, max_seconds)
+        self._timeout = min_seconds
+        self._conn: psycopg.Connection | None = None
+
+    def _ensure_listening(self) -> bool:
+        if not self.listen_url:
+            return False
+        if self._conn is not None and not self._conn.closed:
+            return True
+        try:
+            self._conn = psycopg.connect(self.listen_url, autocommit=True)
+            self._conn.execute(f"LISTEN {self.channel}")
+            log.info("LISTEN connected", extra={"channel": self.channel})
+            return True
+        except Exception as e:
+            log.warning("LISTEN unavailable, polling instead", extra={"channel": self.channel, "error": repr(e)})
+            self._close()
+            return False
+
+    def _close(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+        self._conn = None
+
+    def wait(self) -> bool:
+        """Waits for work. Returns True if woken by a notification, False on timeout."""
+        timeout = self._timeout
+        self._timeout = min(self._timeout * 2, self.max_seconds)
+
+        if not self._ensure_listening():
+            time.sleep(timeout)
+            return False
+
+        try:
+            woke = False
+            for _ in self._conn.notifies(timeout=timeout, stop_after=1):
+                woke = True
+            if woke:
+                # a bulk enqueue can leave several pending; one fetch covers them all
+                for _ in self._conn.notifies(timeout=0):
+                    pass
+                self.reset()
+            return woke
+        except Exception as e:
+            log.warning("LISTEN error", extra={"channel": self.channel, "error": repr(e)})
+            self._close()
+            time.sleep(timeout)
+            return False
+
+    def reset(self):
+        self._timeout = self.min_seconds
+
+    def close(self):
+        self._close()
@@ -0,0 +1,93 @@
+"""
+Maintenance for the stats_counters table (see migrations/009_stats_counters.sql).
+
+    python -m app.jobs.stats_counters reconcile   # recount everything and fix drift (safe to re-run)
+    python -m app.jobs.stats_counters verify      # show counters that disagree with a recount
+    python -m app.jobs.stats_counters fold        # move pending trigger deltas into stats_counters
+
+The recount is a full scan of each table, so it runs off-peak from the scheduler.
+It counts and reads the counters in one REPEATABLE READ snapshot and writes the
+difference as a delta, so writes that commit while it is counting aren't lost.
+"""
+import os
+import sys
+
+# migrations / long scans: no statement timeout unless the caller picked a role
+os.environ.setdefault("DB_ROLE", "script")
+
+from sqlalchemy import text
+
+from app.db.session import SessionLocal
+from app.services.admin_summary import live_counters, stored_counters
+
+
+def fold(db) -> int:
+    """Folds pending stats_counter_deltas rows into stats_counters. Returns how many. Commits."""
+    folded = db.execute(text("select stats_fold()")).scalar_one()
+    db.commit()
+    return folded
+
+
+def _repeatable_read(db):
+    # must be the first statement of the transaction
+    db.commit()
+    db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+
+
+def drift(db) -> dict[str, tuple[int, int]]:
+    """name -> (stored, actual) for every counter that is off, both read from one snapshot."""
+    _repeatable_read(db)
+    actual = live_counters(db)
+    stored = stored_counters(db)
+    return {
+        name: (stored.get(name, 0), actual.get(name, 0))
+        for name in sorted(set(actual) | set(stored))
+        if stored.get(name, 0) != actual.get(name, 0)
+    }
+
+
+def reconcile(db) -> dict[str, tuple[int, int]]:
+    """Recounts and appends a corrective delta for each counter that drifted. Returns what it fixed."""
+    fixed = drift(db)
+    if fixed:
+        # a delta, not the absolute value: anything committed after the snapshot still counts
+        db.execute(
+            text("""
+                insert into stats_counter_deltas (name, delta)
+                select name, delta
+                from unnest(CAST(:names AS text[]), CAST(:deltas AS bigint[])) as t(name, delta)
+            """),
+            {"names": list(fixed), "deltas": [actual - stored for stored, actual in fixed.values()]},
+        )
+    db.commit()
+    fold(db)
+    return fixed
+
+
+def main(argv: list[str]):
+    cmd = argv[1] if len(argv) > 1 else "verify"
+    db = SessionLocal()
+    try:
+        if cmd == "reconcile":
+            fixed = reconcile(db)
+            print("STATS COUNTERS fixed:", len(fixed))
+            for name, (stored, actual) in fixed.items():
+                print(f"   {name}: {stored} -> {actual}")
+        elif cmd == "fold":
+            print("STATS COUNTERS folded deltas:", fold(db))
+        elif cmd == "verify":
+            off = drift(db)
+            print("STATS COUNTERS drifted:", len(off))
+            for name, (stored, actual) in off.items():
+                print(f"   {name}: stored {stored}, actual {actual}")
+            return 1 if off else 0
+        else:
+            print(__doc__)
+            return 2
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
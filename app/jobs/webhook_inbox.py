@@ -0,0 +1,152 @@
+import hashlib
+import logging
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core import fastjson
+from app.services.meta_ingest import ingest_messaging_events, normalize_messaging_event, raw_messaging_events
+
+MAX_ATTEMPTS = 5
+
+log = logging.getLogger(__name__)
+
+
+def dedupe_key(ev: dict) -> str:
+    """Meta message id when there is one; otherwise a stable hash of the event itself."""
+    mid = (ev.get("message") or {}).get("mid")
+    if mid:
+        return f"mid:{mid}"
+    canonical = fastjson.dumps_sorted(ev).encode("utf-8")
+    return "sha256:" + hashlib.sha256(canonical).hexdigest()
+
+
+ENQUEUE_SQL = text("""
+    with ins as (
+      insert into webhook_inbox (source, dedupe_key, payload)
+      select 'meta', t.dedupe_key, t.payload
+      from unnest(CAST(:keys AS text[]), CAST(:payloads AS jsonb[])) as t(dedupe_key, payload)
+      on conflict (source, dedupe_key) do nothing
+      returning 1
+    )
+    select count(*) from ins
+""")
+
+
+def _enqueue_params(events: list[dict]) -> dict:
+    return {
+        "keys": [dedupe_key(ev) for ev in events],
+        "payloads": [fastjson.dumps(ev) for ev in events],
+    }
+
+
+def enqueue_meta_payload(db: Session, payload: dict) -> int:
+    """Stores every messaging event of a webhook payload; returns how many were new. Does not commit."""
+    events = raw_messaging_events(payload)
+    if not events:
+        return 0
+    return db.execute(ENQUEUE_SQL, _enqueue_params(events)).scalar_one()
+
+
+async def enqueue_meta_payload_async(db: AsyncSession, payload: dict) -> int:
+    """enqueue_meta_payload() on the async engine. Does not commit."""
+    events = raw_messaging_events(payload)
+    if not events:
+        return 0
+    return (await db.execute(ENQUEUE_SQL, _enqueue_params(events))).scalar_one()
+
+
+def _claim(db: Session, limit: int):
+    return db.execute(
+        text("""
+            select id, payload
+            from webhook_inbox
+            where processed_at is null
+              and source = 'meta'
+              and attempts < :max_attempts
+            order by id
+            for update skip locked
+            limit :limit
+        """),
+        {"limit": limit, "max_attempts": MAX_ATTEMPTS},
+    ).all()
+
+
+def _mark_processed(db: Session, ids: list[int]) -> list[float]:
+    """Returns the ingestion lag (received -> processed, seconds) of each row."""
+    return db.execute(
+        text("""
+            update webhook_inbox
+            set processed_at = clock_timestamp(),
+                attempts = attempts + 1
+            where id = any(:ids)
+            returning extract(epoch from processed_at - received_at)
+        """),
+        {"ids": ids},
+    ).scalars().all()
+
+
+def _mark_failed(db: Session, row_id: int, error: str):
+    db.execute(
+        text("""
+            update webhook_inbox
+            set attempts = attempts + 1,
+                last_error = :error
+            where id = :id
+        """),
+        {"id": row_id, "error": error[:300]},
+    )
+
+
+def process_inbox_batch(db: Session, limit: int = 200) -> dict:
+    """
+    Claims up to `limit` pending events and ingests them together. If the batch
+    fails, each event is retried on its own so one bad event can't block the rest;
+    events failing MAX_ATTEMPTS times are left for inspection.
+    """
+    t0 = time.perf_counter()
+    rows = _claim(db, limit)
+    if not rows:
+        db.commit()
+        return {"processed": 0, "failed": 0}
+
+    events = [normalize_messaging_event(r.payload) for r in rows]
+    failed = 0
+    try:
+        ingest_messaging_events(db, [ev for ev in events if ev is not None])
+        lags = _mark_processed(db, [r.id for r in rows])
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        log.warning("webhook inbox batch failed, retrying one by one", extra={"error": repr(e), "events": len(rows)})
+        lags = []
+        for row, ev in zip(rows, events):
+            try:
+                claimed = db.execute(
+                    text("select 1 from webhook_inbox where id = :id and processed_at is null for update skip locked"),
+                    {"id": row.id},
+                ).first()
+                if not claimed:
+                    db.rollback()
+                    continue
+                if ev is not None:
+                    ingest_messaging_events(db, [ev])
+                lags += _mark_processed(db, [row.id])
+                db.commit()
+            except Exception as e2:
+                db.rollback()
+                _mark_failed(db, row.id, repr(e2))
+                db.commit()
+                failed += 1
+
+    elapsed = time.perf_counter() - t0
+    processed = len(lags)
+    return {
+        "processed": processed,
+        "failed": failed,
+        "elapsed_ms": round(elapsed * 1000, 1),
+        "events_per_sec": round(processed / elapsed, 1) if elapsed > 0 else None,
+        "max_lag_ms": round(max(lags) * 1000, 1) if lags else None,
+    }
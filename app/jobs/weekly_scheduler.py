@@ -1,6 +1,12 @@
+import logging
+
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 from datetime import datetime, timezone, timedelta
+
+from app.core.logging import get_correlation_id
+
+log = logging.getLogger(__name__)
 WEEKLY_SEND_HOUR_UTC = 13  # Monday 13:00 UTC
 
 def next_monday_utc_at(hour_utc: int) -> datetime:
@@ -16,95 +22,205 @@ def next_monday_utc_at(hour_utc: int) -> datetime:
     return candidate
 
 
+def last_monday_utc_at(hour_utc: int, minute: int = 0) -> datetime:
+    """The latest Monday@hour:minute UTC at or before now: the weekly cron's current fire time."""
+    now = datetime.now(timezone.utc)
+    candidate = (now - timedelta(days=now.weekday())).replace(
+        hour=hour_utc, minute=minute, second=0, microsecond=0
+    )
+    if candidate > now:
+        candidate -= timedelta(days=7)
+    return candidate
+
+
+DEFAULT_CAMPAIGN_ID = "00000000-0000-0000-0000-000000000000"  # keep yours if you have one
+
+# Eligibility + insert for one slice of customers. `{slice}` selects (id, first_name)
+# rows; everything else only looks at customers inside it, and only counts come back.
+_ENQUEUE_SQL = """
+    with slice as (
+      {slice}
+    ),
+    email_identity as (
+      -- pick one email identity per customer (prefer primary)
+      select distinct on (ci.customer_id)
+        ci.customer_id,
+        ci.id as identity_id,
+        ci.value as email
+      from customer_identities ci
+      join slice s on s.id = ci.customer_id
+      where ci.channel = 'email'::channel_type
+      order by ci.customer_id, ci.is_primary desc, ci.id asc
+    ),
+    eligible as (
+      select
+        s.id as customer_id,
+        ei.identity_id,
+        ei.email,
+        s.first_name as name,
+        -- interests stored as customer_attributes(key='interests', value jsonb array)
+        coalesce(ca.value, '[]'::jsonb) as interests
+      from slice s
+      join email_identity ei on ei.customer_id = s.id
+      join current_consents cc
+        on cc.customer_id = s.id
+       and cc.channel = 'email'::channel_type
+       and cc.purpose = 'promotions'
+       and cc.status = 'granted'
+      left join customer_attributes ca
+        on ca.customer_id = s.id
+       and ca.key = 'interests'
+    ),
+    inserted as (
+      insert into message_outbox (
+        campaign_id, customer_id, channel, to_identity_id,
+        template_key, payload, scheduled_for, status
+      )
+      select
+        :campaign_id,
+        e.customer_id,
+        'email'::channel_type,
+        e.identity_id,
+        :template_key,
+        jsonb_build_object(
+          'name', e.name,
+          'email', e.email,
+          'interests', e.interests,
+          -- the worker logs each send under the id of the run that queued it
+          'correlation_id', CAST(:correlation_id AS text)
+        ),
+        :scheduled_for,
+        'queued'::outbox_status
+      from eligible e
+      on conflict (customer_id, channel, template_key, scheduled_for) do nothing
+      returning 1
+    )
+    select
+      (select count(*) from slice) as scanned,
+      (select s.id from slice s order by s.id desc limit 1) as last_customer_id,
+      (select count(*) from inserted) as inserted
+"""
+
+
 def queue_weekly_promo(db, template_key="weekly_promo_v1", scheduled_for=None):
+    """
+    Queues the whole audience in one statement/transaction. See queue_weekly_promo_chunked for big lists.
+    The cron passes its fire time as `scheduled_for`, so a re-run in the same week inserts nothing.
+    The dedupe only sees message_outbox: once app/jobs/outbox_archive.py has moved a
+    week's rows (OUTBOX_ARCHIVE_AFTER_DAYS), re-enqueueing that scheduled_for sends it again.
+    """
     if scheduled_for is None:
         scheduled_for = datetime.now(timezone.utc)
 
-    campaign_id = "00000000-0000-0000-0000-000000000000"  # keep yours if you have one
-    db_info = db.execute(text("""
-    select
-    current_database() as db,
-    current_schema() as schema,
-    current_user as user,
-    inet_server_addr() as server_ip,
-    inet_server_port() as server_port
-    """)).mappings().first()
-    print("DB INFO (queue-weekly):", dict(db_info))
-    result = db.execute(
-    text("""
-        with latest_consent as (
-          select distinct on (customer_id, channel, purpose)
-            customer_id, channel, purpose, status
-          from consents
-          where purpose = 'promotions'
-            and channel = 'email'::channel_type
-          order by customer_id, channel, purpose, created_at desc
-        ),
-        email_identity as (
-          -- pick one email identity per customer (prefer primary)
-          select distinct on (ci.customer_id)
-            ci.customer_id,
-            ci.id as identity_id,
-            ci.value as email
-          from customer_identities ci
-          where ci.channel = 'email'::channel_type
-          order by ci.customer_id, ci.is_primary desc, ci.id asc
-        ),
-        interests as (
-          -- interests stored as customer_attributes(key='interests', value jsonb array)
-          select
-            c.id as customer_id,
-            coalesce(ca.value, '[]'::jsonb) as interests
-          from customers c
-          left join customer_attributes ca
-            on ca.customer_id = c.id
-           and ca.key = 'interests'
-        ),
-        eligible as (
-          select
-            c.id as customer_id,
-            ei.identity_id,
-            ei.email,
-            c.first_name as name,
-            it.interests
-          from customers c
-          join email_identity ei on ei.customer_id = c.id
-          join latest_consent lc on lc.customer_id = c.id and lc.status = 'granted'
-          join interests it on it.customer_id = c.id
-        )
-        insert into message_outbox (
-          campaign_id, customer_id, channel, to_identity_id,
-          template_key, payload, scheduled_for, status
-        )
-        select
-          :campaign_id,
-          e.customer_id,
-          'email'::channel_type,
-          e.identity_id,
-          :template_key,
-          jsonb_build_object(
-            'name', e.name,
-            'email', e.email,
-            'interests', e.interests
-          ),
-          :scheduled_for,
-          'queued'::outbox_status
-        from eligible e
-        on conflict (customer_id, channel, template_key, scheduled_for) do nothing
-        returning id
-    """),
-    {
-        "campaign_id": campaign_id,
-        "template_key": template_key,
-        "scheduled_for": scheduled_for,
-    },
-)
-    count_now = db.execute(text("select count(*) from public.message_outbox")).scalar_one()
-    print("OUTBOX COUNT (before commit):", count_now)
+    row = db.execute(
+        text(_ENQUEUE_SQL.format(slice="select c.id, c.first_name from customers c")),
+        {
+            "campaign_id": DEFAULT_CAMPAIGN_ID,
+            "template_key": template_key,
+            "scheduled_for": scheduled_for,
+            "correlation_id": get_correlation_id(),
+        },
+    ).one()
 
     db.commit()
+    return {"inserted": row.inserted}
+
+
+def queue_weekly_promo_chunked(
+    db,
+    template_key="weekly_promo_v1",
+    scheduled_for=None,
+    chunk_size: int = 1000,
+    campaign_id: str = DEFAULT_CAMPAIGN_ID,
+):
+    """
+    Same result as queue_weekly_promo, walking customers by id in slices of
+    `chunk_size`. Each slice is inserted and committed together with its cursor in
+    enqueue_runs, so a crashed run picks up where it stopped when called again
+    with the same scheduled_for (the cron passes its fire time, so a re-run in the
+    same week resumes). scheduled_for=None starts a fresh run for now; an older
+    unfinished run is never picked up implicitly, it would send last week's mail.
+    Archived rows don't dedupe (see queue_weekly_promo).
+    """
+    if scheduled_for is None:
+        scheduled_for = datetime.now(timezone.utc)
+
+    stale = db.execute(text("""
+        select scheduled_for
+        from enqueue_runs
+        where campaign_id = :campaign_id
+          and template_key = :template_key
+          and finished_at is null
+          and scheduled_for < :scheduled_for
+        order by scheduled_for
+    """), {"campaign_id": campaign_id, "template_key": template_key, "scheduled_for": scheduled_for}).scalars().all()
+    if stale:
+        # left alone: resume one explicitly with its scheduled_for if it should still go out
+        log.warning("unfinished older enqueue runs", extra={"scheduled_for": [s.isoformat() for s in stale]})
+
+    run = db.execute(text("""
+        insert into enqueue_runs (campaign_id, template_key, scheduled_for)
+        values (:campaign_id, :template_key, :scheduled_for)
+        on conflict (campaign_id, template_key, scheduled_for) do update
+        set updated_at = now()
+        returning last_customer_id, scanned, inserted, finished_at
+    """), {"campaign_id": campaign_id, "template_key": template_key, "scheduled_for": scheduled_for}).one()
+    db.commit()
+
+    after = run.last_customer_id
+    scanned = run.scanned
+    inserted = run.inserted
+    chunks = 0
+    slice_sql = """
+      select c.id, c.first_name
+      from customers c
+      where c.id > coalesce(CAST(:after AS uuid), '00000000-0000-0000-0000-000000000000'::uuid)
+      order by c.id
+      limit :chunk_size
+    """
+
+    while run.finished_at is None:
+        row = db.execute(
+            text(_ENQUEUE_SQL.format(slice=slice_sql)),
+            {
+                "after": after,
+                "chunk_size": chunk_size,
+                "campaign_id": campaign_id,
+                "template_key": template_key,
+                "scheduled_for": scheduled_for,
+                "correlation_id": get_correlation_id(),
+            },
+        ).one()
+
+        done = row.scanned < chunk_size
+        scanned += row.scanned
+        inserted += row.inserted
+        after = row.last_customer_id or after
+        chunks += 1
+
+        db.execute(text("""
+            update enqueue_runs
+            set last_customer_id = :after,
+                scanned = :scanned,
+                inserted = :inserted,
+                updated_at = now(),
+                finished_at = case when :done then now() else null end
+            where campaign_id = :campaign_id
+              and template_key = :template_key
+              and scheduled_for = :scheduled_for
+        """), {
+            "after": after,
+            "scanned": scanned,
+            "inserted": inserted,
+            "done": done,
+            "campaign_id": campaign_id,
+            "template_key": template_key,
+            "scheduled_for": scheduled_for,
+        })
+        db.commit()
+        log.info("enqueue chunk", extra={"chunk": chunks, "scanned": scanned, "inserted": inserted})
+
+        if done:
+            break
 
-    count_after = db.execute(text("select count(*) from public.message_outbox")).scalar_one()
-    print("OUTBOX COUNT (after commit):", count_after)
-    inserted = result.fetchall()
-    return {"inserted": len(inserted)}
\ No newline at end of file
+    return {"inserted": inserted, "scanned": scanned, "chunks": chunks, "scheduled_for": scheduled_for.isoformat()}
@@ -3,18 +3,39 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 from pathlib import Path
 
+from app.core.config import DB_ASYNC
+from app.core.logging import CorrelationIdMiddleware, setup_logging
+from app.core.metrics import METRICS_ENABLED, RouteMetricsMiddleware
+from app.db.metrics import add_outbox_collector
+from app.db.session import SessionLocal
 from app.routers.health import router as health_router
-from app.routers.signup import router as signup_router
-from app.routers.unsubscribe import router as unsubscribe_router
 from app.routers.admin import router as admin_router
 from app.routers.admin_dashboard import router as admin_dashboard_router
 from app.routers.db_check import router as db_check_router
 from app.routers.admin_campaigns import router as admin_campaign_router
 from app.routers.admin_api import router as admin_api_router
+from app.routers.admin_export import router as admin_export_router
 from app.routers.admin_ui import router as admin_ui_router
-from app.routers.meta_webhook import router as meta_webhook_router
+from app.routers.metrics import router as metrics_router
+
+# Hot endpoints: async engine or sync Session + threadpool, see DB_ASYNC in app/core/config.py
+if DB_ASYNC:
+    from app.routers.signup_async import router as signup_router
+    from app.routers.unsubscribe_async import router as unsubscribe_router
+    from app.routers.meta_webhook_async import router as meta_webhook_router
+else:
+    from app.routers.signup import router as signup_router
+    from app.routers.unsubscribe import router as unsubscribe_router
+    from app.routers.meta_webhook import router as meta_webhook_router
+
+setup_logging("api")
 app = FastAPI(title="Baby Store Engagement API")
 
+if METRICS_ENABLED:
+    app.add_middleware(RouteMetricsMiddleware)
+app.add_middleware(CorrelationIdMiddleware)
+add_outbox_collector(SessionLocal)
+
 app.include_router(health_router)
 app.include_router(signup_router)
 app.include_router(unsubscribe_router)
@@ -23,8 +44,10 @@ app.include_router(admin_dashboard_router)
 app.include_router(db_check_router)
 app.include_router(admin_campaign_router)
 app.include_router(admin_api_router)
+app.include_router(admin_export_router)
 app.include_router(admin_ui_router)
 app.include_router(meta_webhook_router)
+app.include_router(metrics_router)
 
 
 
@@ -12,6 +12,7 @@ class ChannelType(str, enum.Enum):
     sms = "sms"
     whatsapp = "whatsapp"
     instagram = "instagram"
+    messenger = "messenger"
 
 class ConsentPurpose(str, enum.Enum):
     promotions = "promotions"
@@ -25,6 +26,7 @@ class ConsentStatus(str, enum.Enum):
 
 class OutboxStatus(str, enum.Enum):
     queued = "queued"
+    sending = "sending"
     sent = "sent"
     failed = "failed"
     cancelled = "cancelled"
@@ -1,9 +1,14 @@
 import os
+import uuid
+from datetime import datetime
 from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 
 from app.db.session import get_db
+from app.services.admin_listings import outbox_page
+from app.services.admin_summary import get_summary
+from app.services.identity import resolve_identity
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -16,64 +21,33 @@ def require_admin_key(x_admin_key: str | None = Header(default=None)):
 
 @router.get("/summary", dependencies=[Depends(require_admin_key)])
 def summary(db: Session = Depends(get_db)):
-    counts = db.execute(text("""
-        select
-          (select count(*) from customers) as customers,
-          (select count(*) from customer_identities) as identities,
-          (select count(*) from consents) as consents,
-          (select count(*) from message_outbox) as outbox
-    """)).mappings().one()
-
-    outbox_by_status = db.execute(text("""
-        select status, count(*) as count
-        from message_outbox
-        group by status
-        order by count(*) desc
-    """)).mappings().all()
-
-    # If you have the view; otherwise we’ll fallback to counts from consents
-    try:
-        consent_by_status = db.execute(text("""
-            select status, count(*) as count
-            from v_current_promotions_consent
-            group by status
-            order by count(*) desc
-        """)).mappings().all()
-    except Exception:
-        consent_by_status = []
-
-    return {
-        "counts": dict(counts),
-        "outbox_by_status": outbox_by_status,
-        "current_promotions_consent_by_status": consent_by_status,
-    }
+    return get_summary(db)
 
 @router.get("/outbox", dependencies=[Depends(require_admin_key)])
 def outbox(
     status: str = Query(default="queued"),
     limit: int = Query(default=50, ge=1, le=500),
+    cursor: str | None = Query(default=None),
+    template_key: str | None = Query(default=None),
+    campaign_id: uuid.UUID | None = Query(default=None),
+    created_from: datetime | None = Query(default=None),
+    created_to: datetime | None = Query(default=None),
     db: Session = Depends(get_db),
 ):
-    rows = db.execute(text("""
-        select
-          mo.id as outbox_id,
-          mo.status,
-          mo.template_key,
-          mo.scheduled_for,
-          mo.sent_at,
-          mo.created_at,
-          c.first_name,
-          ci.channel,
-          ci.value as recipient
-        from message_outbox mo
-        join customers c on c.id = mo.customer_id
-        join customer_identities ci on ci.id = mo.to_identity_id
-        where mo.status = :status
-        order by mo.created_at desc
-        limit :limit
-    """), {"status": status, "limit": limit}).mappings().all()
-
-    return {"status": status, "items": rows}
+    try:
+        page = outbox_page(
+            db,
+            limit=limit,
+            status=status,
+            cursor=cursor,
+            template_key=template_key,
+            campaign_id=campaign_id,
+            created_from=created_from,
+            created_to=created_to,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": status, **page}
 
 @router.get("/debug/identity", dependencies=[Depends(require_admin_key)])
 def debug_identity(
@@ -81,18 +55,14 @@ def debug_identity(
     value: str = Query(...),
     db: Session = Depends(get_db),
 ):
-    value_norm = value.strip()
-    if channel.lower() == "instagram":
-        value_norm = value_norm.lstrip("@")
-
-    customer = db.execute(text("""
-        select c.id as customer_id, c.first_name, c.created_at
-        from customers c
-        join customer_identities ci on ci.customer_id = c.id
-        where ci.channel = CAST(:channel AS channel_type)
-          and ci.value = :value
-        limit 1
-    """), {"channel": channel, "value": value_norm}).mappings().first()
+    identity = resolve_identity(db, channel, value)
+    customer = None
+    if identity:
+        customer = db.execute(text("""
+            select c.id as customer_id, c.first_name, c.created_at
+            from customers c
+            where c.id = :customer_id
+        """), {"customer_id": identity[1]}).mappings().first()
 
     if not customer:
         raise HTTPException(status_code=404, detail="Identity not found")
@@ -112,7 +82,7 @@ def debug_identity(
 
     outbox_recent = db.execute(text("""
         select id as outbox_id, status, template_key, scheduled_for, sent_at, created_at
-        from message_outbox
+        from message_outbox_all
         where customer_id = :customer_id
           and channel = CAST(:channel AS channel_type)
         order by created_at desc
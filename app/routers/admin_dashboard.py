@@ -1,9 +1,15 @@
 import os
+import uuid
+from datetime import datetime
 from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 
-from app.db.session import get_db
+from app.core.config import DB_ASYNC
+from app.db.session import get_db, get_pool_status
+from app.services.admin_listings import customers_page, outbox_page
+from app.services.admin_summary import get_summary
+from app.services.identity import resolve_identity
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -16,79 +22,55 @@ def require_admin_key(x_admin_key: str | None = Header(default=None)):
 
 @router.get("/summary", dependencies=[Depends(require_admin_key)])
 def admin_summary(db: Session = Depends(get_db)):
-    counts = db.execute(text("""
-        select
-          (select count(*) from customers) as customers,
-          (select count(*) from customer_identities) as identities,
-          (select count(*) from consents) as consents,
-          (select count(*) from message_outbox) as outbox
-    """)).mappings().one()
+    return get_summary(db)
 
-    outbox_by_status = db.execute(text("""
-        select status, count(*) as count
-        from message_outbox
-        group by status
-        order by count(*) desc
-    """)).mappings().all()
-
-    consent_by_status = db.execute(text("""
-        select status, count(*) as count
-        from v_current_promotions_consent
-        group by status
-        order by count(*) desc
-    """)).mappings().all()
-
-    return {
-        "counts": dict(counts),
-        "outbox_by_status": outbox_by_status,
-        "current_promotions_consent_by_status": consent_by_status,
-    }
+@router.get("/db/pool", dependencies=[Depends(require_admin_key)])
+def admin_db_pool():
+    # this API process's pool: profile (DB_ROLE + overrides), current usage, counters since start
+    status = get_pool_status()
+    if DB_ASYNC:
+        from app.db.async_session import get_async_pool_status
+        status["async"] = get_async_pool_status()
+    return status
 
 @router.get("/outbox", dependencies=[Depends(require_admin_key)])
 def admin_outbox(
     status: str = Query(default="queued"),
     limit: int = Query(default=50, ge=1, le=500),
+    cursor: str | None = Query(default=None),
+    template_key: str | None = Query(default=None),
+    campaign_id: uuid.UUID | None = Query(default=None),
+    created_from: datetime | None = Query(default=None),
+    created_to: datetime | None = Query(default=None),
     db: Session = Depends(get_db),
 ):
-    rows = db.execute(text("""
-        select
-          mo.id as outbox_id,
-          mo.status,
-          mo.template_key,
-          mo.scheduled_for,
-          mo.sent_at,
-          c.first_name,
-          ci.channel,
-          ci.value as recipient
-        from message_outbox mo
-        join customers c on c.id = mo.customer_id
-        join customer_identities ci on ci.id = mo.to_identity_id
-        where mo.status = :status
-        order by mo.created_at desc
-        limit :limit
-    """), {"status": status, "limit": limit}).mappings().all()
-
-    return {"status": status, "items": rows}
+    try:
+        page = outbox_page(
+            db,
+            limit=limit,
+            status=status,
+            cursor=cursor,
+            template_key=template_key,
+            campaign_id=campaign_id,
+            created_from=created_from,
+            created_to=created_to,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": status, **page}
 
 @router.get("/customers/recent", dependencies=[Depends(require_admin_key)])
 def admin_recent_customers(
     limit: int = Query(default=50, ge=1, le=500),
+    cursor: str | None = Query(default=None),
+    created_from: datetime | None = Query(default=None),
+    created_to: datetime | None = Query(default=None),
     db: Session = Depends(get_db),
 ):
-    rows = db.execute(text("""
-        select
-          c.id,
-          c.first_name,
-          c.created_at,
-          jsonb_agg(jsonb_build_object('channel', ci.channel, 'value', ci.value) order by ci.created_at) as identities
-        from customers c
-        left join customer_identities ci on ci.customer_id = c.id
-        group by c.id
-        order by c.created_at desc
-        limit :limit
-    """), {"limit": limit}).mappings().all()
-
-    return {"items": rows}
+    try:
+        return customers_page(db, limit=limit, cursor=cursor, created_from=created_from, created_to=created_to)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/debug/identity", dependencies=[Depends(require_admin_key)])
 def admin_debug_identity(
@@ -96,20 +78,14 @@ def admin_debug_identity(
     value: str = Query(...),
     db: Session = Depends(get_db),
 ):
-    # Normalize similar to frontend behavior for instagram handles
-    if channel == "instagram":
-        value = value.strip().lstrip("@")
-    else:
-        value = value.strip()
-
-    customer = db.execute(text("""
-        select c.id as customer_id, c.first_name, c.created_at
-        from customers c
-        join customer_identities ci on ci.customer_id = c.id
-        where ci.channel = CAST(:channel AS channel_type)
-          and ci.value = :value
-        limit 1
-    """), {"channel": channel, "value": value}).mappings().first()
+    identity = resolve_identity(db, channel, value)
+    customer = None
+    if identity:
+        customer = db.execute(text("""
+            select c.id as customer_id, c.first_name, c.created_at
+            from customers c
+            where c.id = :customer_id
+        """), {"customer_id": identity[1]}).mappings().first()
 
     if not customer:
         raise HTTPException(status_code=404, detail="Identity not found")
@@ -125,7 +101,7 @@ def admin_debug_identity(
 
     outbox_recent = db.execute(text("""
         select id as outbox_id, status, template_key, scheduled_for, sent_at, created_at
-        from message_outbox
+        from message_outbox_all
         where customer_id = :customer_id
           and channel = CAST(:channel AS channel_type)
         order by created_at desc
@@ -1,19 +1,23 @@
 import os
 import hmac
 import hashlib
-from fastapi import APIRouter, Request, HTTPException, Query, Depends
+import logging
+import time
+from fastapi import APIRouter, BackgroundTasks, Request, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import text
-from app.db.session import get_db
+from app.core import fastjson
+from app.db.session import SessionLocal, get_db
+from app.jobs.webhook_inbox import enqueue_meta_payload, process_inbox_batch
 
 router = APIRouter(prefix="/webhooks/meta", tags=["meta-webhooks"])
+log = logging.getLogger(__name__)
 
 VERIFY_TOKEN = os.getenv("IG_WEBHOOK_VERIFY_TOKEN", "")
 app_secret_runtime = os.getenv("META_APP_SECRET", "")
-print("META_APP_SECRET len:", len(app_secret_runtime))
-print("META_APP_SECRET head/tail:", app_secret_runtime[:4], app_secret_runtime[-4:])
-# NEW: feature flag to make local testing easy
-VERIFY_SIGNATURES = os.getenv("META_VERIFY_SIGNATURES", "true").lower() == "true"
+log.info("meta webhook config", extra={"app_secret_set": bool(app_secret_runtime)})
+# Process the inbox right after acknowledging, when webhook_worker.py isn't running
+WEBHOOK_INBOX_INLINE = os.getenv("WEBHOOK_INBOX_INLINE", "false").lower() == "true"
 
 
 def verify_signature(app_secret: str, signature_header: str | None, body: bytes) -> bool:
@@ -22,164 +26,85 @@ def verify_signature(app_secret: str, signature_header: str | None, body: bytes)
     We compute: HMAC_SHA256(app_secret, raw_body)
     """
     if not app_secret:
-        print("SIG DEBUG: APP_SECRET empty -> allow")
+        log.debug("signature check skipped: META_APP_SECRET empty")
         return True
 
     app_secret = app_secret.strip()  # IMPORTANT: remove spaces/newlines
 
     if not signature_header:
-        print("SIG DEBUG: missing signature header")
+        log.debug("signature header missing")
         return False
 
     signature_header = signature_header.strip()
 
     if not signature_header.startswith("sha256="):
-        print("SIG DEBUG: bad signature format:", signature_header[:20])
+        log.debug("signature header malformed")
         return False
 
     their_sig = signature_header.split("sha256=", 1)[1].strip()
     our_sig = hmac.new(app_secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
 
-    # Debug (safe): compare only prefix
-    print("SIG DEBUG: their:", their_sig[:12], "our:", our_sig[:12], "body_len:", len(body), "secret_len:", len(app_secret))
-
     ok = hmac.compare_digest(their_sig, our_sig)
-    print("SIG DEBUG: match:", ok)
+    log.debug("signature checked", extra={"match": ok, "body_len": len(body)})
     return ok
 
 @router.get("")
 async def verify_webhook(request: Request):
-    print("FULL QUERY:", request.query_params)
-
     hub_mode = request.query_params.get("hub.mode")
     hub_verify_token = request.query_params.get("hub.verify_token")
     hub_challenge = request.query_params.get("hub.challenge")
 
-    print("hub_mode:", hub_mode)
-    print("hub_verify_token:", hub_verify_token)
-    print("hub_challenge:", hub_challenge)
+    log.debug("verify request", extra={"hub_mode": hub_mode, "token_ok": hub_verify_token == VERIFY_TOKEN})
 
     if hub_mode == "subscribe" and hub_verify_token == VERIFY_TOKEN:
         return hub_challenge or ""
 
     raise HTTPException(status_code=403, detail="Verification failed")
 @router.post("")
-async def receive_webhook(request: Request, db: Session = Depends(get_db)):
+async def receive_webhook(request: Request, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     raw = await request.body()
 
     # Verify signature if configured
     sig = request.headers.get("x-hub-signature-256")
-    print("META SIG HEADER:", sig)
-    print("APP_SECRET set?:", bool(app_secret_runtime), "len:", len(app_secret_runtime or ""))
-    print("RAW BODY len:", len(raw))
     if app_secret_runtime and not verify_signature(app_secret_runtime, sig, raw):
         raise HTTPException(status_code=403, detail="Invalid signature")
 
-    payload = await request.json()
-    entries = payload.get("entry", [])
+    # Parse the same bytes we just signed instead of request.json() parsing them again
+    try:
+        payload = fastjson.loads(raw)
+    except fastjson.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
 
-    captured = []
+    # Acknowledge fast: only persist the events here; customers/identities/consents are
+    # handled by webhook_worker.py (or the in-process drain below).
+    t0 = time.perf_counter()
+    queued = await run_in_threadpool(_store, db, payload)
+    log.debug("webhook inbox queued", extra={"queued": queued, "ms": round((time.perf_counter() - t0) * 1000, 1)})
+
+    if WEBHOOK_INBOX_INLINE and queued:
+        background_tasks.add_task(_drain_inbox)
+    return {"ok": True, "queued": queued}
 
-    try:
-        for entry in entries:
-            for ev in entry.get("messaging", []):
-                sender = ev.get("sender", {}).get("id")
-                message = ev.get("message", {}) or {}
-                text_msg = (message.get("text") or "").strip()
-
-                if not sender:
-                    continue
-
-                channel = "messenger"  # later: detect facebook vs instagram
-                sender_value = str(sender)
-
-                # 1) Find existing identity (prevents duplicate customers)
-                row = db.execute(
-                    text("""
-                        select ci.id as identity_id, ci.customer_id
-                        from customer_identities ci
-                        where ci.channel = CAST(:channel AS channel_type)
-                          and ci.value = :value
-                        limit 1
-                    """),
-                    {"channel": channel, "value": sender_value},
-                ).first()
-
-                if row:
-                    identity_id = row.identity_id
-                    customer_id = row.customer_id
-                else:
-                    # 2) Create customer
-                    customer_id = db.execute(
-                        text("""
-                            insert into customers (first_name)
-                            values (:first_name)
-                            returning id
-                        """),
-                        {"first_name": "IG Lead"},
-                    ).scalar_one()
-
-                    # 3) Create identity (NO reassignment on conflict)
-                    identity_id = db.execute(
-                        text("""
-                            insert into customer_identities (customer_id, channel, value, is_primary)
-                            values (:customer_id, CAST(:channel AS channel_type), :value, true)
-                            on conflict (channel, value) do nothing
-                            returning id
-                        """),
-                        {"customer_id": customer_id, "channel": channel, "value": sender_value},
-                    ).scalar_one_or_none()
-
-                    # If a race happened and identity already existed, fetch it
-                    if identity_id is None:
-                        row2 = db.execute(
-                            text("""
-                                select ci.id as identity_id, ci.customer_id
-                                from customer_identities ci
-                                where ci.channel = CAST(:channel AS channel_type)
-                                  and ci.value = :value
-                                limit 1
-                            """),
-                            {"channel": channel, "value": sender_value},
-                        ).first()
-                        if not row2:
-                            raise RuntimeError("Identity insert race: could not fetch existing identity")
-                        identity_id = row2.identity_id
-                        customer_id = row2.customer_id
-
-                # 4) Consent only if explicit keyword (ANTI-DUPE: only insert if not currently granted)
-                if text_msg.lower() in {"alta", "si", "si promos", "acepto"}:
-                    db.execute(
-                        text("""
-                            insert into consents (customer_id, channel, purpose, status)
-                            select
-                              :customer_id,
-                              CAST(:channel AS channel_type),
-                              'promotions',
-                              'granted'
-                            where not exists (
-                              select 1
-                              from consents
-                              where customer_id = :customer_id
-                                and channel = CAST(:channel AS channel_type)
-                                and purpose = 'promotions'
-                                and status = 'granted'
-                            )
-                        """),
-                        {"customer_id": customer_id, "channel": channel},
-                    )
-
-                captured.append({
-                    "channel": channel,
-                    "sender_id": sender_value,
-                    "text": text_msg,
-                    "customer_id": str(customer_id),
-                    "identity_id": str(identity_id),
-                })
 
+def _store(db: Session, payload: dict) -> int:
+    try:
+        queued = enqueue_meta_payload(db, payload)
         db.commit()
-        return {"ok": True, "captured": captured}
+        return queued
+    except Exception:
+        db.rollback()
+        raise
 
+
+def _drain_inbox():
+    # Runs after the response is sent, in the threadpool; with its own session since
+    # the request's one may already be closed.
+    db = SessionLocal()
+    try:
+        info = process_inbox_batch(db)
+        log.debug("webhook inbox inline batch", extra=info)
     except Exception:
         db.rollback()
-        raise
\ No newline at end of file
+        log.exception("webhook inbox inline drain failed")
+    finally:
+        db.close()
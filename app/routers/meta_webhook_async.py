@@ -0,0 +1,48 @@
+import logging
+import time
+from fastapi import APIRouter, BackgroundTasks, Request, HTTPException, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core import fastjson
+from app.db.async_session import get_async_db
+from app.jobs.webhook_inbox import enqueue_meta_payload_async
+from app.routers.meta_webhook import (
+    WEBHOOK_INBOX_INLINE,
+    _drain_inbox,
+    app_secret_runtime,
+    verify_signature,
+    verify_webhook,
+)
+
+# app/routers/meta_webhook.py with the inbox insert on the async engine (DB_ASYNC=true).
+# The inline drain (WEBHOOK_INBOX_INLINE) is the heavy part and stays sync, in the threadpool.
+router = APIRouter(prefix="/webhooks/meta", tags=["meta-webhooks"])
+log = logging.getLogger(__name__)
+
+router.add_api_route("", verify_webhook, methods=["GET"])
+
+
+@router.post("")
+async def receive_webhook(request: Request, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_async_db)):
+    raw = await request.body()
+
+    sig = request.headers.get("x-hub-signature-256")
+    if app_secret_runtime and not verify_signature(app_secret_runtime, sig, raw):
+        raise HTTPException(status_code=403, detail="Invalid signature")
+
+    try:
+        payload = fastjson.loads(raw)
+    except fastjson.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+
+    t0 = time.perf_counter()
+    try:
+        queued = await enqueue_meta_payload_async(db, payload)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    log.debug("webhook inbox queued", extra={"queued": queued, "ms": round((time.perf_counter() - t0) * 1000, 1)})
+
+    if WEBHOOK_INBOX_INLINE and queued:
+        background_tasks.add_task(_drain_inbox)
+    return {"ok": True, "queued": queued}
@@ -0,0 +1,20 @@
+import hmac
+import os
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import Response
+
+from app.core.metrics import CONTENT_TYPE, REGISTRY
+
+router = APIRouter(tags=["metrics"])
+
+# Optional: Prometheus sends it as `authorization: credentials` (Bearer) in the scrape config
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics(authorization: str | None = Header(default=None)):
+    if METRICS_TOKEN and not hmac.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    # sync def: the outbox collector queries the DB, keep it off the event loop
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -1,13 +1,14 @@
+import logging
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from sqlalchemy import text
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
 from app.db.session import get_db
-from app.schemas.signup import SignupRequest, validate_mx
-from app.services.signup_service import create_signup
-import json
+from app.schemas.signup import SignupRequest, validate_mx_async
+from app.services.signup_service import upsert_signup
 
 router = APIRouter(tags=["signup"])
+log = logging.getLogger(__name__)
 
 #@router.post("/signup")
 #def signup(payload: SignupRequest, db: Session = Depends(get_db)):
@@ -18,69 +19,21 @@ router = APIRouter(tags=["signup"])
 #from sqlalchemy import text
 
 @router.post("/signup")
-def signup(payload: SignupRequest, db: Session = Depends(get_db)):
-    try:
-        db_info = db.execute(text("select current_database() as db, current_schema() as schema")).first()
-        print("DB INFO:", dict(db_info._mapping) if db_info else None)
-
-        print("SIGNUP PAYLOAD:", payload.model_dump())
-
-        validate_mx(payload.email)
+async def signup(payload: SignupRequest, db: Session = Depends(get_db)):
+    # MX check is async and cached; a bad domain is a 400, not a failed signup
+    await validate_mx_async(payload.email)
+    return await run_in_threadpool(_signup_db, payload, db)
 
-        # 1) customer
-        customer_id = db.execute(
-            text("""
-                insert into customers (first_name)
-                values (:first_name)
-                returning id
-            """),
-            {"first_name": payload.name.strip()},
-        ).scalar_one()
-        print("INSERT customer_id:", customer_id)
-
-        # 2) identity
-        identity_id = db.execute(
-            text("""
-                insert into customer_identities (customer_id, channel, value, is_primary)
-                values (:customer_id, 'email'::channel_type, :value, true)
-                returning id
-            """),
-            {"customer_id": customer_id, "value": payload.email.strip().lower()},
-        ).scalar_one()
-        print("INSERT identity_id:", identity_id)
-        # 2.5) Save interests (jsonb array) as customer attribute
-        if getattr(payload, "interests", None):
-            db.execute(
-                text("""
-                    insert into customer_attributes (customer_id, key, value)
-                    values (:customer_id, 'interests', to_jsonb(CAST(:interests AS json)))
-                    on conflict (customer_id, key) do update
-                    set value = excluded.value,
-                        updated_at = now()
-                """),
-                {
-                    "customer_id": customer_id,
-                    "interests": json.dumps(payload.interests),
-                },
-            )
-            print("INSERT interests:", payload.interests)
-        # 3) consent (optional)
-        if getattr(payload, "consent_promotions", True):
-            db.execute(
-                text("""
-                    insert into consents (customer_id, channel, purpose, status)
-                    values (:customer_id, 'email'::channel_type, 'promotions', 'granted')
-                """),
-                {"customer_id": customer_id},
-            )
-            print("INSERT consent granted")
 
+def _signup_db(payload: SignupRequest, db: Session):
+    try:
+        customer_id, identity_id = upsert_signup(db, payload)
         db.commit()
-        print("COMMIT DONE")
+        log.debug("signup ok", extra={"customer_id": customer_id, "identity_id": identity_id})
 
         return {"ok": True, "customer_id": str(customer_id), "identity_id": str(identity_id)}
 
     except Exception as e:
         db.rollback()
-        print("SIGNUP ERROR:", repr(e))
-        raise HTTPException(status_code=500, detail=f"signup failed: {repr(e)}")
\ No newline at end of file
+        log.exception("signup failed")
+        raise HTTPException(status_code=500, detail=f"signup failed: {repr(e)}")
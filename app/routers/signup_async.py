@@ -0,0 +1,28 @@
+import logging
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.async_session import get_async_db
+from app.schemas.signup import SignupRequest, validate_mx_async
+from app.services.signup_service import upsert_signup_async
+
+# POST /signup on the async engine (DB_ASYNC=true): no threadpool hop, the event loop
+# waits on Postgres directly. Same behaviour as app/routers/signup.py.
+router = APIRouter(tags=["signup"])
+log = logging.getLogger(__name__)
+
+
+@router.post("/signup")
+async def signup(payload: SignupRequest, db: AsyncSession = Depends(get_async_db)):
+    await validate_mx_async(payload.email)
+    try:
+        customer_id, identity_id = await upsert_signup_async(db, payload)
+        await db.commit()
+        log.debug("signup ok", extra={"customer_id": customer_id, "identity_id": identity_id})
+
+        return {"ok": True, "customer_id": str(customer_id), "identity_id": str(identity_id)}
+
+    except Exception as e:
+        await db.rollback()
+        log.exception("signup failed")
+        raise HTTPException(status_code=500, detail=f"signup failed: {repr(e)}")
@@ -1,45 +1,126 @@
-from fastapi import APIRouter, HTTPException, Query, Depends
+import html
+
+from fastapi import APIRouter, HTTPException, Query, Depends, Request
+from fastapi.responses import HTMLResponse, Response
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from sqlalchemy import text
+from app.core import fastjson
 from app.db.session import get_db
+from app.services.identity import resolve_identity
+from app.services.unsubscribe_tokens import InvalidUnsubscribeToken, verify_unsubscribe_token
 
 router = APIRouter()
 
-@router.get("/unsubscribe")
+UNSUBSCRIBED_MESSAGE = {"message": "Te diste de baja correctamente."}
+
+# Link scanners and mail-client prefetch GET these URLs, so a GET only shows this
+# form; the revocation happens on its POST (or the RFC 8058 one-click POST).
+_CONFIRM_PAGE = """<!doctype html>
+<html lang="es"><head><meta charset="utf-8"><meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Darte de baja</title></head>
+<body style="font-family:sans-serif;max-width:32rem;margin:3rem auto;padding:0 1rem">
+<p>¿Querés dejar de recibir nuestras promociones?</p>
+<form method="post" action="{action}"><button type="submit">Darme de baja</button></form>
+</body></html>"""
+
+_DONE_PAGE = """<!doctype html>
+<html lang="es"><head><meta charset="utf-8"><title>Baja confirmada</title></head>
+<body style="font-family:sans-serif;max-width:32rem;margin:3rem auto;padding:0 1rem">
+<p>{message}</p>
+</body></html>"""
+
+
+def confirm_page(action: str) -> HTMLResponse:
+    return HTMLResponse(_CONFIRM_PAGE.format(action=html.escape(action)))
+
+
+def done_page() -> HTMLResponse:
+    return HTMLResponse(_DONE_PAGE.format(message=html.escape(UNSUBSCRIBED_MESSAGE["message"])))
+
+
+# Repeated POSTs (provider retries, double clicks) only append a 'revoked' row when
+# the current promotions consent isn't already revoked.
+REVOKE_PROMOTIONS_SQL = """
+    insert into consents (customer_id, channel, purpose, status, revoked_at, proof)
+    select :customer_id,
+           CAST(:channel AS channel_type),
+           'promotions'::consent_purpose,
+           'revoked'::consent_status,
+           now(),
+           CAST(:proof AS jsonb)
+    where not exists (
+      select 1
+      from current_consents cc
+      where cc.customer_id = :customer_id
+        and cc.channel = CAST(:channel AS channel_type)
+        and cc.purpose = 'promotions'
+        and cc.status = 'revoked'
+    )
+"""
+
+
+def revoke_promotions(db: Session, customer_id, channel: str, via: str) -> bool:
+    """Revokes promotions consent unless it already is. Returns True if a row was written. Commits."""
+    result = db.execute(
+        text(REVOKE_PROMOTIONS_SQL),
+        {"customer_id": customer_id, "channel": channel, "proof": fastjson.dumps({"via": via})},
+    )
+    db.commit()
+    return result.rowcount > 0
+
+
+def _verify(token: str):
+    try:
+        return verify_unsubscribe_token(token)
+    except InvalidUnsubscribeToken:
+        raise HTTPException(status_code=404, detail="Link de baja inválido")
+
+
+def _revoke_from_token(db: Session, token: str, via: str):
+    customer_id, channel = _verify(token)
+    try:
+        revoke_promotions(db, customer_id, channel, via)
+    except IntegrityError:
+        # customer deleted since the email went out: nothing left to unsubscribe
+        db.rollback()
+
+
+@router.get("/unsubscribe/{token}", response_class=HTMLResponse)
+def unsubscribe_link(token: str, request: Request):
+    # no DB and no write: just check the token and ask
+    _verify(token)
+    return confirm_page(f"{request.url.path}?confirm=1")
+
+
+@router.post("/unsubscribe/{token}")
+def unsubscribe_one_click(token: str, confirm: bool = Query(False), db: Session = Depends(get_db)):
+    if confirm:
+        # the form on the GET page
+        _revoke_from_token(db, token, via="link")
+        return done_page()
+    # RFC 8058: mailbox providers POST "List-Unsubscribe=One-Click" here; no body needed back
+    _revoke_from_token(db, token, via="one_click")
+    return Response(status_code=200)
+
+
+@router.get("/unsubscribe", response_class=HTMLResponse)
+def unsubscribe_confirm(request: Request, channel: str = Query(...), value: str = Query(...)):
+    # Links in emails sent before signed tokens; same query string on the POST
+    return confirm_page(f"{request.url.path}?{request.url.query}")
+
+
+@router.post("/unsubscribe", response_class=HTMLResponse)
 def unsubscribe(
     channel: str = Query(...),
     value: str = Query(...),
     db: Session = Depends(get_db)
 ):
-    result = db.execute(
-        text("""
-            select c.id
-            from customers c
-            join customer_identities ci on ci.customer_id = c.id
-            where ci.channel = CAST(:channel AS channel_type)
-            and ci.value = :value
-        """),
-        {"channel": channel, "value": value}
-    ).fetchone()
-
-    if not result:
-        raise HTTPException(status_code=404, detail="Contacto no encontrado")
+    identity = resolve_identity(db, channel, value)
 
-    customer_id = result[0]
-
-    db.execute(
-        text("""
-            insert into consents (customer_id, channel, purpose, status, revoked_at, proof)
-            values (:customer_id,
-                    CAST(:channel AS channel_type),
-                    'promotions'::consent_purpose,
-                    'revoked'::consent_status,
-                    now(),
-                    '{}'::jsonb)
-        """),
-        {"customer_id": customer_id, "channel": channel}
-    )
+    if not identity:
+        raise HTTPException(status_code=404, detail="Contacto no encontrado")
 
-    db.commit()
+    revoke_promotions(db, identity[1], channel, via="legacy_link")
 
-    return {"message": "Te diste de baja correctamente."}
+    return done_page()
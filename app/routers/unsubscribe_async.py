@@ -0,0 +1,67 @@
+from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi.responses import HTMLResponse, Response
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from app.core import fastjson
+from app.db.async_session import get_async_db
+from app.routers.unsubscribe import (
+    REVOKE_PROMOTIONS_SQL,
+    _verify,
+    done_page,
+    unsubscribe_confirm,
+    unsubscribe_link,
+)
+from app.services.identity import resolve_identity_async
+
+# The /unsubscribe endpoints of app/routers/unsubscribe.py on the async engine (DB_ASYNC=true)
+router = APIRouter()
+
+
+async def revoke_promotions_async(db: AsyncSession, customer_id, channel: str, via: str) -> bool:
+    """Revokes promotions consent unless it already is. Returns True if a row was written. Commits."""
+    result = await db.execute(
+        text(REVOKE_PROMOTIONS_SQL),
+        {"customer_id": customer_id, "channel": channel, "proof": fastjson.dumps({"via": via})},
+    )
+    await db.commit()
+    return result.rowcount > 0
+
+
+async def _revoke_from_token(db: AsyncSession, token: str, via: str):
+    customer_id, channel = _verify(token)
+    try:
+        await revoke_promotions_async(db, customer_id, channel, via)
+    except IntegrityError:
+        # customer deleted since the email went out: nothing left to unsubscribe
+        await db.rollback()
+
+
+# The GET confirmation pages touch no DB: same handlers as the sync router
+router.add_api_route("/unsubscribe/{token}", unsubscribe_link, methods=["GET"], response_class=HTMLResponse)
+router.add_api_route("/unsubscribe", unsubscribe_confirm, methods=["GET"], response_class=HTMLResponse)
+
+
+@router.post("/unsubscribe/{token}")
+async def unsubscribe_one_click(token: str, confirm: bool = Query(False), db: AsyncSession = Depends(get_async_db)):
+    if confirm:
+        await _revoke_from_token(db, token, via="link")
+        return done_page()
+    await _revoke_from_token(db, token, via="one_click")
+    return Response(status_code=200)
+
+
+@router.post("/unsubscribe", response_class=HTMLResponse)
+async def unsubscribe(
+    channel: str = Query(...),
+    value: str = Query(...),
+    db: AsyncSession = Depends(get_async_db)
+):
+    identity = await resolve_identity_async(db, channel, value)
+
+    if not identity:
+        raise HTTPException(status_code=404, detail="Contacto no encontrado")
+
+    await revoke_promotions_async(db, identity[1], channel, via="legacy_link")
+
+    return done_page()
@@ -1,21 +1,87 @@
+import os
+
+# before anything imports app.db.session: picks this process's pool profile
+os.environ.setdefault("DB_ROLE", "scheduler")
+
+import logging
+
 from apscheduler.schedulers.blocking import BlockingScheduler
+from app.core.logging import correlation, setup_logging
+from app.core.metrics import start_metrics_server, track_job
 from app.db.session import SessionLocal
-from app.jobs.weekly_scheduler import queue_weekly_promo
+from app.jobs.weekly_scheduler import last_monday_utc_at, queue_weekly_promo, queue_weekly_promo_chunked
+from app.jobs.outbox_archive import archive
+from app.jobs.stats_counters import fold, reconcile
+
+# 0 = old single-statement enqueue
+WEEKLY_ENQUEUE_CHUNK_SIZE = int(os.getenv("WEEKLY_ENQUEUE_CHUNK_SIZE", "1000"))
+WEEKLY_HOUR_UTC, WEEKLY_MINUTE_UTC = 13, 0  # Monday, see the cron below
+SCHEDULER_METRICS_PORT = int(os.getenv("SCHEDULER_METRICS_PORT", "9102"))  # 0: no /metrics listener
+
+log = logging.getLogger("scheduler")
 
 def run_weekly():
     db = SessionLocal()
     try:
-        info = queue_weekly_promo(db)
-        print("Weekly queue:", info)
-        db.commit()
-    except Exception as e:
+        # one correlation id per run: it is stored on every outbox row it queues
+        with track_job("weekly"), correlation():
+            # keyed on this week's fire time: a retry in the same week resumes its run
+            fire_time = last_monday_utc_at(WEEKLY_HOUR_UTC, WEEKLY_MINUTE_UTC)
+            if WEEKLY_ENQUEUE_CHUNK_SIZE > 0:
+                info = queue_weekly_promo_chunked(db, scheduled_for=fire_time, chunk_size=WEEKLY_ENQUEUE_CHUNK_SIZE)
+            else:
+                info = queue_weekly_promo(db, scheduled_for=fire_time)
+            log.info("weekly queue", extra=info)
+            db.commit()
+    except Exception:
+        db.rollback()
+        log.exception("weekly job failed")
+    finally:
+        db.close()
+
+def run_reconcile():
+    db = SessionLocal()
+    try:
+        with track_job("stats_reconcile"), correlation():
+            log.info("stats counters reconciled", extra={"fixed": reconcile(db)})
+    except Exception:
+        db.rollback()
+        log.exception("stats reconcile failed")
+    finally:
+        db.close()
+
+def run_stats_fold():
+    db = SessionLocal()
+    try:
+        with track_job("stats_fold"):
+            log.debug("stats deltas folded", extra={"folded": fold(db)})
+    except Exception:
+        db.rollback()
+        log.exception("stats fold failed")
+    finally:
+        db.close()
+
+def run_archive():
+    db = SessionLocal()
+    try:
+        with track_job("outbox_archive"), correlation():
+            log.info("outbox archived", extra=archive(db))
+    except Exception:
         db.rollback()
-        print("SCHEDULER ERROR:", repr(e))
+        log.exception("outbox archive failed")
     finally:
         db.close()
 
 if __name__ == "__main__":
+    setup_logging("scheduler")
+    start_metrics_server(SCHEDULER_METRICS_PORT)
     sched = BlockingScheduler(timezone="UTC")
-    sched.add_job(run_weekly, "cron", day_of_week="mon", hour=13, minute=0)
-    print("Scheduler started (weekly promo cron).")
+    sched.add_job(run_weekly, "cron", day_of_week="mon", hour=WEEKLY_HOUR_UTC, minute=WEEKLY_MINUTE_UTC)
+    # Full recount of the /admin/summary counters, off-peak
+    sched.add_job(run_reconcile, "cron", hour=4, minute=30)
+    # Triggers append counter deltas; fold them so stats_counter_totals stays a short read
+    sched.add_job(run_stats_fold, "interval", minutes=1)
+    # Move finished outbox rows to message_outbox_archive (app/jobs/outbox_archive.py)
+    sched.add_job(run_archive, "cron", hour=5, minute=0)
+    log.info("scheduler started (weekly promo cron)")
     sched.start()
\ No newline at end of file
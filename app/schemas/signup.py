@@ -1,8 +1,10 @@
 from pydantic import BaseModel, Field, EmailStr
 from typing import Literal, Optional, List
-import dns.resolver
+import os
 from fastapi import HTTPException
 
+from app.services.mx_cache import MXValidator
+
 Channel = Literal["email", "instagram", "whatsapp", "sms"]
 BabyStage = Literal["pregnant", "0_6m", "6_12m", "1_3y", "3y_plus"]
 
@@ -22,9 +24,27 @@ class SignupOut(BaseModel):
     customer_id: str
     identity_id: str
 
+mx_validator = MXValidator(
+    ttl=float(os.getenv("MX_CACHE_TTL_SECONDS", str(6 * 3600))),
+    negative_ttl=float(os.getenv("MX_NEGATIVE_TTL_SECONDS", "600")),
+)
+
+
 def validate_mx(email: str):
     domain = email.split("@")[1]
     try:
-        dns.resolver.resolve(domain, "MX")
+        ok = mx_validator.has_mx(domain)
+    except Exception:
+        ok = False
+    if not ok:
+        raise HTTPException(status_code=400, detail="Email domain not valid")
+
+
+async def validate_mx_async(email: str):
+    domain = email.split("@")[1]
+    try:
+        ok = await mx_validator.has_mx_async(domain)
     except Exception:
-        raise HTTPException(status_code=400, detail="Email domain not valid")
\ No newline at end of file
+        ok = False
+    if not ok:
+        raise HTTPException(status_code=400, detail="Email domain not valid")
@@ -0,0 +1,205 @@
+"""
+Outbox and customer listings for the admin routers, paged with a keyset cursor on
+(created_at, id) so page 1000 costs the same as page 1 (see migrations/010_admin_listing_indexes.sql).
+The query builders take limit=None for the export endpoints, which stream the whole result.
+"""
+import base64
+import uuid
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+OUTBOX_COLUMNS = """
+    mo.id as outbox_id,
+    mo.status,
+    mo.template_key,
+    mo.campaign_id,
+    mo.scheduled_for,
+    mo.sent_at,
+    mo.created_at,
+    mo.attempts,
+    mo.next_attempt_at,
+    mo.last_error,
+    mo.archived_at,
+    c.first_name,
+    ci.channel,
+    ci.value as recipient
+"""
+
+
+def encode_cursor(created_at: datetime, row_id) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """Inverse of encode_cursor. Raises ValueError on anything it didn't produce."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, row_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), uuid.UUID(row_id)
+    except Exception as e:
+        raise ValueError(f"invalid cursor: {cursor!r}") from e
+
+
+def _keyset(alias: str, cursor: str | None, created_from, created_to, where: list[str], params: dict):
+    if cursor:
+        params["cursor_ts"], params["cursor_id"] = decode_cursor(cursor)
+        where.append(f"({alias}.created_at, {alias}.id) < (:cursor_ts, :cursor_id)")
+    if created_from is not None:
+        where.append(f"{alias}.created_at >= :created_from")
+        params["created_from"] = created_from
+    if created_to is not None:
+        where.append(f"{alias}.created_at < :created_to")
+        params["created_to"] = created_to
+
+
+def outbox_query(
+    status: str | None = None,
+    template_key: str | None = None,
+    campaign_id: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    cursor: str | None = None,
+    limit: int | None = None,
+):
+    """
+    (sql, params) for outbox rows with recipient, newest first. Reads message_outbox_all
+    (live + archived, migrations/012): each branch walks its own (created_at, id) index.
+    """
+    where: list[str] = []
+    params: dict = {}
+    if status is not None:
+        where.append("mo.status = CAST(:status AS outbox_status)")
+        params["status"] = status
+    if template_key is not None:
+        where.append("mo.template_key = :template_key")
+        params["template_key"] = template_key
+    if campaign_id is not None:
+        where.append("mo.campaign_id = :campaign_id")
+        params["campaign_id"] = campaign_id
+    _keyset("mo", cursor, created_from, created_to, where, params)
+
+    sql = f"""
+        select {OUTBOX_COLUMNS}
+        from message_outbox_all mo
+        join customers c on c.id = mo.customer_id
+        join customer_identities ci on ci.id = mo.to_identity_id
+        {"where " + " and ".join(where) if where else ""}
+        order by mo.created_at desc, mo.id desc
+    """
+    if limit is not None:
+        sql += " limit :limit"
+        params["limit"] = limit
+    return text(sql), params
+
+
+def customers_query(
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    cursor: str | None = None,
+    limit: int | None = None,
+):
+    """
+    (sql, params) for customers with their identities, newest first. The page of
+    customers is cut first; identities are aggregated only for those rows.
+    """
+    where: list[str] = []
+    params: dict = {}
+    _keyset("c", cursor, created_from, created_to, where, params)
+
+    limit_sql = ""
+    if limit is not None:
+        limit_sql = "limit :limit"
+        params["limit"] = limit
+
+    sql = f"""
+        with page as (
+          select c.id, c.first_name, c.created_at
+          from customers c
+          {"where " + " and ".join(where) if where else ""}
+          order by c.created_at desc, c.id desc
+          {limit_sql}
+        )
+        select
+          p.id,
+          p.first_name,
+          p.created_at,
+          coalesce(ids.identities, '[]'::jsonb) as identities
+        from page p
+        left join lateral (
+          select jsonb_agg(jsonb_build_object('channel', ci.channel, 'value', ci.value) order by ci.created_at) as identities
+          from customer_identities ci
+          where ci.customer_id = p.id
+        ) ids on true
+        order by p.created_at desc, p.id desc
+    """
+    return text(sql), params
+
+
+def consents_query(
+    channel: str | None = None,
+    purpose: str | None = None,
+    status: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    cursor: str | None = None,
+    limit: int | None = None,
+):
+    """(sql, params) for the consents history (every grant/revoke, not just the current state), newest first."""
+    where: list[str] = []
+    params: dict = {}
+    if channel is not None:
+        where.append("co.channel = CAST(:channel AS channel_type)")
+        params["channel"] = channel
+    if purpose is not None:
+        where.append("co.purpose = CAST(:purpose AS consent_purpose)")
+        params["purpose"] = purpose
+    if status is not None:
+        where.append("co.status = CAST(:status AS consent_status)")
+        params["status"] = status
+    _keyset("co", cursor, created_from, created_to, where, params)
+
+    sql = f"""
+        select
+          co.id as consent_id,
+          co.customer_id,
+          c.first_name,
+          co.channel,
+          co.purpose,
+          co.status,
+          co.granted_at,
+          co.revoked_at,
+          co.created_at
+        from consents co
+        join customers c on c.id = co.customer_id
+        {"where " + " and ".join(where) if where else ""}
+        order by co.created_at desc, co.id desc
+    """
+    if limit is not None:
+        sql += " limit :limit"
+        params["limit"] = limit
+    return text(sql), params
+
+
+def _page(db: Session, query, params: dict, limit: int, id_key: str) -> dict:
+    # one extra row tells us whether there is a next page
+    params = {**params, "limit": limit + 1}
+    rows = db.execute(query, params).mappings().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last["created_at"], last[id_key])
+    return {"items": rows, "next_cursor": next_cursor}
+
+
+def outbox_page(db: Session, limit: int = 50, **filters) -> dict:
+    query, params = outbox_query(limit=limit, **filters)
+    return _page(db, query, params, limit, "outbox_id")
+
+
+def customers_page(db: Session, limit: int = 50, **filters) -> dict:
+    query, params = customers_query(limit=limit, **filters)
+    return _page(db, query, params, limit, "id")
@@ -0,0 +1,81 @@
+import os
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# /admin/ui refreshes the summary on every load; a few seconds of staleness is fine
+SUMMARY_TTL_SECONDS = float(os.getenv("ADMIN_SUMMARY_TTL_SECONDS", "10"))
+
+TOTALS = ("customers", "identities", "consents", "outbox")
+
+# The same numbers stats_counters holds, computed with full scans (reconcile / fallback)
+_LIVE_COUNTERS_SQL = """
+    select 'customers' as name, count(*) as value from customers
+    union all select 'identities', count(*) from customer_identities
+    union all select 'consents', count(*) from consents
+    union all select 'outbox', count(*) from message_outbox_all
+    union all
+    select 'outbox:' || status, count(*) from message_outbox_all group by status
+    union all
+    select 'promotions_consent:' || status, count(*)
+    from current_consents
+    where purpose = 'promotions'
+    group by status
+"""
+
+_cache_lock = threading.Lock()
+_cache: tuple[float, dict] | None = None
+
+
+def live_counters(db: Session) -> dict[str, int]:
+    return {r.name: int(r.value) for r in db.execute(text(_LIVE_COUNTERS_SQL))}
+
+
+def stored_counters(db: Session) -> dict[str, int]:
+    return {r.name: int(r.value) for r in db.execute(text("select name, value from stats_counter_totals"))}
+
+
+def _by_status(counters: dict[str, int], prefix: str) -> list[dict]:
+    rows = [
+        {"status": name[len(prefix):], "count": value}
+        for name, value in counters.items()
+        if name.startswith(prefix) and value
+    ]
+    return sorted(rows, key=lambda r: r["count"], reverse=True)
+
+
+def build_summary(counters: dict[str, int]) -> dict:
+    return {
+        "counts": {name: counters.get(name, 0) for name in TOTALS},
+        "outbox_by_status": _by_status(counters, "outbox:"),
+        "current_promotions_consent_by_status": _by_status(counters, "promotions_consent:"),
+    }
+
+
+def get_summary(db: Session, ttl: float = SUMMARY_TTL_SECONDS) -> dict:
+    """
+    /admin/summary payload from stats_counter_totals (a few rows plus the deltas
+    not folded yet, whatever the table sizes), cached in-process for `ttl` seconds. Until the counters have been
+    filled (python -m app.jobs.stats_counters reconcile) it falls back to counting.
+    """
+    global _cache
+    now = time.monotonic()
+    cached = _cache
+    if cached is not None and cached[0] > now:
+        return cached[1]
+
+    with _cache_lock:
+        cached = _cache
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        counters = stored_counters(db) or live_counters(db)
+        summary = build_summary(counters)
+        _cache = (time.monotonic() + ttl, summary)
+        return summary
+
+
+def clear_summary_cache():
+    global _cache
+    _cache = None
@@ -0,0 +1,153 @@
+import binascii
+import logging
+import re
+from email.message import EmailMessage
+from email.policy import SMTP as SMTP_POLICY
+from typing import Callable
+
+from markupsafe import escape
+
+log = logging.getLogger(__name__)
+
+# Rendered in place of each personalization value. Autoescape leaves it alone,
+# so anything that still contains \x1f after splitting means the template ran the
+# value through a filter and we can't splice it.
+_SENTINEL = "\x1fslot:{}\x1f"
+_SENTINEL_RE = re.compile("\x1fslot:(\\w+)\x1f")
+_BOUNDARY = "==pika-alt-7d1e0f3a=="
+
+RenderFn = Callable[[str, dict], tuple[str, str, str]]
+
+
+class Segments:
+    """A rendered string cut into static parts with slot names in between."""
+
+    __slots__ = ("parts",)
+
+    def __init__(self, rendered: str):
+        parts = _SENTINEL_RE.split(rendered)
+        if any("\x1f" in p for p in parts[::2]):
+            raise ValueError("personalization slot was transformed by the template")
+        self.parts = parts
+
+    @property
+    def slot_names(self) -> set[str]:
+        return set(self.parts[1::2])
+
+    def fill(self, values: dict) -> str:
+        parts = self.parts[:]
+        for i in range(1, len(parts), 2):
+            parts[i] = values[parts[i]]
+        return "".join(parts)
+
+
+def _qp(body: str) -> bytes:
+    body = body.replace("\r\n", "\n").replace("\r", "\n")
+    if not body.endswith("\n"):
+        body += "\n"
+    return binascii.b2a_qp(body.encode("utf-8"), istext=True).replace(b"\n", b"\r\n")
+
+
+class CampaignRender:
+    """
+    One template_key rendered once: subject + static text/html segments, and the
+    MIME envelope around them pre-built as bytes. Per recipient we only splice
+    the slot values in and quoted-printable encode the two bodies.
+    """
+
+    def __init__(self, subject: str, text_body: str, html_body: str, from_header: str):
+        if "\x1f" in subject:
+            raise ValueError("subject can't hold personalization slots")
+        self.subject = subject
+        self.text = Segments(text_body)
+        self.html = Segments(html_body)
+
+        # let the email package fold/encode the headers that may be non-ASCII
+        head = EmailMessage(policy=SMTP_POLICY)
+        head["From"] = from_header
+        head["Subject"] = subject
+        self._head = bytes(head).rstrip(b"\r\n") + (
+            "\r\nMIME-Version: 1.0\r\n"
+            f'Content-Type: multipart/alternative; boundary="{_BOUNDARY}"\r\n'
+        ).encode("ascii")
+        self._text_open = (
+            f"\r\n--{_BOUNDARY}\r\n"
+            'Content-Type: text/plain; charset="utf-8"\r\n'
+            "Content-Transfer-Encoding: quoted-printable\r\n\r\n"
+        ).encode("ascii")
+        self._html_open = (
+            f"--{_BOUNDARY}\r\n"
+            'Content-Type: text/html; charset="utf-8"\r\n'
+            "Content-Transfer-Encoding: quoted-printable\r\n\r\n"
+        ).encode("ascii")
+        self._close = f"--{_BOUNDARY}--\r\n".encode("ascii")
+
+    def personalize(self, values: dict) -> tuple[str, str, str]:
+        html_values = {k: str(escape(v)) for k, v in values.items()}
+        return self.subject, self.text.fill(values), self.html.fill(html_values)
+
+    def to_bytes(self, to_email: str, values: dict, headers: dict | None = None) -> bytes:
+        """`headers`: extra per-recipient headers (List-Unsubscribe), plain ASCII values only."""
+        extra = [("To", to_email), *(headers or {}).items()]
+        for name, value in extra:
+            if not value.isascii() or "\r" in value or "\n" in value:
+                raise ValueError(f"can't use pre-built headers for {name} {value!r}")
+        _, text_body, html_body = self.personalize(values)
+        return b"".join((
+            self._head,
+            "".join(f"{name}: {value}\r\n" for name, value in extra).encode("ascii"),
+            self._text_open, _qp(text_body),
+            self._html_open, _qp(html_body),
+            self._close,
+        ))
+
+
+class CampaignRenderCache:
+    """
+    Caches one CampaignRender per template_key.
+
+    `render_fn(template_key, slot_values)` is the normal full render; it is called
+    once with sentinel values for `slots`. Templates that can't be split (a slot
+    went through a filter) are remembered as None and the caller renders normally.
+    With `version_fn(template_key)`, an entry is rebuilt when the version changes
+    (template edited in dev).
+    """
+
+    def __init__(
+        self,
+        render_fn: RenderFn,
+        slots: tuple[str, ...],
+        from_header: str,
+        version_fn: Callable[[str], object] | None = None,
+    ):
+        self.render_fn = render_fn
+        self.slots = slots
+        self.from_header = from_header
+        self.version_fn = version_fn
+        self._cache: dict[str, CampaignRender | None] = {}
+        self._versions: dict[str, object] = {}
+
+    def get(self, template_key: str) -> CampaignRender | None:
+        version = self.version_fn(template_key) if self.version_fn else None
+        try:
+            if self._versions.get(template_key) == version:
+                return self._cache[template_key]
+        except KeyError:
+            pass
+
+        sentinels = {name: _SENTINEL.format(name) for name in self.slots}
+        subject, text_body, html_body = self.render_fn(template_key, sentinels)
+        try:
+            compiled = CampaignRender(subject, text_body, html_body, self.from_header)
+        except ValueError as e:
+            log.warning("render cache disabled", extra={"template": template_key, "reason": str(e)})
+            compiled = None
+
+        # dict assignment is atomic; worst case two send threads render the same key once each
+        self._cache[template_key] = compiled
+        self._versions[template_key] = version
+        return compiled
+
+    def clear(self):
+        self._cache.clear()
+        self._versions.clear()
@@ -1,5 +1,69 @@
-from jinja2 import Template
+"""
+The one Jinja environment for email templates, shared by /admin/preview-email and
+worker.py. Templates are compiled once per process and kept in the environment's
+cache; EMAIL_TEMPLATES_BYTECODE_DIR also keeps the compiled code on disk so a fresh
+process skips the parse, and EMAIL_TEMPLATES_AUTO_RELOAD=true (dev) recompiles a
+template when its file's mtime changes.
+"""
+import os
+from functools import lru_cache
+from pathlib import Path
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template, select_autoescape
+
+TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates"
+EMAIL_TEMPLATES_AUTO_RELOAD = os.getenv("EMAIL_TEMPLATES_AUTO_RELOAD", "false").lower() == "true"
+EMAIL_TEMPLATES_BYTECODE_DIR = os.getenv("EMAIL_TEMPLATES_BYTECODE_DIR", "")
+
+# template_key (what message_outbox stores) -> file in app/templates
+TEMPLATE_FILES = {
+    "weekly_promo_v1": "pika_pika_weekly.html",
+}
+
+
+def build_environment(
+    templates_dir: Path = TEMPLATES_DIR,
+    auto_reload: bool = EMAIL_TEMPLATES_AUTO_RELOAD,
+    bytecode_dir: str = EMAIL_TEMPLATES_BYTECODE_DIR,
+) -> Environment:
+    bytecode_cache = None
+    if bytecode_dir:
+        os.makedirs(bytecode_dir, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(bytecode_dir)
+    return Environment(
+        loader=FileSystemLoader(str(templates_dir)),
+        autoescape=select_autoescape(["html", "xml"]),
+        auto_reload=auto_reload,
+        bytecode_cache=bytecode_cache,
+    )
+
+
+template_env = build_environment()
+
+
+def get_email_template(template_key: str) -> Template:
+    """Compiled template for a template_key (or a file name under app/templates)."""
+    return template_env.get_template(TEMPLATE_FILES.get(template_key, template_key))
+
+
+def template_version(template_key: str) -> float | None:
+    """
+    File mtime, the same signal auto_reload uses, so caches built from a render
+    (worker.render_cache) can tell they're stale in dev.
+    """
+    name = TEMPLATE_FILES.get(template_key)
+    if name is None:
+        return None
+    try:
+        return os.path.getmtime(TEMPLATES_DIR / name)
+    except OSError:
+        return None
+
+
+@lru_cache(maxsize=32)
+def _compile(template_str: str) -> Template:
+    return template_env.from_string(template_str)
+
 
 def render_email_template(template_str: str, context: dict) -> str:
-    template = Template(template_str)
-    return template.render(**context)
\ No newline at end of file
+    return _compile(template_str).render(**context)
@@ -0,0 +1,153 @@
+"""
+One place that decides what an identity value looks like, and one cached way to look it up.
+
+normalize_identity() must stay in step with normalize_identity_value() in
+migrations/011_identity_normalized.sql: the DB stores that function's output in
+customer_identities.value_normalized (unique per channel) and every lookup probes it.
+"""
+import re
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.customer import ChannelType
+
+_WS = " \t\r\n"
+_NOT_PHONE = re.compile(r"[^0-9+]")
+
+
+def _email(value: str) -> str:
+    return value.strip(_WS).lower()
+
+
+def _instagram(value: str) -> str:
+    # handles are case-insensitive and people type the @
+    return value.strip(_WS).lstrip("@").lower()
+
+
+def _phone(value: str) -> str:
+    # "+54 9 (3446) 58-6123" -> "+5493446586123"
+    return _NOT_PHONE.sub("", value)
+
+
+NORMALIZERS = {
+    ChannelType.email: _email,
+    ChannelType.instagram: _instagram,
+    ChannelType.sms: _phone,
+    ChannelType.whatsapp: _phone,
+}
+
+
+def normalize_identity(channel: str, value: str) -> str:
+    """Canonical form of `value` for `channel` (messenger PSIDs and unknown channels: trimmed only)."""
+    normalizer = NORMALIZERS.get(channel)
+    if normalizer is None:
+        return value.strip(_WS)
+    return normalizer(value)
+
+
+class IdentityCache:
+    """
+    (channel, normalized value) -> (identity_id, customer_id), with a TTL.
+    Only hits are remembered: a miss usually means the caller is about to create it.
+    """
+
+    def __init__(self, ttl: float = 300, max_entries: int = 50000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: dict[tuple[str, str], tuple[tuple, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, channel: str, value: str) -> tuple | None:
+        hit = self._entries.get((channel, value))
+        if hit is None:
+            return None
+        ids, expires = hit
+        if expires < time.monotonic():
+            return None
+        return ids
+
+    def put(self, channel: str, value: str, identity_id, customer_id):
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                now = time.monotonic()
+                self._entries = {k: v for k, v in self._entries.items() if v[1] >= now}
+                if len(self._entries) >= self.max_entries:
+                    for k in list(self._entries)[: self.max_entries // 10 or 1]:
+                        del self._entries[k]
+            self._entries[(channel, value)] = ((identity_id, customer_id), time.monotonic() + self.ttl)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+identity_cache = IdentityCache()
+
+
+_LOOKUP_SQL = text("""
+    select ci.value_normalized, ci.id as identity_id, ci.customer_id
+    from customer_identities ci
+    where ci.channel = CAST(:channel AS channel_type)
+      and ci.value_normalized = any(:values)
+""")
+
+
+def _from_cache(channel: str, values: list[str]) -> tuple[dict[str, str], dict[str, tuple], set[str]]:
+    """(raw -> normalized, hits, normalized values to fetch)"""
+    normalized = {v: normalize_identity(channel, v) for v in values}
+    found: dict[str, tuple] = {}
+    missing: set[str] = set()
+    for value, norm in normalized.items():
+        ids = identity_cache.get(channel, norm)
+        if ids is None:
+            missing.add(norm)
+        else:
+            found[value] = ids
+    return normalized, found, missing
+
+
+def _add_fetched(channel: str, rows, normalized: dict[str, str], found: dict[str, tuple]):
+    by_norm = {}
+    for r in rows:
+        by_norm[r.value_normalized] = (r.identity_id, r.customer_id)
+        identity_cache.put(channel, r.value_normalized, r.identity_id, r.customer_id)
+    for value, norm in normalized.items():
+        if norm in by_norm:
+            found[value] = by_norm[norm]
+
+
+def resolve_identities(db: Session, channel: str, values: list[str]) -> dict[str, tuple]:
+    """
+    raw value -> (identity_id, customer_id) for the ones that exist. Normalizes,
+    answers from the cache, and fetches the rest with one index probe per value
+    (customer_identities_normalized_uidx).
+    """
+    channel = getattr(channel, "value", channel)
+    normalized, found, missing = _from_cache(channel, values)
+    if missing:
+        rows = db.execute(_LOOKUP_SQL, {"channel": channel, "values": list(missing)}).all()
+        _add_fetched(channel, rows, normalized, found)
+    return found
+
+
+def resolve_identity(db: Session, channel: str, value: str) -> tuple | None:
+    """(identity_id, customer_id) for channel + value in any spelling, or None."""
+    return resolve_identities(db, channel, [value]).get(value)
+
+
+async def resolve_identities_async(db: AsyncSession, channel: str, values: list[str]) -> dict[str, tuple]:
+    """resolve_identities() on the async engine; shares the cache."""
+    channel = getattr(channel, "value", channel)
+    normalized, found, missing = _from_cache(channel, values)
+    if missing:
+        rows = (await db.execute(_LOOKUP_SQL, {"channel": channel, "values": list(missing)})).all()
+        _add_fetched(channel, rows, normalized, found)
+    return found
+
+
+async def resolve_identity_async(db: AsyncSession, channel: str, value: str) -> tuple | None:
+    return (await resolve_identities_async(db, channel, [value])).get(value)
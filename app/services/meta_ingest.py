@@ -0,0 +1,133 @@
+import uuid
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.services.identity import normalize_identity, resolve_identities
+
+CHANNEL = "messenger"  # later: detect facebook vs instagram
+CONSENT_KEYWORDS = {"alta", "si", "si promos", "acepto"}
+
+
+def raw_messaging_events(payload: dict) -> list[dict]:
+    """entry[].messaging[] as Meta sent them (what webhook_inbox stores)."""
+    return [
+        ev
+        for entry in payload.get("entry", []) or []
+        for ev in entry.get("messaging", []) or []
+    ]
+
+
+def normalize_messaging_event(ev: dict) -> dict | None:
+    """{sender_id, text, mid} for one messaging event, or None when it has no sender."""
+    sender = (ev.get("sender") or {}).get("id")
+    if not sender:
+        return None
+    message = ev.get("message", {}) or {}
+    return {
+        "sender_id": normalize_identity(CHANNEL, str(sender)),
+        "text": (message.get("text") or "").strip(),
+        "mid": message.get("mid"),
+    }
+
+
+def extract_messaging_events(payload: dict) -> list[dict]:
+    """Flattens entry[].messaging[] into [{sender_id, text, mid}], skipping events without a sender."""
+    events = (normalize_messaging_event(ev) for ev in raw_messaging_events(payload))
+    return [ev for ev in events if ev is not None]
+
+
+def resolve_senders(db: Session, sender_ids: list[str]) -> dict[str, tuple]:
+    """
+    sender_id -> (identity_id, customer_id), creating customer + identity for the
+    new ones. One query when everyone is known, two when some are new.
+    """
+    found = resolve_identities(db, CHANNEL, sender_ids)
+    missing = [s for s in sender_ids if s not in found]
+    if not missing:
+        return found
+
+    # ids generated here so each new identity can point at its own new customer
+    # within a single statement
+    customer_ids = [uuid.uuid4() for _ in missing]
+    rows = db.execute(
+        text("""
+            with input as (
+              select *
+              from unnest(CAST(:customer_ids AS uuid[]), CAST(:values AS text[])) as t(customer_id, value)
+            ),
+            new_customers as (
+              insert into customers (id, first_name)
+              select customer_id, 'IG Lead' from input
+              returning id
+            )
+            insert into customer_identities (customer_id, channel, value, is_primary)
+            select i.customer_id, CAST(:channel AS channel_type), i.value, true
+            from input i
+            on conflict do nothing
+            returning value, id as identity_id, customer_id
+        """),
+        {"customer_ids": customer_ids, "values": missing, "channel": CHANNEL},
+    ).all()
+    for r in rows:
+        found[r.value] = (r.identity_id, r.customer_id)
+
+    # Lost a race with a concurrent delivery: drop our orphan customers and use theirs
+    raced = [s for s in missing if s not in found]
+    if raced:
+        orphans = [cid for s, cid in zip(missing, customer_ids) if s in raced]
+        db.execute(text("delete from customers where id = any(:ids)"), {"ids": orphans})
+        found.update(resolve_identities(db, CHANNEL, raced))
+        if any(s not in found for s in raced):
+            raise RuntimeError("Identity insert race: could not fetch existing identity")
+
+    return found
+
+
+def grant_promotions(db: Session, customer_ids: list):
+    """Bulk consent; skips customers whose current promotions consent is already granted."""
+    if not customer_ids:
+        return
+    db.execute(
+        text("""
+            insert into consents (customer_id, channel, purpose, status)
+            select t.customer_id, CAST(:channel AS channel_type), 'promotions', 'granted'
+            from unnest(CAST(:customer_ids AS uuid[])) as t(customer_id)
+            where not exists (
+              select 1
+              from current_consents cc
+              where cc.customer_id = t.customer_id
+                and cc.channel = CAST(:channel AS channel_type)
+                and cc.purpose = 'promotions'
+                and cc.status = 'granted'
+            )
+        """),
+        {"customer_ids": customer_ids, "channel": CHANNEL},
+    )
+
+
+def ingest_messaging_events(db: Session, events: list[dict]) -> list[dict]:
+    """Resolves/creates every sender and records keyword consents for a batch of events. Does not commit."""
+    if not events:
+        return []
+
+    sender_ids = list(dict.fromkeys(ev["sender_id"] for ev in events))
+    identities = resolve_senders(db, sender_ids)
+
+    consenting = {
+        identities[ev["sender_id"]][1]
+        for ev in events
+        if ev["text"].lower() in CONSENT_KEYWORDS
+    }
+    grant_promotions(db, list(consenting))
+
+    return [
+        {
+            "channel": CHANNEL,
+            "sender_id": ev["sender_id"],
+            "text": ev["text"],
+            "customer_id": str(identities[ev["sender_id"]][1]),
+            "identity_id": str(identities[ev["sender_id"]][0]),
+        }
+        for ev in events
+    ]
@@ -0,0 +1,133 @@
+import asyncio
+import threading
+import time
+
+import dns.asyncresolver
+import dns.resolver
+
+# Big consumer providers: always valid, never looked up
+COMMON_EMAIL_DOMAINS = frozenset({
+    "gmail.com", "googlemail.com",
+    "hotmail.com", "hotmail.com.ar", "outlook.com", "outlook.com.ar", "live.com", "live.com.ar", "msn.com",
+    "yahoo.com", "yahoo.com.ar", "ymail.com",
+    "icloud.com", "me.com", "mac.com",
+    "aol.com", "proton.me", "protonmail.com",
+    "fibertel.com.ar", "arnet.com.ar", "speedy.com.ar",
+})
+
+# Answers that mean "this domain can't receive mail", safe to remember for a while.
+# Timeouts / SERVFAIL are not cached: the next signup asks again.
+_NEGATIVE = (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer)
+
+
+class MXValidator:
+    """
+    MX lookups with a TTL cache (positive and negative), a built-in allowlist and
+    a sync + async API. `resolver` / `async_resolver` are anything with
+    resolve(domain, "MX") (awaitable for the async one), so tests can pass fakes.
+    """
+
+    def __init__(
+        self,
+        resolver=None,
+        async_resolver=None,
+        ttl: float = 6 * 3600,
+        negative_ttl: float = 600,
+        allowlist: frozenset[str] = COMMON_EMAIL_DOMAINS,
+        max_entries: int = 10000,
+        lifetime: float = 3.0,
+    ):
+        self._resolver = resolver
+        self._async_resolver = async_resolver
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.allowlist = allowlist
+        self.max_entries = max_entries
+        self.lifetime = lifetime
+        self._cache: dict[str, tuple[bool, float]] = {}
+        self._lock = threading.Lock()
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    @property
+    def resolver(self):
+        if self._resolver is None:
+            self._resolver = dns.resolver.Resolver()
+            self._resolver.lifetime = self.lifetime
+        return self._resolver
+
+    @property
+    def async_resolver(self):
+        if self._async_resolver is None:
+            self._async_resolver = dns.asyncresolver.Resolver()
+            self._async_resolver.lifetime = self.lifetime
+        return self._async_resolver
+
+    def _cached(self, domain: str) -> bool | None:
+        if domain in self.allowlist:
+            return True
+        hit = self._cache.get(domain)
+        if hit is None:
+            return None
+        ok, expires = hit
+        if expires < time.monotonic():
+            return None
+        return ok
+
+    def _store(self, domain: str, ok: bool):
+        with self._lock:
+            if len(self._cache) >= self.max_entries:
+                now = time.monotonic()
+                self._cache = {d: v for d, v in self._cache.items() if v[1] >= now}
+                if len(self._cache) >= self.max_entries:
+                    # still full: drop the oldest entries (dicts keep insertion order)
+                    for d in list(self._cache)[: self.max_entries // 10 or 1]:
+                        del self._cache[d]
+            self._cache[domain] = (ok, time.monotonic() + (self.ttl if ok else self.negative_ttl))
+
+    def has_mx(self, domain: str) -> bool:
+        domain = domain.strip().lower().rstrip(".")
+        cached = self._cached(domain)
+        if cached is not None:
+            return cached
+        try:
+            self.resolver.resolve(domain, "MX")
+        except _NEGATIVE:
+            self._store(domain, False)
+            return False
+        self._store(domain, True)
+        return True
+
+    async def has_mx_async(self, domain: str) -> bool:
+        domain = domain.strip().lower().rstrip(".")
+        cached = self._cached(domain)
+        if cached is not None:
+            return cached
+
+        # A burst of signups for the same new domain shares one query. It runs as its
+        # own task and every caller awaits it through shield(): a caller that gets
+        # cancelled (client went away) only drops its own wait, the lookup finishes
+        # for the others and still fills the cache.
+        task = self._inflight.get(domain)
+        if task is None:
+            task = self._inflight[domain] = asyncio.create_task(self._lookup_async(domain))
+            task.add_done_callback(lambda t: self._lookup_done(domain, t))
+        return await asyncio.shield(task)
+
+    async def _lookup_async(self, domain: str) -> bool:
+        try:
+            await self.async_resolver.resolve(domain, "MX")
+            ok = True
+        except _NEGATIVE:
+            ok = False
+        self._store(domain, ok)
+        return ok
+
+    def _lookup_done(self, domain: str, task: asyncio.Task):
+        if self._inflight.get(domain) is task:
+            del self._inflight[domain]
+        if not task.cancelled():
+            task.exception()  # mark retrieved when every waiter was cancelled
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
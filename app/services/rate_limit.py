@@ -0,0 +1,189 @@
+import threading
+import time
+
+from sqlalchemy import text
+
+# Relay answers that mean "slow down" rather than "this message is bad"
+THROTTLE_CODES = {421, 451}
+
+
+def parse_domain_rates(spec: str) -> dict[str, float]:
+    """'gmail.com=5,hotmail.com=2' -> {'gmail.com': 5.0, 'hotmail.com': 2.0}"""
+    rates = {}
+    for item in (spec or "").split(","):
+        if "=" not in item:
+            continue
+        domain, rate = item.split("=", 1)
+        rates[domain.strip().lower()] = float(rate)
+    return rates
+
+
+def recipient_domain(email: str) -> str:
+    return email.rsplit("@", 1)[-1].strip().lower()
+
+
+class _Bucket:
+    __slots__ = ("rate", "burst", "tokens", "factor", "updated")
+
+    def __init__(self, rate: float, now: float):
+        self.rate = rate
+        self.burst = max(1.0, rate)
+        self.tokens = self.burst
+        self.factor = 1.0
+        self.updated = now
+
+    def refill(self, now: float, recovery_per_sec: float):
+        elapsed = now - self.updated
+        self.updated = now
+        self.factor = min(1.0, self.factor + elapsed * recovery_per_sec)
+        self.tokens = min(self.burst, self.tokens + elapsed * self.rate * self.factor)
+
+    def wait_time(self) -> float:
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / (self.rate * self.factor)
+
+
+class SendGovernor:
+    """
+    In-process token buckets: one global, one per recipient domain.
+
+    acquire() takes a token from both or from neither and returns 0, or the
+    seconds until it could succeed. A 421/451 from the relay halves that domain's
+    effective rate (throttled()); it creeps back to full at `recovery_per_sec`.
+    A rate of 0 means unlimited; a domain without a rate that gets throttled is
+    given `throttle_rate` from then on, so the push-back always slows something down.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 0,
+        domain_rates: dict[str, float] | None = None,
+        default_domain_rate: float = 0,
+        min_factor: float = 0.1,
+        recovery_per_sec: float = 0.01,
+        throttle_rate: float = 2.0,
+    ):
+        self.global_rate = global_rate
+        self.domain_rates = domain_rates or {}
+        self.throttle_rate = throttle_rate
+        # domains that had no rate until the relay throttled them: domain -> rate
+        self.learned_rates: dict[str, float] = {}
+        self.default_domain_rate = default_domain_rate
+        self.min_factor = min_factor
+        self.recovery_per_sec = recovery_per_sec
+        self._lock = threading.Lock()
+        now = time.monotonic()
+        self._global = _Bucket(global_rate, now) if global_rate > 0 else None
+        self._domains: dict[str, _Bucket] = {}
+
+    def _rate_for(self, key: str) -> float:
+        if key == "*":
+            return self.global_rate
+        return self.domain_rates.get(key, self.default_domain_rate) or self.learned_rates.get(key, 0)
+
+    def _domain_bucket(self, domain: str, now: float) -> _Bucket | None:
+        bucket = self._domains.get(domain)
+        if bucket is None:
+            rate = self._rate_for(domain)
+            if rate <= 0:
+                return None
+            bucket = self._domains[domain] = _Bucket(rate, now)
+        return bucket
+
+    def acquire(self, domain: str) -> float:
+        with self._lock:
+            now = time.monotonic()
+            buckets = [b for b in (self._global, self._domain_bucket(domain, now)) if b is not None]
+            for b in buckets:
+                b.refill(now, self.recovery_per_sec)
+            wait = max((b.wait_time() for b in buckets), default=0.0)
+            if wait == 0:
+                for b in buckets:
+                    b.tokens -= 1
+            return wait
+
+    def throttled(self, domain: str):
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._domain_bucket(domain, now)
+            if bucket is None and self.throttle_rate > 0:
+                self.learned_rates[domain] = self.throttle_rate
+                bucket = self._domain_bucket(domain, now)
+            if bucket is not None:
+                bucket.refill(now, self.recovery_per_sec)
+                bucket.factor = max(self.min_factor, bucket.factor / 2)
+
+
+class PgSendGovernor(SendGovernor):
+    """
+    Same buckets, stored in send_rate_buckets so every worker process shares them.
+    Each acquire() is one short transaction: both buckets are refilled and debited
+    under their row locks, or nothing changes. Rates learned from throttling are
+    stored on the bucket row (send_rate_buckets.rate) and re-read every
+    `learned_refresh_seconds`, so the other workers pick them up too.
+    """
+
+    def __init__(self, engine, learned_refresh_seconds: float = 30.0, **kwargs):
+        super().__init__(**kwargs)
+        self.engine = engine
+        self.learned_refresh_seconds = learned_refresh_seconds
+        self._learned_at = float("-inf")
+
+    def _refresh_learned(self):
+        now = time.monotonic()
+        if now - self._learned_at < self.learned_refresh_seconds:
+            return
+        self._learned_at = now
+        with self.engine.connect() as conn:
+            rows = conn.execute(text("select key, rate from send_rate_buckets where rate is not null")).all()
+        self.learned_rates = {key: rate for key, rate in rows}
+
+    def acquire(self, domain: str) -> float:
+        self._refresh_learned()
+        keys = [k for k in ("*", domain) if self._rate_for(k) > 0]
+        if not keys:
+            return 0.0
+
+        with self.engine.begin() as conn:
+            wait = 0.0
+            for key in sorted(keys):
+                rate = self._rate_for(key)
+                row = conn.execute(text("""
+                    insert into send_rate_buckets (key, tokens, factor, updated_at)
+                    values (:key, :burst, 1, clock_timestamp())
+                    on conflict (key) do update
+                    set factor = least(1, send_rate_buckets.factor
+                          + extract(epoch from clock_timestamp() - send_rate_buckets.updated_at) * :recovery),
+                        tokens = least(:burst, send_rate_buckets.tokens
+                          + extract(epoch from clock_timestamp() - send_rate_buckets.updated_at)
+                            * :rate * send_rate_buckets.factor),
+                        updated_at = clock_timestamp()
+                    returning tokens, factor
+                """), {"key": key, "rate": rate, "burst": max(1.0, rate), "recovery": self.recovery_per_sec}).one()
+                if row.tokens < 1:
+                    wait = max(wait, (1 - row.tokens) / (rate * row.factor))
+
+            if wait > 0:
+                return wait
+
+            conn.execute(text("""
+                update send_rate_buckets set tokens = tokens - 1 where key = any(:keys)
+            """), {"keys": keys})
+            return 0.0
+
+    def throttled(self, domain: str):
+        # a domain with no rate gets throttle_rate, stored on its row for every worker
+        learned = None
+        if self._rate_for(domain) <= 0:
+            if self.throttle_rate <= 0:
+                return
+            learned = self.throttle_rate
+        with self.engine.begin() as conn:
+            conn.execute(text("""
+                insert into send_rate_buckets (key, tokens, factor, rate, updated_at)
+                values (:key, 0, greatest(:min_factor, 0.5), :learned, clock_timestamp())
+                on conflict (key) do update
+                set factor = greatest(:min_factor, send_rate_buckets.factor / 2),
+                    rate = coalesce(send_rate_buckets.rate, excluded.rate)
+            """), {"key": domain, "min_factor": self.min_factor, "learned": learned})
+        if learned is not None:
+            self.learned_rates = {**self.learned_rates, domain: learned}
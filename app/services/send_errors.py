@@ -0,0 +1,108 @@
+import random
+import smtplib
+import socket
+import ssl
+import threading
+
+from sqlalchemy.exc import DBAPIError
+
+RETRY = "retry"
+DEFER = "defer"
+FAIL = "fail"
+
+
+def smtp_code(exc: BaseException) -> int | None:
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return exc.smtp_code
+    if isinstance(exc, smtplib.SMTPRecipientsRefused) and exc.recipients:
+        # single recipient per message in practice; take the mildest code
+        return min(code for code, _ in exc.recipients.values())
+    return None
+
+
+# Transport failures worth another attempt. Not OSError: every smtplib.SMTPException
+# is one, as are certificate errors, and those don't fix themselves.
+_TRANSIENT = (
+    smtplib.SMTPServerDisconnected,
+    smtplib.SMTPConnectError,
+    TimeoutError,  # socket.timeout
+    ConnectionError,
+)
+
+# Our side is broken, not the message: relay hostname doesn't resolve, credentials
+# or TLS setup rejected, the rate-limit database unreachable. Every message would hit
+# the same error, so none of them should spend an attempt on it.
+_INFRA = (
+    socket.gaierror,
+    smtplib.SMTPAuthenticationError,
+    smtplib.SMTPSenderRefused,  # our From address
+    smtplib.SMTPNotSupportedError,
+    ssl.SSLError,  # includes SSLCertVerificationError
+    DBAPIError,  # PgSendGovernor
+)
+
+
+def classify_send_error(exc: BaseException) -> str:
+    """
+    RETRY: SMTP 4xx, dropped or refused connections, timeouts.
+    DEFER: our relay / DNS / credentials / database: hand the row back without
+    spending an attempt (the worker backs off while it lasts).
+    FAIL: per-recipient SMTP 5xx and anything else (bad template, bad address...).
+    """
+    if isinstance(exc, _INFRA):
+        return DEFER
+    code = smtp_code(exc)
+    if code is not None and code > 0:
+        return RETRY if 400 <= code < 500 else FAIL
+    if isinstance(exc, _TRANSIENT):
+        return RETRY
+    if type(exc) is smtplib.SMTPException:
+        # smtplib's own complaints about the session: "No suitable authentication
+        # method found", "STARTTLS extension not supported by server"...
+        return DEFER
+    return FAIL
+
+
+class FailureStreak:
+    """Consecutive DEFER errors across send threads, for the backoff: reset by any send that gets through."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._count = 0
+
+    def fail(self) -> int:
+        with self._lock:
+            self._count += 1
+            return self._count
+
+    def reset(self):
+        # unlocked read first: the common case is nothing to reset
+        if self._count:
+            with self._lock:
+                self._count = 0
+
+
+def compact_error(exc: BaseException, limit: int = 300) -> str:
+    """One line, bounded: '421 4.7.0 Try again later' or 'TimeoutError: timed out'."""
+    if isinstance(exc, smtplib.SMTPResponseException):
+        msg = exc.smtp_error
+        if isinstance(msg, bytes):
+            msg = msg.decode("utf-8", "replace")
+        out = f"{exc.smtp_code} {msg}"
+    elif isinstance(exc, smtplib.SMTPRecipientsRefused) and exc.recipients:
+        code, msg = next(iter(exc.recipients.values()))
+        if isinstance(msg, bytes):
+            msg = msg.decode("utf-8", "replace")
+        out = f"{code} {msg}"
+    else:
+        out = f"{type(exc).__name__}: {exc}"
+    return " ".join(out.split())[:limit]
+
+
+def backoff_seconds(attempt: int, base: float = 60.0, cap: float = 6 * 3600.0) -> float:
+    """
+    Delay before retry number `attempt` (1-based): base * 2^(attempt-1), capped,
+    with half of it jittered so a relay hiccup doesn't bring every message back at once.
+    """
+    delay = min(cap, base * (2 ** max(0, attempt - 1)))
+    return delay / 2 + random.uniform(0, delay / 2)
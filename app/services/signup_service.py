@@ -1,10 +1,119 @@
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from datetime import datetime, timezone
 
 from app.schemas.signup import SignupIn
+from app.services.identity import normalize_identity, resolve_identity
+import json
+
+log = logging.getLogger(__name__)
 ALLOWED_INTERESTS = {"baby_items", "toys", "cochesitos", "cunas"}
 
+# Whole /signup write in one round-trip. Reuses the customer when the email identity
+# already exists (and refreshes the name), otherwise creates customer + identity;
+# then upserts interests and grants consent unless it's already granted.
+# Data-modifying CTEs all run even when the final select doesn't reference them.
+SIGNUP_SQL = """
+    with existing as (
+      select ci.id as identity_id, ci.customer_id
+      from customer_identities ci
+      where ci.channel = 'email'::channel_type
+        and ci.value_normalized = :email
+      limit 1
+    ),
+    renamed as (
+      update customers c
+      set first_name = :name, updated_at = now()
+      from existing e
+      where c.id = e.customer_id
+      returning c.id
+    ),
+    new_customer as (
+      insert into customers (first_name)
+      select :name
+      where not exists (select 1 from existing)
+      returning id
+    ),
+    new_identity as (
+      insert into customer_identities (customer_id, channel, value, is_primary)
+      select nc.id, 'email'::channel_type, :email, true
+      from new_customer nc
+      on conflict do nothing
+      returning id as identity_id, customer_id
+    ),
+    target as (
+      select identity_id, customer_id from existing
+      union all
+      select identity_id, customer_id from new_identity
+    ),
+    interests as (
+      insert into customer_attributes (customer_id, key, value)
+      select t.customer_id, 'interests', CAST(:interests AS jsonb)
+      from target t
+      where CAST(:interests AS jsonb) <> '[]'::jsonb
+      on conflict (customer_id, key) do update
+      set value = excluded.value,
+          updated_at = now()
+      returning 1
+    ),
+    consent as (
+      insert into consents (customer_id, channel, purpose, status)
+      select t.customer_id, 'email'::channel_type, 'promotions', 'granted'
+      from target t
+      where :consent_promotions
+        and not exists (
+          select 1
+          from current_consents cc
+          where cc.customer_id = t.customer_id
+            and cc.channel = 'email'::channel_type
+            and cc.purpose = 'promotions'
+            and cc.status = 'granted'
+        )
+      returning 1
+    )
+    select identity_id, customer_id from target
+"""
+
+
+def signup_params(data) -> dict:
+    return {
+        "name": data.name.strip(),
+        "email": normalize_identity("email", data.email),
+        "interests": json.dumps(list(getattr(data, "interests", None) or [])),
+        "consent_promotions": bool(getattr(data, "consent_promotions", True)),
+    }
+
+
+def upsert_signup(db: Session, data) -> tuple[str, str]:
+    """
+    Runs SIGNUP_SQL and returns (customer_id, identity_id). Does not commit.
+
+    If a concurrent signup inserted the same email between our read and our insert,
+    the identity insert hits the conflict and nothing comes back; we roll back
+    (dropping the orphan customer) and run it again, which then finds the winner.
+    """
+    params = signup_params(data)
+    for _ in range(2):
+        row = db.execute(text(SIGNUP_SQL), params).first()
+        if row:
+            return row.customer_id, row.identity_id
+        db.rollback()
+    raise RuntimeError("Identity insert race: could not fetch existing email identity")
+
+
+async def upsert_signup_async(db: AsyncSession, data) -> tuple[str, str]:
+    """upsert_signup() on the async engine (DB_ASYNC=true); same SQL, same retry."""
+    params = signup_params(data)
+    for _ in range(2):
+        row = (await db.execute(text(SIGNUP_SQL), params)).first()
+        if row:
+            return row.customer_id, row.identity_id
+        await db.rollback()
+    raise RuntimeError("Identity insert race: could not fetch existing email identity")
+
 
 def create_signup(db: Session, data) -> tuple[str, str]:
     """
@@ -15,7 +124,7 @@ def create_signup(db: Session, data) -> tuple[str, str]:
       - customer_interests rows
     """
     name = data.name.strip()
-    email = data.email.strip().lower()
+    email = normalize_identity("email", data.email)
     interests = [i for i in (data.interests or []) if i in ALLOWED_INTERESTS]
 
     # 0) start tx
@@ -25,20 +134,10 @@ def create_signup(db: Session, data) -> tuple[str, str]:
     # If you want it self-contained, add db.commit() at the end.
 
     # 1) Find existing email identity (prevents duplicate customers)
-    row = db.execute(
-        text("""
-            select ci.id as identity_id, ci.customer_id
-            from customer_identities ci
-            where ci.channel = 'email'::channel_type
-              and ci.value = :email
-            limit 1
-        """),
-        {"email": email},
-    ).first()
+    row = resolve_identity(db, "email", email)
 
     if row:
-        customer_id = row.customer_id
-        identity_id = row.identity_id
+        identity_id, customer_id = row
 
         # Optional: update customer's name if it was a placeholder before
         db.execute(
@@ -61,12 +160,12 @@ def create_signup(db: Session, data) -> tuple[str, str]:
         ).scalar_one()
 
         # 3) Create email identity
-        print ("About to insert:", customer_id, email)
+        log.debug("creating email identity", extra={"customer_id": customer_id})
         identity_id = db.execute(
             text("""
                 insert into customer_identities (customer_id, channel, value, is_primary)
                 values (:customer_id, 'email'::channel_type, :email, true)
-                on conflict (channel, value) do nothing
+                on conflict do nothing
                 returning id
             """),
             {"customer_id": customer_id, "email": email},
@@ -74,20 +173,10 @@ def create_signup(db: Session, data) -> tuple[str, str]:
 
         # Race safety: if conflict happened, fetch the identity
         if identity_id is None:
-            row2 = db.execute(
-                text("""
-                    select ci.id as identity_id, ci.customer_id
-                    from customer_identities ci
-                    where ci.channel = 'email'::channel_type
-                      and ci.value = :email
-                    limit 1
-                """),
-                {"email": email},
-            ).first()
+            row2 = resolve_identity(db, "email", email)
             if not row2:
                 raise RuntimeError("Identity insert race: could not fetch existing email identity")
-            identity_id = row2.identity_id
-            customer_id = row2.customer_id
+            identity_id, customer_id = row2
 
     # 4) Consent: insert granted only if NOT currently granted
     if getattr(data, "consent_promotions", True):
@@ -97,7 +186,7 @@ def create_signup(db: Session, data) -> tuple[str, str]:
                 select :customer_id, 'email'::channel_type, 'promotions', 'granted'
                 where not exists (
                     select 1
-                    from consents
+                    from current_consents
                     where customer_id = :customer_id
                       and channel = 'email'::channel_type
                       and purpose = 'promotions'
@@ -0,0 +1,139 @@
+import queue
+import smtplib
+import threading
+import time
+
+
+class _PooledConnection:
+    def __init__(self, server: smtplib.SMTP):
+        self.server = server
+        self.messages_sent = 0
+        self.last_used = time.monotonic()
+
+
+class SMTPPool:
+    """
+    Keeps up to `size` authenticated SMTP connections alive and reuses them.
+
+    - a connection is retired after `max_messages` sends (providers cap this)
+    - a connection idle for more than `idle_timeout` seconds is replaced
+    - SMTPServerDisconnected on send -> reconnect once and retry the message
+    Safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int = 587,
+        username: str | None = None,
+        password: str | None = None,
+        size: int = 4,
+        max_messages: int = 100,
+        idle_timeout: float = 60.0,
+        timeout: float = 20.0,
+        starttls: bool = True,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = max(1, size)
+        self.max_messages = max_messages
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.starttls = starttls
+
+        self._idle: queue.LifoQueue[_PooledConnection] = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._closed = False
+
+    def _connect(self) -> _PooledConnection:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.username:
+                server.login(self.username, self.password or "")
+        except Exception:
+            _quit_quietly(server)
+            raise
+        return _PooledConnection(server)
+
+    def _checkout(self) -> _PooledConnection:
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+
+            if time.monotonic() - conn.last_used > self.idle_timeout:
+                # the server has most likely dropped us already
+                _quit_quietly(conn.server)
+                continue
+            return conn
+
+    def _checkin(self, conn: _PooledConnection):
+        conn.last_used = time.monotonic()
+        if self._closed or (self.max_messages and conn.messages_sent >= self.max_messages):
+            _quit_quietly(conn.server)
+            return
+        self._idle.put(conn)
+
+    def _send(self, fn):
+        self._slots.acquire()
+        try:
+            conn = self._checkout()
+            try:
+                result = fn(conn.server)
+            except smtplib.SMTPServerDisconnected:
+                _quit_quietly(conn.server)
+                conn = self._connect()
+                try:
+                    result = fn(conn.server)
+                except Exception:
+                    _quit_quietly(conn.server)
+                    raise
+            except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+                # the connection itself is still usable after a per-message rejection,
+                # but reset the transaction so the next message starts clean
+                try:
+                    conn.server.rset()
+                except Exception:
+                    _quit_quietly(conn.server)
+                else:
+                    self._checkin(conn)
+                raise
+            except Exception:
+                _quit_quietly(conn.server)
+                raise
+
+            conn.messages_sent += 1
+            self._checkin(conn)
+            return result
+        finally:
+            self._slots.release()
+
+    def send_message(self, msg):
+        return self._send(lambda server: server.send_message(msg))
+
+    def sendmail(self, from_addr: str, to_addrs, data: bytes):
+        return self._send(lambda server: server.sendmail(from_addr, to_addrs, data))
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            _quit_quietly(conn.server)
+
+
+def _quit_quietly(server: smtplib.SMTP):
+    try:
+        server.quit()
+    except Exception:
+        try:
+            server.close()
+        except Exception:
+            pass
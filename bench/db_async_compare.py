@@ -0,0 +1,79 @@
+"""
+POST /signup through the sync stack (threadpool + Session) vs DB_ASYNC=true
+(async engine), against the same Postgres (.env DATABASE_URL).
+
+    python bench/db_async_compare.py --requests 2000 --concurrency 64
+
+Starts one uvicorn per mode on its own port (one worker each, same pool profile),
+warms it up, runs bench/signup_load.py's load against it and prints both side by side.
+Concurrency above Starlette's threadpool (40) is where the sync stack queues up.
+"""
+import argparse
+import http.client
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from signup_load import print_report, run_load  # noqa: E402
+
+
+def wait_healthy(port: int, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"API on :{port} did not come up")
+
+
+def bench_mode(db_async: bool, port: int, args) -> dict:
+    env = {**os.environ, "DB_ASYNC": "true" if db_async else "false", "DB_ROLE": "api"}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        wait_healthy(port)
+        url = f"http://127.0.0.1:{port}"
+        run_load(url, requests=min(200, args.requests), concurrency=args.concurrency)  # warm the pools
+        return run_load(url, requests=args.requests, concurrency=args.concurrency, duplicates=args.duplicates)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duplicates", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8101)
+    args = parser.parse_args()
+
+    results = {}
+    for name, db_async, port in (("sync", False, args.port), ("async", True, args.port + 1)):
+        print(f"== {name}")
+        results[name] = bench_mode(db_async, port, args)
+        print_report(results[name])
+
+    sync, async_ = results["sync"], results["async"]
+    print(
+        f"\nasync vs sync: {async_['rps'] / sync['rps']:.2f}x req/s, "
+        f"p95 {sync['p95']:.1f} -> {async_['p95']:.1f} ms, p99 {sync['p99']:.1f} -> {async_['p99']:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
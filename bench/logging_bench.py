@@ -0,0 +1,143 @@
+"""
+Cost of the worker's per-message log lines over a simulated 50k-message run.
+
+    python bench/logging_bench.py --messages 50000 --threads 4
+    python bench/logging_bench.py --sink slow     # stdout that takes 50us per write (busy pipe)
+
+none:         no output (baseline)
+print:        the old worker: one print() per message (SENT ...), synchronous
+logging_all:  app.core.logging, every message logged: the same line count as print,
+              so this is the like-for-like cost of a JSON line vs a print()
+logging:      app.core.logging as the worker runs it: per-message lines sampled at
+              LOG_SAMPLE_RATE, every 200th message fails and is always logged
+
+Each message does a fixed bit of CPU work (hashing a 4 KB body) on a send thread,
+like worker.send_one minus the network. Reports wall time and the overhead per
+message against the baseline.
+"""
+import argparse
+import hashlib
+import io
+import logging
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.logging import correlation, sampled, setup_logging, shutdown_logging  # noqa: E402
+
+BODY = b"x" * 4096
+log = logging.getLogger("worker")
+
+
+class SlowStream(io.TextIOBase):
+    """A stdout whose reader is behind: every write costs `delay` seconds."""
+
+    def __init__(self, inner, delay: float):
+        self.inner = inner
+        self.delay = delay
+
+    def write(self, s):
+        deadline = time.perf_counter() + self.delay
+        while time.perf_counter() < deadline:
+            pass
+        return self.inner.write(s)
+
+    def flush(self):
+        self.inner.flush()
+
+
+def work(i: int):
+    hashlib.sha256(BODY + i.to_bytes(4, "little")).digest()
+    return i % 200 != 0  # sent / failed
+
+
+def send_none(row):
+    i, outbox_id, to_email = row
+    work(i)
+
+
+def send_print(row):
+    i, outbox_id, to_email = row
+    if work(i):
+        print("SENT", outbox_id, "->", to_email, "(original:", to_email, ")")
+    else:
+        print("FAILED", outbox_id, "->", to_email, "error:", "SMTPRecipientsRefused")
+
+
+def send_logging_all(row):
+    i, outbox_id, to_email = row
+    with correlation(f"outbox:{outbox_id}"):
+        if work(i):
+            log.info("sent", extra={"outbox_id": outbox_id, "to": to_email, "template": "weekly_promo_v1"})
+        else:
+            log.error("send failed", extra={"outbox_id": outbox_id, "to": to_email, "error": "SMTPRecipientsRefused", "code": 550})
+
+
+def send_logging(row):
+    i, outbox_id, to_email = row
+    with correlation(f"outbox:{outbox_id}"):
+        if work(i):
+            if sampled():
+                log.info("sent", extra={"outbox_id": outbox_id, "to": to_email, "template": "weekly_promo_v1"})
+        else:
+            log.error("send failed", extra={"outbox_id": outbox_id, "to": to_email, "error": "SMTPRecipientsRefused", "code": 550})
+
+
+def run(fn, rows, threads: int) -> float:
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for _ in pool.map(fn, rows, chunksize=64):
+            pass
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--sink", choices=("file", "slow"), default="file")
+    parser.add_argument("--slow-write-us", type=float, default=50)
+    args = parser.parse_args()
+
+    rows = [(i, str(uuid.uuid4()), f"cliente{i}@gmail.com") for i in range(args.messages)]
+    results = {}
+    lines = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        modes = (("none", send_none), ("print", send_print), ("logging_all", send_logging_all), ("logging", send_logging))
+        for mode, fn in modes:
+            path = Path(tmp) / f"{mode}.log"
+            with open(path, "w", encoding="utf-8") as f:
+                out = SlowStream(f, args.slow_write_us / 1e6) if args.sink == "slow" else f
+                if mode.startswith("logging"):
+                    setup_logging("bench", level="INFO", fmt="json", stream=out)
+                real_stdout, sys.stdout = sys.stdout, out
+                try:
+                    results[mode] = run(fn, rows, args.threads)
+                finally:
+                    sys.stdout = real_stdout
+                    if mode.startswith("logging"):
+                        t0 = time.perf_counter()
+                        shutdown_logging()  # drain what the listener still has queued
+                        results[f"{mode}_drain"] = time.perf_counter() - t0
+            lines[mode] = path.read_bytes().count(b"\n")
+
+    base = results["none"]
+    print(f"{args.messages} messages, {args.threads} send threads, sink={args.sink}")
+    for mode, _ in modes:
+        overhead_us = (results[mode] - base) / args.messages * 1e6
+        print(
+            f"{mode:12s} {results[mode]:7.3f}s  {args.messages / results[mode]:9.0f} msg/s  "
+            f"{overhead_us:+7.2f} us/msg vs none  ({lines[mode]} lines)"
+        )
+    for mode in ("logging_all", "logging"):
+        print(f"{mode} listener drain after the run: {results[f'{mode}_drain'] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Render + MIME build time for a campaign of N recipients:
+full Jinja render + EmailMessage per recipient (old worker path)
+vs render_cache splice + pre-built MIME bytes.
+
+    python bench/render_bench.py --recipients 10000
+"""
+import argparse
+import sys
+import time
+from email.message import EmailMessage
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import worker  # noqa: E402
+
+TEMPLATE_KEY = "weekly_promo_v1"
+
+
+def old_path(to_email: str) -> bytes:
+    slots = worker.personalization({"email": to_email})
+    subject, text_body, html_body = worker.render_email_uncached(TEMPLATE_KEY, slots)
+    msg = EmailMessage()
+    msg["From"] = f"{worker.SMTP_FROM_NAME} <{worker.SMTP_FROM_EMAIL}>"
+    msg["To"] = to_email
+    msg["Subject"] = subject
+    msg.set_content(text_body)
+    msg.add_alternative(html_body, subtype="html")
+    return msg.as_bytes()
+
+
+def cached_path(to_email: str) -> bytes:
+    slots = worker.personalization({"email": to_email})
+    return worker.render_cache.get(TEMPLATE_KEY).to_bytes(to_email, slots)
+
+
+def run(label: str, fn, n: int):
+    size = 0
+    t0 = time.perf_counter()
+    for i in range(n):
+        size += len(fn(f"user{i}@example.com"))
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<34} {elapsed:7.2f}s per {n} recipients  ({elapsed / n * 1e6:7.1f} us/msg, avg {size // n} bytes)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recipients", type=int, default=10000)
+    args = parser.parse_args()
+
+    worker.render_cache.get(TEMPLATE_KEY)  # compile once, like the first message of a campaign
+
+    before = run("jinja render + EmailMessage", old_path, args.recipients)
+    after = run("render cache + pre-built MIME", cached_path, args.recipients)
+    print(f"speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Load test for POST /signup against a running API (and the Postgres behind it).
+
+    uvicorn app.main:app --port 8000 &
+    python bench/signup_load.py --url http://127.0.0.1:8000 --requests 2000 --concurrency 32
+
+Every request uses a fresh @gmail.com address (allowlisted, so no DNS in the loop);
+--duplicates N makes every Nth request reuse an earlier email to exercise the
+dedupe path. Prints req/s and latency percentiles.
+"""
+import argparse
+import http.client
+import json
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+_local = threading.local()
+
+
+def _conn(host: str, port: int) -> http.client.HTTPConnection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = http.client.HTTPConnection(host, port, timeout=30)
+    return conn
+
+
+def one_request(host: str, port: int, path: str, email: str) -> tuple[float, int]:
+    body = json.dumps({
+        "name": "Load Test",
+        "email": email,
+        "interests": ["toys"],
+        "consent_promotions": True,
+    })
+    t0 = time.perf_counter()
+    try:
+        conn = _conn(host, port)
+        conn.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+        resp = conn.getresponse()
+        resp.read()
+        status = resp.status
+    except Exception:
+        _local.conn = None
+        status = 0
+    return time.perf_counter() - t0, status
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+def run_load(url: str, path: str = "/signup", requests: int = 1000, concurrency: int = 16, duplicates: int = 0) -> dict:
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    run = uuid.uuid4().hex[:8]
+
+    emails = []
+    for i in range(requests):
+        if duplicates and i and i % duplicates == 0:
+            emails.append(emails[i // 2])
+        else:
+            emails.append(f"loadtest+{run}-{i}@gmail.com")
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda e: one_request(host, port, path, e), emails))
+    elapsed = time.perf_counter() - t0
+
+    latencies = sorted(r[0] * 1000 for r in results)
+    statuses: dict[int, int] = {}
+    for _, status in results:
+        statuses[status] = statuses.get(status, 0) + 1
+
+    return {
+        "path": path,
+        "requests": len(results),
+        "concurrency": concurrency,
+        "elapsed": elapsed,
+        "rps": len(results) / elapsed,
+        "mean": statistics.fmean(latencies),
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "max": latencies[-1],
+        "statuses": dict(sorted(statuses.items())),
+    }
+
+
+def print_report(r: dict):
+    print(f"{r['path']}: {r['requests']} requests, concurrency {r['concurrency']}, {r['elapsed']:.2f}s")
+    print(f"throughput: {r['rps']:.1f} req/s")
+    print(
+        f"latency ms: mean {r['mean']:.1f}  p50 {r['p50']:.1f}  "
+        f"p95 {r['p95']:.1f}  p99 {r['p99']:.1f}  max {r['max']:.1f}"
+    )
+    print("status codes:", r["statuses"])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", default="/signup")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duplicates", type=int, default=0, help="every Nth request repeats an earlier email")
+    args = parser.parse_args()
+
+    print_report(run_load(args.url, args.path, args.requests, args.concurrency, args.duplicates))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Messages/sec: one SMTP connection per message (old worker.send_smtp) vs SMTPPool.
+
+Runs against a local throwaway SMTP server (aiosmtpd if installed, stdlib smtpd otherwise).
+--handshake-ms adds a delay to every EHLO to stand in for the TLS + AUTH round-trips
+a real relay costs on each new connection.
+
+    python bench/smtp_pool_bench.py --messages 500 --handshake-ms 40
+"""
+import argparse
+import smtplib
+import sys
+import threading
+import time
+import warnings
+from email.message import EmailMessage
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.smtp_pool import SMTPPool  # noqa: E402
+
+HOST = "127.0.0.1"
+
+
+def start_server(port: int, handshake_ms: int):
+    delay = handshake_ms / 1000.0
+    try:
+        from aiosmtpd.controller import Controller
+        from aiosmtpd.smtp import SMTP as AioSMTP
+
+        class Handler:
+            async def handle_DATA(self, server, session, envelope):
+                return "250 OK"
+
+            async def handle_EHLO(self, server, session, envelope, hostname, responses):
+                import asyncio
+                await asyncio.sleep(delay)
+                session.host_name = hostname
+                return responses
+
+        controller = Controller(Handler(), hostname=HOST, port=port)
+        controller.start()
+        return controller.stop
+    except ImportError:
+        pass
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        import asyncore
+        import smtpd
+
+    class Channel(smtpd.SMTPChannel):
+        def smtp_EHLO(self, arg):
+            time.sleep(delay)
+            super().smtp_EHLO(arg)
+
+    class Server(smtpd.SMTPServer):
+        channel_class = Channel
+
+        def process_message(self, peer, mailfrom, rcpttos, data, **kwargs):
+            return None
+
+    server = Server((HOST, port), None, decode_data=False)
+    t = threading.Thread(target=asyncore.loop, kwargs={"timeout": 0.05}, daemon=True)
+    t.start()
+    return server.close
+
+
+def build_message(i: int) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = "Bench <bench@example.com>"
+    msg["To"] = f"user{i}@example.com"
+    msg["Subject"] = "Beneficios exclusivos para vos en Pika Pika"
+    msg.set_content("Hola!\n\n" + "x" * 2000)
+    return msg
+
+
+def send_unpooled(port: int, msg: EmailMessage):
+    with smtplib.SMTP(HOST, port, timeout=20) as server:
+        server.ehlo()
+        server.send_message(msg)
+
+
+def run(label: str, fn, n: int):
+    t0 = time.perf_counter()
+    for i in range(n):
+        fn(build_message(i))
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<28} {n} msgs in {elapsed:7.2f}s -> {n / elapsed:8.1f} msgs/sec")
+    return n / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=300)
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--handshake-ms", type=int, default=20)
+    parser.add_argument("--max-per-conn", type=int, default=100)
+    args = parser.parse_args()
+
+    stop = start_server(args.port, args.handshake_ms)
+    time.sleep(0.2)
+    try:
+        before = run("new connection per message", lambda m: send_unpooled(args.port, m), args.messages)
+
+        pool = SMTPPool(HOST, args.port, size=1, max_messages=args.max_per_conn, starttls=False)
+        try:
+            after = run("SMTPPool (size=1)", pool.send_message, args.messages)
+        finally:
+            pool.close()
+
+        print(f"speedup: {after / before:.1f}x")
+    finally:
+        stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Deploy-time build for the email templates: app/templates/*.mjml -> *.html (Jinja).
+
+    npm install                              # mjml from package.json
+    python build_emails.py                   # or: npm run build:emails
+    python build_emails.py --minify-only     # no node: re-minify the checked-in .html
+
+MJML inlines the mj-attributes / mj-style inline="inline" CSS; then we minify
+(comments, indentation, the head <style> block), keeping Outlook conditional
+comments and every Jinja tag as written. Prints, per template, the size before/after
+and the render time with the same context the worker uses, so the win is visible
+at deploy time. Nothing here runs at send time.
+"""
+import argparse
+import re
+import shlex
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from jinja2 import Environment, select_autoescape
+
+TEMPLATES_DIR = Path(__file__).resolve().parent / "app/templates"
+DEFAULT_MJML = "npx --no-install mjml"
+
+_JINJA_RE = re.compile(r"{{.*?}}|{%.*?%}|{#.*?#}", re.S)
+_PLACEHOLDER = "JINJA{:04d}X"
+_PLACEHOLDER_RE = re.compile(r"JINJA(\d{4})X")
+
+# Plain comments only: <!--[if mso]>, <!--[if !mso]><!--> and <!--<![endif]--> must survive
+_COMMENT_RE = re.compile(r"<!--(?!\[if)(?!<!\[endif\])(?!>).*?-->", re.S)
+_STYLE_RE = re.compile(r"(<style[^>]*>)(.*?)(</style>)", re.S | re.I)
+_CSS_COMMENT_RE = re.compile(r"/\*.*?\*/", re.S)
+_CSS_PUNCT_RE = re.compile(r"\s*([{};,])\s*")
+
+SAMPLE_CONTEXT = {
+    "logo_url": "https://example.com/static/logo.png",
+    "maps_url": "https://www.google.com/maps/place/Pika+pika",
+    "whatsapp_url": "https://wa.me/5493446586123",
+    "address": "Rocamora 35, Gualeguaychu, Entre Rios",
+    "hours": "Lun a Sab",
+    "terms_line": "Válido presentando este email en el local Pika Pika",
+    "instagram_url": "https://instagram.com/pikapikagchu",
+    "instagram_handle": "@pikapikagchu",
+    "unsubscribe_url": "https://example.com/unsubscribe/eBx83VVdRxeYHFzYiJCfBwGThuGp35Sw2IfdKlY",
+}
+
+
+def protect_jinja(source: str) -> tuple[str, list[str]]:
+    """Swaps Jinja tags for inert placeholders so MJML / the minifier can't touch them."""
+    tags: list[str] = []
+
+    def swap(m):
+        tags.append(m.group(0))
+        return _PLACEHOLDER.format(len(tags) - 1)
+
+    return _JINJA_RE.sub(swap, source), tags
+
+
+def restore_jinja(html: str, tags: list[str]) -> str:
+    restored = _PLACEHOLDER_RE.sub(lambda m: tags[int(m.group(1))], html)
+    missing = [t for t in tags if t not in restored]
+    if missing:
+        raise ValueError(f"Jinja tags lost in the build: {missing}")
+    return restored
+
+
+def compile_mjml(source: str, mjml_cmd: str = DEFAULT_MJML) -> str:
+    proc = subprocess.run(
+        [*shlex.split(mjml_cmd), "-i", "-s", "--config.validationLevel", "strict", "--config.beautify", "false"],
+        input=source,
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"mjml failed ({proc.returncode}): {proc.stderr.strip()}")
+    return proc.stdout
+
+
+def _minify_css(match) -> str:
+    open_tag, css, close_tag = match.groups()
+    css = _CSS_COMMENT_RE.sub("", css)
+    css = re.sub(r"\s+", " ", css)
+    css = _CSS_PUNCT_RE.sub(r"\1", css).strip()
+    return f"{open_tag}{css}{close_tag}"
+
+
+def minify_html(html: str) -> str:
+    html = _COMMENT_RE.sub("", html)
+    html = _STYLE_RE.sub(_minify_css, html)
+    # one tag/text run per line: newlines still separate words, and no line gets
+    # anywhere near the 998-byte SMTP limit
+    lines = (line.strip() for line in html.splitlines())
+    return "\n".join(line for line in lines if line) + "\n"
+
+
+def build_html(mjml_source: str, mjml_cmd: str = DEFAULT_MJML) -> str:
+    protected, tags = protect_jinja(mjml_source)
+    html = compile_mjml(protected, mjml_cmd)
+    return restore_jinja(minify_html(html), tags)
+
+
+def reminify_html(html: str) -> str:
+    protected, tags = protect_jinja(html)
+    return restore_jinja(minify_html(protected), tags)
+
+
+def render_stats(template_source: str, runs: int = 200) -> tuple[int, float]:
+    """(rendered bytes, microseconds per render) with the worker's environment settings."""
+    env = Environment(autoescape=select_autoescape(["html", "xml"], default_for_string=True))
+    template = env.from_string(template_source)
+    rendered = template.render(**SAMPLE_CONTEXT)
+    t0 = time.perf_counter()
+    for _ in range(runs):
+        template.render(**SAMPLE_CONTEXT)
+    return len(rendered.encode("utf-8")), (time.perf_counter() - t0) / runs * 1e6
+
+
+def report(name: str, before: str | None, after: str):
+    after_bytes, after_us = render_stats(after)
+    if before is None:
+        print(f"{name}: {after_bytes} bytes rendered, {after_us:.0f} us/render (new)")
+        return
+    before_bytes, before_us = render_stats(before)
+    saved = 100 * (1 - after_bytes / before_bytes)
+    print(
+        f"{name}: rendered {before_bytes} -> {after_bytes} bytes ({saved:.0f}% smaller), "
+        f"render {before_us:.0f} -> {after_us:.0f} us"
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mjml", default=DEFAULT_MJML, help="command that runs the mjml CLI")
+    parser.add_argument("--minify-only", action="store_true", help="skip mjml, re-minify the existing .html files")
+    parser.add_argument("--dir", type=Path, default=TEMPLATES_DIR)
+    args = parser.parse_args(argv)
+
+    if args.minify_only:
+        jobs = [(path, None) for path in sorted(args.dir.glob("*.html"))]
+    else:
+        jobs = [(src.with_suffix(".html"), src) for src in sorted(args.dir.glob("*.mjml"))]
+
+    for out_path, src_path in jobs:
+        before = out_path.read_text(encoding="utf-8") if out_path.exists() else None
+        if src_path is None:
+            after = reminify_html(before)
+        else:
+            after = build_html(src_path.read_text(encoding="utf-8"), args.mjml)
+        out_path.write_text(after, encoding="utf-8", newline="\n")
+        report(out_path.name, before, after)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,38 +1,94 @@
+import os
+
+# before anything imports app.db.session: picks this process's pool profile
+os.environ.setdefault("DB_ROLE", "scheduler")
+
+import logging
+
 from apscheduler.schedulers.blocking import BlockingScheduler
 from apscheduler.triggers.cron import CronTrigger
+from app.core.logging import correlation, setup_logging
+from app.core.metrics import start_metrics_server, track_job
 from app.db.session import SessionLocal
-from app.jobs.weekly_scheduler import queue_weekly_promo
+from app.jobs.weekly_scheduler import last_monday_utc_at, queue_weekly_promo, queue_weekly_promo_chunked
+from app.jobs.outbox_archive import archive
+from app.jobs.stats_counters import fold, reconcile
 from datetime import datetime, timezone
 
+# 0 = old single-statement enqueue
+WEEKLY_ENQUEUE_CHUNK_SIZE = int(os.getenv("WEEKLY_ENQUEUE_CHUNK_SIZE", "1000"))
+WEEKLY_HOUR_UTC, WEEKLY_MINUTE_UTC = 17, 50  # Monday, see the cron below
+SCHEDULER_METRICS_PORT = int(os.getenv("SCHEDULER_METRICS_PORT", "9102"))  # 0: no /metrics listener
+
+log = logging.getLogger("scheduler")
+
 def run_weekly():
-    print("RUN weekly", flush=True)
     db = SessionLocal()
     try:
-        info = queue_weekly_promo(db)
-        print("Weekly queue:", info)
+        # one correlation id per run: it is stored on every outbox row it queues
+        with track_job("weekly"), correlation():
+            # keyed on this week's fire time: a retry in the same week resumes its run
+            fire_time = last_monday_utc_at(WEEKLY_HOUR_UTC, WEEKLY_MINUTE_UTC)
+            log.info("weekly run started")
+            if WEEKLY_ENQUEUE_CHUNK_SIZE > 0:
+                info = queue_weekly_promo_chunked(db, scheduled_for=fire_time, chunk_size=WEEKLY_ENQUEUE_CHUNK_SIZE)
+            else:
+                info = queue_weekly_promo(db, scheduled_for=fire_time)
+            log.info("weekly queue", extra=info)
+    finally:
+        db.close()
+
+def run_reconcile():
+    db = SessionLocal()
+    try:
+        with track_job("stats_reconcile"), correlation():
+            log.info("stats counters reconciled", extra={"fixed": reconcile(db)})
+    finally:
+        db.close()
+
+def run_stats_fold():
+    db = SessionLocal()
+    try:
+        with track_job("stats_fold"):
+            log.debug("stats deltas folded", extra={"folded": fold(db)})
+    finally:
+        db.close()
+
+def run_archive():
+    db = SessionLocal()
+    try:
+        with track_job("outbox_archive"), correlation():
+            log.info("outbox archived", extra=archive(db))
     finally:
         db.close()
 
 if __name__ == "__main__":
+    setup_logging("scheduler")
+    start_metrics_server(SCHEDULER_METRICS_PORT)
     sched = BlockingScheduler(timezone="UTC")
 
-    trigger = CronTrigger(day_of_week="mon", hour=17, minute=50, timezone="UTC")
+    trigger = CronTrigger(day_of_week="mon", hour=WEEKLY_HOUR_UTC, minute=WEEKLY_MINUTE_UTC, timezone="UTC")
     job = sched.add_job(run_weekly, trigger, id="weekly", replace_existing=True)
+    # Full recount of the /admin/summary counters, off-peak
+    sched.add_job(run_reconcile, CronTrigger(hour=4, minute=30, timezone="UTC"), id="stats_reconcile", replace_existing=True)
+    # Triggers append counter deltas; fold them so stats_counter_totals stays a short read
+    sched.add_job(run_stats_fold, "interval", minutes=1, id="stats_fold", replace_existing=True)
+    # Move finished outbox rows to message_outbox_archive (app/jobs/outbox_archive.py)
+    sched.add_job(run_archive, CronTrigger(hour=5, minute=0, timezone="UTC"), id="outbox_archive", replace_existing=True)
 
     now = datetime.now(timezone.utc)
 
     # Compute next fire time without relying on job.next_run_time
     next_run = job.trigger.get_next_fire_time(previous_fire_time=None, now=now)
 
-    print("Scheduler started", flush=True)
-    print(f"Now (UTC):      {now}", flush=True)
-    print(f"Next run (UTC): {next_run}", flush=True)
-    if next_run:
-        print(f"Time left:      {next_run - now}", flush=True)
+    log.info(
+        "scheduler started",
+        extra={"now": now, "next_run": next_run, "time_left": str(next_run - now) if next_run else None},
+    )
 
     # This will "freeze" the terminal by design (BlockingScheduler blocks)
     try:
         sched.start()
     except (KeyboardInterrupt, SystemExit):
-        print("Scheduler shutting down...", flush=True)
+        log.info("scheduler shutting down")
         sched.shutdown()
\ No newline at end of file
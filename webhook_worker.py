@@ -0,0 +1,64 @@
+import logging
+import os
+import time
+
+# before anything imports app.db.session: picks this process's pool profile
+os.environ.setdefault("DB_ROLE", "webhook_worker")
+
+from app.core.config import DATABASE_URL
+from app.core.logging import setup_logging
+from app.core.metrics import counter, histogram, start_metrics_server
+from app.db.session import PinnedSession
+from app.jobs.outbox_notify import OutboxWaiter
+from app.jobs.webhook_inbox import process_inbox_batch
+
+WEBHOOK_INBOX_BATCH_SIZE = int(os.getenv("WEBHOOK_INBOX_BATCH_SIZE", "200"))
+WEBHOOK_INBOX_LISTEN = os.getenv("WEBHOOK_INBOX_LISTEN", "false").lower() == "true"
+WEBHOOK_INBOX_LISTEN_DATABASE_URL = os.getenv("WEBHOOK_INBOX_LISTEN_DATABASE_URL") or DATABASE_URL
+WEBHOOK_WORKER_METRICS_PORT = int(os.getenv("WEBHOOK_WORKER_METRICS_PORT", "9103"))  # 0: no /metrics listener
+
+INBOX_EVENTS = counter("webhook_inbox_events_total", "Inbox events handled", ("outcome",))
+INBOX_BATCH_SECONDS = histogram("webhook_inbox_batch_duration_seconds", "Time per non-empty inbox batch")
+LOOP_ERRORS = counter("webhook_worker_loop_errors_total", "Webhook worker loop iterations that failed")
+
+log = logging.getLogger("webhook_worker")
+
+
+def main():
+    setup_logging("webhook_worker")
+    log.info("webhook inbox worker started, polling webhook_inbox")
+    if start_metrics_server(WEBHOOK_WORKER_METRICS_PORT):
+        log.info("metrics listening", extra={"port": WEBHOOK_WORKER_METRICS_PORT})
+    waiter = OutboxWaiter(
+        WEBHOOK_INBOX_LISTEN_DATABASE_URL if WEBHOOK_INBOX_LISTEN else None,
+        min_seconds=float(os.getenv("WEBHOOK_INBOX_POLL_MIN_SECONDS", "0.5")),
+        max_seconds=float(os.getenv("WEBHOOK_INBOX_POLL_MAX_SECONDS", "10")),
+        channel="webhook_inbox_ready",
+    )
+
+    pinned = PinnedSession()
+
+    while True:
+        db = None
+        try:
+            db = pinned.get()
+            t0 = time.perf_counter()
+            info = process_inbox_batch(db, limit=WEBHOOK_INBOX_BATCH_SIZE)
+            if info["processed"] or info["failed"]:
+                INBOX_BATCH_SECONDS.observe(time.perf_counter() - t0)
+                INBOX_EVENTS.labels("processed").inc(info["processed"])
+                INBOX_EVENTS.labels("failed").inc(info["failed"])
+                log.info("webhook inbox batch", extra=info)
+                waiter.reset()
+            else:
+                waiter.wait()
+        except Exception:
+            if db is not None:
+                db.rollback()
+            LOOP_ERRORS.inc()
+            log.exception("webhook worker loop error")
+            time.sleep(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,36 @@
+import logging
 import os
+import socket
 import time
-import smtplib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import NamedTuple
+from urllib.parse import quote
 from email.message import EmailMessage
 
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+# before anything imports app.db.session: picks this process's pool profile
+os.environ.setdefault("DB_ROLE", "worker")
+
 from sqlalchemy import text
 
-from app.db.session import SessionLocal
+from app.core.config import DATABASE_URL
+from app.core.logging import correlation, sampled, setup_logging
+from app.core.metrics import counter, histogram, start_metrics_server
+from app.db.metrics import add_outbox_collector
+from app.db.session import PinnedSession, SessionLocal, engine
+from app.jobs.outbox_notify import OutboxWaiter
+from app.services.campaign_render import CampaignRenderCache
+from app.services.email_renderer import (
+    EMAIL_TEMPLATES_AUTO_RELOAD, TEMPLATES_DIR, get_email_template, template_version,
+)
+from app.services.rate_limit import (
+    THROTTLE_CODES, PgSendGovernor, SendGovernor, parse_domain_rates, recipient_domain,
+)
+from app.services.send_errors import (
+    DEFER, RETRY, FailureStreak, backoff_seconds, classify_send_error, compact_error, smtp_code,
+)
+from app.services.smtp_pool import SMTPPool
+from app.services.unsubscribe_tokens import UNSUBSCRIBE_SECRET, mint_unsubscribe_token
 
 SMTP_HOST = os.getenv("SMTP_HOST")
 SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
@@ -20,14 +43,31 @@ EMAIL_SEND_MODE = os.getenv("EMAIL_SEND_MODE", "LIVE").upper()
 TEST_TO_EMAIL = os.getenv("TEST_TO_EMAIL", "").strip()
 DRY_RUN_SEEN = set()
 DRY_RUN_SLEEP_SECONDS = int(os.getenv("DRY_RUN_SLEEP_SECONDS", "10"))
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+WORKER_ID = os.getenv("WORKER_ID") or f"{socket.gethostname()}:{os.getpid()}"
+SEND_CONCURRENCY = int(os.getenv("SEND_CONCURRENCY", "4"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "25"))
+OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", "300"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "6"))
+OUTBOX_RETRY_BASE_SECONDS = float(os.getenv("OUTBOX_RETRY_BASE_SECONDS", "60"))
+OUTBOX_MAX_THROTTLES = int(os.getenv("OUTBOX_MAX_THROTTLES", "12"))  # 421/451 retries before giving up
+SEND_RATE_BACKEND = os.getenv("SEND_RATE_BACKEND", "memory").lower()  # memory | postgres
+SEND_RATE_GLOBAL_PER_SEC = float(os.getenv("SEND_RATE_GLOBAL_PER_SEC", "0"))
+SEND_RATE_DOMAIN_PER_SEC = parse_domain_rates(os.getenv("SEND_RATE_DOMAIN_PER_SEC", ""))  # gmail.com=5,hotmail.com=2
+SEND_RATE_DEFAULT_DOMAIN_PER_SEC = float(os.getenv("SEND_RATE_DEFAULT_DOMAIN_PER_SEC", "0"))
+SEND_RATE_MAX_WAIT_SECONDS = float(os.getenv("SEND_RATE_MAX_WAIT_SECONDS", "2"))
+SEND_RATE_ON_THROTTLE_PER_SEC = float(os.getenv("SEND_RATE_ON_THROTTLE_PER_SEC", "2"))  # for unconfigured domains
+OUTBOX_LISTEN = os.getenv("OUTBOX_LISTEN", "false").lower() == "true"
+OUTBOX_LISTEN_DATABASE_URL = os.getenv("OUTBOX_LISTEN_DATABASE_URL") or DATABASE_URL
+OUTBOX_POLL_MIN_SECONDS = float(os.getenv("OUTBOX_POLL_MIN_SECONDS", "1"))
+OUTBOX_POLL_MAX_SECONDS = float(os.getenv("OUTBOX_POLL_MAX_SECONDS", "15"))
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", str(SEND_CONCURRENCY)))
+SMTP_MAX_MESSAGES_PER_CONN = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONN", "100"))
+SMTP_IDLE_TIMEOUT_SECONDS = float(os.getenv("SMTP_IDLE_TIMEOUT_SECONDS", "60"))
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "9101"))  # 0: no /metrics listener
 
 BASE_DIR = Path(__file__).resolve().parent
-TEMPLATES_DIR = BASE_DIR / "app/templates"
-
-jinja_env = Environment(
-    loader=FileSystemLoader(str(TEMPLATES_DIR)),
-    autoescape=select_autoescape(["html", "xml"]),
-)
+log = logging.getLogger("worker")
 
 MAPS_URL = "https://www.google.com/maps/place/Pika+pika/@-33.0094136,-58.5212939,17z/data=!3m1!4b1!4m6!3m5!1s0x95baa96e7a3c9b9b:0xe3dcf248c61b47ba!8m2!3d-33.0094136!4d-58.5212939!16s%2Fg%2F11s5zh8086?entry=ttu&g_ep=EgoyMDI2MDIyNS4wIKXMDSoASAFQAw%3D%3D"
 WHATSAPP_URL = "https://wa.me/5493446586123"
@@ -37,12 +77,40 @@ ADDRESS = "Rocamora 35, Gualeguaychu, Entre Rios"
 HOURS = "Lun a Sab"
 TERMS_LINE = "Válido presentando este email en el local Pika Pika"
 
+SEND_SECONDS = histogram("outbox_send_duration_seconds", "Time per message, throttle wait included", ("outcome",))
+SEND_TOTAL = counter("outbox_send_total", "Messages handled by outcome and SMTP reply code", ("outcome", "code"))
+BATCH_SECONDS = histogram("worker_batch_duration_seconds", "Claim -> results written, per non-empty batch")
+CLAIMED_TOTAL = counter("worker_claimed_total", "Outbox rows claimed")
+LOOP_ERRORS = counter("worker_loop_errors_total", "Worker loop iterations that failed")
 
-def render_email(template_key: str, payload: dict) -> tuple[str, str, str]:
+
+def unsubscribe_url(payload: dict) -> tuple[str, bool]:
+    """(url, whether it takes an RFC 8058 one-click POST). Signed token when we know the customer."""
+    base_url = BASE_URL.rstrip("/")
+    customer_id = payload.get("customer_id")
+    if customer_id and UNSUBSCRIBE_SECRET:
+        return f"{base_url}/unsubscribe/{mint_unsubscribe_token(customer_id, 'email')}", True
+    email = (payload.get("email") or "").strip()
+    return f"{base_url}/unsubscribe?channel=email&value={quote(email, safe='@')}", False
+
+
+def list_unsubscribe_headers(url: str, one_click: bool) -> dict:
+    headers = {"List-Unsubscribe": f"<{url}>"}
+    if one_click:
+        headers["List-Unsubscribe-Post"] = "List-Unsubscribe=One-Click"
+    return headers
+
+
+def personalization(payload: dict) -> dict:
+    """The only per-recipient values in our templates (see render_cache)."""
+    return {"unsubscribe_url": unsubscribe_url(payload)[0]}
+
+
+def render_email_uncached(template_key: str, slots: dict) -> tuple[str, str, str]:
     if template_key == "weekly_promo_v1":
-        email = (payload.get("email") or "").strip()
         base_url = BASE_URL.rstrip("/")
         logo_url = f"{base_url}/static/logo.png"
+        unsubscribe_url = slots["unsubscribe_url"]
 
         subject = "Beneficios exclusivos para vos en Pika Pika"
         text_body = (
@@ -51,10 +119,10 @@ def render_email(template_key: str, payload: dict) -> tuple[str, str, str]:
             f"Ubicacion: {MAPS_URL}\n"
             f"WhatsApp: {WHATSAPP_URL}\n"
             f"Instagram: {INSTAGRAM_URL}\n\n"
-            f"Darte de baja:\n{base_url}/unsubscribe?channel=email&value={email}\n"
+            f"Darte de baja:\n{unsubscribe_url}\n"
         )
 
-        template = jinja_env.get_template("pika_pika_weekly.html")
+        template = get_email_template(template_key)
         html_body = template.render(
             logo_url=logo_url,
             maps_url=MAPS_URL,
@@ -64,127 +132,425 @@ def render_email(template_key: str, payload: dict) -> tuple[str, str, str]:
             terms_line=TERMS_LINE,
             instagram_url=INSTAGRAM_URL,
             instagram_handle=INSTAGRAM_HANDLE,
-            unsubscribe_url=f"{base_url}/unsubscribe?channel=email&value={email}",
+            unsubscribe_url=unsubscribe_url,
         )
         return subject, text_body, html_body
 
     return "Novedades", "Hola!", "<p>Hola!</p>"
 
 
-def send_smtp(to_email: str, subject: str, text_body: str, html_body: str | None = None):
+# Each template_key is rendered once per process and then spliced per recipient
+render_cache = CampaignRenderCache(
+    render_email_uncached,
+    slots=("unsubscribe_url",),
+    from_header=f"{SMTP_FROM_NAME} <{SMTP_FROM_EMAIL}>",
+    # only worth an os.stat per send when templates are being edited
+    version_fn=template_version if EMAIL_TEMPLATES_AUTO_RELOAD else None,
+)
+
+
+def render_email(template_key: str, payload: dict) -> tuple[str, str, str]:
+    slots = personalization(payload)
+    compiled = render_cache.get(template_key)
+    if compiled is None:
+        return render_email_uncached(template_key, slots)
+    return compiled.personalize(slots)
+
+
+def build_governor() -> SendGovernor:
+    limits = dict(
+        global_rate=SEND_RATE_GLOBAL_PER_SEC,
+        domain_rates=SEND_RATE_DOMAIN_PER_SEC,
+        default_domain_rate=SEND_RATE_DEFAULT_DOMAIN_PER_SEC,
+        throttle_rate=SEND_RATE_ON_THROTTLE_PER_SEC,
+    )
+    if SEND_RATE_BACKEND == "postgres":
+        return PgSendGovernor(engine, **limits)
+    return SendGovernor(**limits)
+
+
+governor = build_governor()
+
+_smtp_pool: SMTPPool | None = None
+
+
+def get_smtp_pool() -> SMTPPool:
+    # Built lazily so importing worker (e.g. from scripts) doesn't need SMTP env vars
+    global _smtp_pool
+    if _smtp_pool is None:
+        _smtp_pool = SMTPPool(
+            SMTP_HOST,
+            SMTP_PORT,
+            username=SMTP_USERNAME,
+            password=SMTP_PASSWORD,
+            size=SMTP_POOL_SIZE,
+            max_messages=SMTP_MAX_MESSAGES_PER_CONN,
+            idle_timeout=SMTP_IDLE_TIMEOUT_SECONDS,
+            starttls=SMTP_STARTTLS,
+        )
+    return _smtp_pool
+
+
+def send_smtp(to_email: str, subject: str, text_body: str, html_body: str | None = None, headers: dict | None = None):
     msg = EmailMessage()
     msg["From"] = f"{SMTP_FROM_NAME} <{SMTP_FROM_EMAIL}>"
     msg["To"] = to_email
     msg["Subject"] = subject
+    for name, value in (headers or {}).items():
+        msg[name] = value
     msg.set_content(text_body)
 
     if html_body:
         msg.add_alternative(html_body, subtype="html")
 
-    with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=20) as server:
-        server.starttls()
-        server.login(SMTP_USERNAME, SMTP_PASSWORD)
-        server.send_message(msg)
-
-
-def fetch_next_batch(db, batch_size: int = 25):
-    rows = db.execute(text("""
-        select mo.id, mo.template_key, ci.value as to_email
-        from message_outbox mo
-        join customer_identities ci on ci.id = mo.to_identity_id
-        where mo.status = 'queued'
-          and mo.channel = 'email'
-          and mo.scheduled_for <= now()
-        order by mo.created_at
-        for update skip locked
-        limit :limit
-    """), {"limit": batch_size}).fetchall()
-    return rows
+    get_smtp_pool().send_message(msg)
 
 
-def mark_sent(db, outbox_id):
-    db.execute(text("""
-        update message_outbox
-        set status = 'sent',
-            sent_at = now()
-        where id = :id
-    """), {"id": outbox_id})
+def send_campaign_email(template_key: str, to_email: str, payload: dict):
+    """Sends with the cached MIME bytes when possible, otherwise builds the message normally."""
+    url, one_click = unsubscribe_url(payload)
+    slots = {"unsubscribe_url": url}
+    headers = list_unsubscribe_headers(url, one_click)
+    compiled = render_cache.get(template_key)
+    if compiled is not None:
+        try:
+            data = compiled.to_bytes(to_email, slots, headers=headers)
+        except ValueError:
+            data = None
+        if data is not None:
+            get_smtp_pool().sendmail(SMTP_FROM_EMAIL, [to_email], data)
+            return
+
+    subject, text_body, html_body = render_email_uncached(template_key, slots)
+    send_smtp(to_email, subject, text_body, html_body=html_body, headers=headers)
+
+
+# `status in ('queued', 'sending')` matches message_outbox_dequeue_idx (migrations/012):
+# an ordered scan of active rows only, however many sent / failed rows the table holds.
+# A row reclaimed from an expired lease had an attempt that never got recorded (the
+# worker crashed or hung mid-send): it counts here, and once that reaches
+# OUTBOX_MAX_ATTEMPTS the row is failed instead of handed out again, so a message
+# that kills workers can't sit at the head of the queue forever.
+DEQUEUE_SQL = """
+    with claimable as (
+      select mo.id, mo.status = 'sending' as reclaimed
+      from message_outbox mo
+      where mo.status in ('queued', 'sending')
+        and mo.channel = 'email'
+        and mo.scheduled_for <= now()
+        and (mo.next_attempt_at is null or mo.next_attempt_at <= now())
+        and (
+          mo.status = 'queued'
+          or (mo.status = 'sending' and mo.lease_expires_at < now())
+        )
+      order by mo.created_at
+      for update skip locked
+      limit :limit
+    ),
+    claimed as (
+      update message_outbox mo
+      set status = case
+            when claimable.reclaimed and mo.attempts + 1 >= :max_attempts then 'failed'::outbox_status
+            else 'sending'::outbox_status
+          end,
+          attempts = mo.attempts + case when claimable.reclaimed then 1 else 0 end,
+          last_error = case
+            when claimable.reclaimed then 'lease expired: worker stopped mid-send'
+            else mo.last_error
+          end,
+          claimed_by = case
+            when claimable.reclaimed and mo.attempts + 1 >= :max_attempts then null
+            else :worker_id
+          end,
+          lease_expires_at = case
+            when claimable.reclaimed and mo.attempts + 1 >= :max_attempts then null
+            else now() + make_interval(secs => :lease_seconds)
+          end
+      from claimable, customer_identities ci
+      where mo.id = claimable.id
+        and ci.id = mo.to_identity_id
+      returning mo.id, mo.template_key, ci.value as to_email, mo.attempts, mo.customer_id,
+                mo.payload->>'correlation_id' as correlation_id, mo.throttles, mo.status
+    )
+    select id, template_key, to_email, attempts, customer_id, correlation_id, throttles
+    from claimed
+    where status = 'sending'
+"""
+
+
+def fetch_next_batch(db, batch_size: int = 25, worker_id: str = WORKER_ID, lease_seconds: int = OUTBOX_LEASE_SECONDS):
+    """
+    Claims up to `batch_size` due messages for this worker: flips them to 'sending'
+    with a lease deadline. The caller commits right away so no row lock is held
+    while we talk to SMTP. Rows stuck in 'sending' past their lease (crashed worker)
+    are picked up again here, spending one attempt; out of attempts, they're failed.
+    """
+    rows = db.execute(
+        text(DEQUEUE_SQL),
+        {
+            "limit": batch_size,
+            "worker_id": worker_id,
+            "lease_seconds": lease_seconds,
+            "max_attempts": OUTBOX_MAX_ATTEMPTS,
+        },
+    ).fetchall()
+    return rows
 
 
-def mark_failed(db, outbox_id, reason: str):
-    db.execute(text("""
-        update message_outbox
-        set status = 'failed'
-        where id = :id
-    """), {"id": outbox_id})
+class SendResult(NamedTuple):
+    outbox_id: object
+    status: str  # outbox_status to write back
+    attempted: int = 1  # 0 when the row is handed back without trying (DRY_RUN)
+    error: str | None = None
+    error_code: int | None = None
+    retry_in: float | None = None
+    throttled: int = 0  # 1 when the relay answered THROTTLE_CODES
+
+
+def record_results(db, results: list[SendResult], worker_id: str = WORKER_ID):
+    """
+    Writes back the outcome of a claimed batch in one statement.
+    Only rows still leased by this worker are touched, so a worker whose lease
+    expired can't overwrite whoever reclaimed the row.
+    """
+    if not results:
+        return
+
+    values = []
+    params = {"worker_id": worker_id}
+    for i, r in enumerate(results):
+        values.append(
+            f"(:id_{i}, CAST(:status_{i} AS outbox_status), CAST(:attempted_{i} AS integer), "
+            f"CAST(:error_{i} AS text), CAST(:code_{i} AS integer), CAST(:retry_in_{i} AS double precision), "
+            f"CAST(:throttled_{i} AS integer))"
+        )
+        params[f"id_{i}"] = r.outbox_id
+        params[f"status_{i}"] = r.status
+        params[f"attempted_{i}"] = r.attempted
+        params[f"error_{i}"] = r.error
+        params[f"code_{i}"] = r.error_code
+        params[f"retry_in_{i}"] = r.retry_in
+        params[f"throttled_{i}"] = r.throttled
+
+    db.execute(text(f"""
+        update message_outbox mo
+        set status = v.status,
+            sent_at = case when v.status = 'sent' then now() else mo.sent_at end,
+            attempts = mo.attempts + v.attempted,
+            throttles = mo.throttles + v.throttled,
+            next_attempt_at = case
+              when v.retry_in is not null then now() + make_interval(secs => v.retry_in)
+              else null
+            end,
+            last_error = coalesce(v.error, mo.last_error),
+            last_error_code = case when v.error is not null then v.error_code else mo.last_error_code end,
+            claimed_by = null,
+            lease_expires_at = null
+        from (values {", ".join(values)}) as v(id, status, attempted, error, error_code, retry_in, throttled)
+        where mo.id = v.id
+          and mo.status = 'sending'
+          and mo.claimed_by = :worker_id
+    """), params)
+
+
+# Consecutive relay / DNS / database failures (DEFER): how far rows get pushed back
+infra_streak = FailureStreak()
+
+
+def failure_result(outbox_id, attempts_before: int, exc: Exception) -> SendResult:
+    attempt = attempts_before + 1
+    error = compact_error(exc)
+    code = smtp_code(exc)
+    kind = classify_send_error(exc)
+    if kind == DEFER:
+        # not this message's fault: back to the queue without spending an attempt
+        return SendResult(outbox_id, "queued", attempted=0, error=error, error_code=code,
+                          retry_in=backoff_seconds(infra_streak.fail(), base=OUTBOX_RETRY_BASE_SECONDS))
+    if kind == RETRY and attempt < OUTBOX_MAX_ATTEMPTS:
+        return SendResult(outbox_id, "queued", error=error, error_code=code,
+                          retry_in=backoff_seconds(attempt, base=OUTBOX_RETRY_BASE_SECONDS))
+    return SendResult(outbox_id, "failed", error=error, error_code=code)
+
+
+def wait_for_send_slot(domain: str) -> float:
+    """
+    Blocks through short rate-limit waits. Returns 0 when clear to send, or the
+    remaining delay when it's longer than SEND_RATE_MAX_WAIT_SECONDS (defer instead).
+    """
+    deadline = time.monotonic() + SEND_RATE_MAX_WAIT_SECONDS
+    while True:
+        wait = governor.acquire(domain)
+        if wait == 0:
+            return 0.0
+        if time.monotonic() + wait > deadline:
+            return wait
+        time.sleep(wait)
+
+
+def send_one(row) -> SendResult:
+    # log lines for this message carry the id of the run that enqueued it
+    with correlation(row.correlation_id or f"outbox:{row.id}"):
+        return _send_one(row)
+
+
+def _send_one(row) -> SendResult:
+    outbox_id, template_key, to_email, attempts, customer_id, _, throttles = row
+    original_to = to_email
+    payload = {"email": original_to, "customer_id": customer_id}
+    domain = recipient_domain(original_to)
+    try:
+        if EMAIL_SEND_MODE == "DRY_RUN":
+            render_email(template_key, payload)
+            if sampled():
+                log.info("dry run", extra={"outbox_id": str(outbox_id), "to": original_to, "template": template_key})
+            DRY_RUN_SEEN.add(outbox_id)
+            # hand the row back untouched
+            return SendResult(outbox_id, "queued", attempted=0)
+
+        if EMAIL_SEND_MODE == "TEST":
+            if not TEST_TO_EMAIL:
+                raise RuntimeError("EMAIL_SEND_MODE=TEST but TEST_TO_EMAIL is not set")
+            to_email = TEST_TO_EMAIL
+            domain = recipient_domain(to_email)
+
+        delay = wait_for_send_slot(domain)
+        if delay > 0:
+            if sampled():
+                log.info("deferred by rate limit", extra={"outbox_id": str(outbox_id), "domain": domain, "delay_s": round(delay, 1)})
+            return SendResult(outbox_id, "queued", attempted=0, retry_in=delay)
+
+        if EMAIL_SEND_MODE == "TEST":
+            subject, text_body, html_body = render_email(template_key, payload)
+            subject = f"[TEST] {subject}"
+            text_body = (
+                "MODO PRUEBA\n"
+                f"Este email originalmente iba dirigido a: {original_to}\n\n"
+                + text_body
+            )
+
+            if html_body:
+                html_body = (
+                    "<div style='padding:12px;background:#fff3cd;border:1px solid #ffeeba;"
+                    "border-radius:8px;font-family:Arial,Helvetica,sans-serif;font-size:12px;'>"
+                    f"MODO PRUEBA<br>Original: {original_to}"
+                    "</div>"
+                    + html_body
+                )
+            url, one_click = unsubscribe_url(payload)
+            send_smtp(to_email, subject, text_body, html_body=html_body, headers=list_unsubscribe_headers(url, one_click))
+        else:
+            send_campaign_email(template_key, to_email, payload)
+
+        infra_streak.reset()
+        if sampled():
+            log.info("sent", extra={"outbox_id": str(outbox_id), "to": to_email, "template": template_key})
+        return SendResult(outbox_id, "sent")
+
+    except Exception as e:
+        if smtp_code(e) in THROTTLE_CODES:
+            # the relay is pushing back: slow this domain down and retry later without
+            # spending one of the message's attempts; throttles have their own count,
+            # which grows the delay and ends the loop at OUTBOX_MAX_THROTTLES
+            try:
+                governor.throttled(domain)
+            except Exception:
+                log.exception("rate limiter: recording throttle failed", extra={"domain": domain})
+            result = SendResult(outbox_id, "queued", attempted=0, error=compact_error(e), error_code=smtp_code(e),
+                                retry_in=backoff_seconds(throttles + 1, base=OUTBOX_RETRY_BASE_SECONDS), throttled=1)
+            if throttles + 1 >= OUTBOX_MAX_THROTTLES:
+                result = result._replace(status="failed", retry_in=None)
+        else:
+            result = failure_result(outbox_id, attempts, e)
+
+        fields = {"outbox_id": str(outbox_id), "to": original_to, "error": result.error, "code": result.error_code}
+        if result.status == "queued" and not result.attempted and not result.throttled:
+            log.error("send deferred: relay, DNS or database unavailable", extra={**fields, "retry_in_s": round(result.retry_in)})
+        elif result.status == "queued":
+            log.warning("send failed, retrying", extra={**fields, "retry_in_s": round(result.retry_in)})
+        else:
+            log.error("send failed", extra=fields)
+        return result
+
+
+def send_outcome(result: SendResult) -> str:
+    if result.status == "sent":
+        return "sent"
+    if result.status == "failed":
+        return "failed"
+    if result.attempted:
+        return "retry"
+    if result.throttled:
+        return "throttled"  # relay pushed back
+    if result.error is not None:
+        return "unavailable"  # DEFER: relay / DNS / credentials / database
+    return "dry_run" if EMAIL_SEND_MODE == "DRY_RUN" else "deferred"  # our own rate limit
+
+
+def send_and_measure(row) -> SendResult:
+    t0 = time.perf_counter()
+    result = send_one(row)
+    outcome = send_outcome(result)
+    SEND_SECONDS.labels(outcome).observe(time.perf_counter() - t0)
+    SEND_TOTAL.labels(outcome, result.error_code or "").inc()
+    return result
 
 
 def main():
     missing = [k for k in ["SMTP_HOST", "SMTP_USERNAME", "SMTP_PASSWORD", "SMTP_FROM_EMAIL"] if not os.getenv(k)]
     if missing:
         raise RuntimeError(f"Missing SMTP env vars: {missing}")
-    print(BASE_DIR, TEMPLATES_DIR)
-    print("Worker started. Polling outbox...")
+    setup_logging("worker")
+    if not UNSUBSCRIBE_SECRET:
+        log.warning("UNSUBSCRIBE_SECRET not set: emails carry the legacy ?channel=&value= unsubscribe link")
+    log.info(
+        "worker started, polling outbox",
+        extra={"worker_id": WORKER_ID, "concurrency": SEND_CONCURRENCY, "mode": EMAIL_SEND_MODE, "templates": str(TEMPLATES_DIR)},
+    )
+
+    add_outbox_collector(SessionLocal)
+    if start_metrics_server(WORKER_METRICS_PORT):
+        log.info("metrics listening", extra={"port": WORKER_METRICS_PORT})
+
+    executor = ThreadPoolExecutor(max_workers=SEND_CONCURRENCY, thread_name_prefix="send")
+    waiter = OutboxWaiter(
+        OUTBOX_LISTEN_DATABASE_URL if OUTBOX_LISTEN else None,
+        min_seconds=OUTBOX_POLL_MIN_SECONDS,
+        max_seconds=OUTBOX_POLL_MAX_SECONDS,
+    )
+
+    # one connection for the life of the loop: no pool checkout per batch
+    pinned = PinnedSession()
 
     while True:
-        db = SessionLocal()
+        db = None
         try:
-            db.begin()
-            batch = fetch_next_batch(db, batch_size=25)
+            db = pinned.get()
+            batch = fetch_next_batch(db, batch_size=OUTBOX_BATCH_SIZE)
+            db.commit()
 
             if not batch:
-                db.commit()
-                time.sleep(3)
+                waiter.wait()
                 continue
+            waiter.reset()
+            t0 = time.perf_counter()
+            CLAIMED_TOTAL.inc(len(batch))
 
-            for outbox_id, template_key, to_email in batch:
-                original_to = to_email
-                try:
-                    subject, text_body, html_body = render_email(template_key, {"email": original_to})
-
-                    if EMAIL_SEND_MODE == "DRY_RUN":
-                        print("DRY_RUN -> Would send", outbox_id, "to:", original_to, "template:", template_key)
-                        DRY_RUN_SEEN.add(outbox_id)
-                        continue
-
-                    if EMAIL_SEND_MODE == "TEST":
-                        if not TEST_TO_EMAIL:
-                            raise RuntimeError("EMAIL_SEND_MODE=TEST but TEST_TO_EMAIL is not set")
-
-                        to_email = TEST_TO_EMAIL
-                        subject = f"[TEST] {subject}"
-                        text_body = (
-                            "MODO PRUEBA\n"
-                            f"Este email originalmente iba dirigido a: {original_to}\n\n"
-                            + text_body
-                        )
-
-                        if html_body:
-                            html_body = (
-                                "<div style='padding:12px;background:#fff3cd;border:1px solid #ffeeba;"
-                                "border-radius:8px;font-family:Arial,Helvetica,sans-serif;font-size:12px;'>"
-                                f"MODO PRUEBA<br>Original: {original_to}"
-                                "</div>"
-                                + html_body
-                            )
-
-                    send_smtp(to_email, subject, text_body, html_body=html_body)
-                    mark_sent(db, outbox_id)
-                    print("SENT", outbox_id, "->", to_email, "(original:", original_to, ")")
-
-                except Exception as e:
-                    mark_failed(db, outbox_id, repr(e))
-                    print("FAILED", outbox_id, "->", original_to, "error:", repr(e))
+            # No transaction is open while sending; if we die here the leases expire
+            # and another worker reclaims the rows.
+            results = list(executor.map(send_and_measure, batch))
 
+            record_results(db, results)
             db.commit()
+            BATCH_SECONDS.observe(time.perf_counter() - t0)
             if EMAIL_SEND_MODE == "DRY_RUN":
                 time.sleep(DRY_RUN_SLEEP_SECONDS)
 
-        except Exception as e:
-            db.rollback()
-            print("WORKER LOOP ERROR:", repr(e))
-        finally:
-            db.close()
+        except Exception:
+            if db is not None:
+                db.rollback()
+            LOOP_ERRORS.inc()
+            log.exception("worker loop error")
+            time.sleep(2)
 
 
 if __name__ == "__main__":